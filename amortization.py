@@ -0,0 +1,137 @@
+import math
+from functools import lru_cache
+
+# --- EMI ---
+@lru_cache(maxsize=4096)
+def emi(principal, annual_rate, tenure_years):
+    """Equated monthly instalment, rounded to the paisa. Memoized for the calculator's reruns."""
+    if tenure_years == 0: return principal
+    monthly_rate = annual_rate / 12
+    num_months = tenure_years * 12
+    if monthly_rate == 0:
+        return principal / num_months
+    emi = (principal * monthly_rate * ((1 + monthly_rate)**num_months)) / (((1 + monthly_rate)**num_months) - 1)
+    return round(emi, 2)
+
+def payoff_months(outstanding, annual_rate, emi):
+    """Instalments of emi needed to clear outstanding principal."""
+    if outstanding <= 0: return 0
+    r = annual_rate / 12
+    if r == 0: return math.ceil(outstanding / emi - 1e-9)
+    if emi <= outstanding * r: raise ValueError("EMI does not cover the monthly interest.")
+    months = math.ceil(math.log(emi / (emi - outstanding * r)) / math.log(1 + r) - 1e-9)
+    # A residue left only by rounding the EMI to the paisa goes into the last instalment, not an extra month
+    g = (1 + r) ** (months - 1)
+    if months > 1 and outstanding * g - emi * (g - 1) / r < 1: months -= 1
+    return months
+
+# --- SCHEDULES ---
+def schedules(principals, annual_rates, emis, months):
+    """Month-by-month schedules for many loans at once.
+
+    Every argument is a sequence with one entry per loan. Returns 2-D arrays
+    (loan x month) of payment, interest, principal and closing balance; months
+    past a loan's term are zero. The last instalment absorbs the rounding of
+    the EMI, so each schedule ends at exactly zero.
+    """
+    import numpy as np
+    P = np.asarray(principals, dtype=np.float64)[:, None]
+    r = np.asarray(annual_rates, dtype=np.float64)[:, None] / 12
+    E = np.asarray(emis, dtype=np.float64)[:, None]
+    n = np.asarray(months, dtype=np.int64)[:, None]
+    k = np.arange(1, max(int(n.max()) if n.size else 0, 1) + 1)
+
+    # Closed form for the balance after k payments, so no month depends on a Python loop
+    growth = (1 + r) ** k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(r > 0, (growth - 1) / np.where(r > 0, r, 1), k)
+    balance = P * growth - E * annuity
+    opening = np.concatenate([P, balance[:, :-1]], axis=1)
+    interest = opening * r
+    principal = E - interest
+    payment = np.broadcast_to(E, balance.shape).copy()
+
+    last = k == n
+    principal = np.where(last, opening, principal)
+    payment = np.where(last, opening + interest, payment)
+    balance = np.where(last, 0.0, balance)
+    live = k <= n
+    return {
+        "months": n[:, 0],
+        "payment": np.where(live, payment, 0.0),
+        "interest": np.where(live, interest, 0.0),
+        "principal": np.where(live, principal, 0.0),
+        "balance": np.where(live, balance, 0.0)
+    }
+
+def _row(table, i=0):
+    n = int(table["months"][i])
+    return {key: table[key][i, :n] for key in ("payment", "interest", "principal", "balance")}
+
+@lru_cache(maxsize=1024)
+def schedule(principal, annual_rate, tenure_years):
+    """Full schedule of a new loan (1-D arrays). Cached; the arrays are read-only."""
+    months = max(1, tenure_years * 12)
+    result = _row(schedules([principal], [annual_rate], [emi(principal, annual_rate, tenure_years)], [months]))
+    for col in result.values(): col.setflags(write=False)
+    return result
+
+def remaining_schedule(outstanding, annual_rate, emi):
+    """Schedule that clears outstanding principal at a fixed EMI."""
+    months = payoff_months(outstanding, annual_rate, emi)
+    return _row(schedules([outstanding], [annual_rate], [emi], [months]))
+
+def quote(principal, annual_rate, tenure_years):
+    """(emi, total payable, total interest) of a new loan."""
+    total = float(schedule(principal, annual_rate, tenure_years)["payment"].sum())
+    return emi(principal, annual_rate, tenure_years), round(total, 2), round(total - principal, 2)
+
+def to_frame(sched, first_month=1):
+    import pandas as pd
+    return pd.DataFrame({
+        "Month": range(first_month, first_month + len(sched["payment"])),
+        "EMI": sched["payment"].round(2), "Interest": sched["interest"].round(2),
+        "Principal": sched["principal"].round(2), "Balance": sched["balance"].round(2)
+    })
+
+# --- LOAN RECORDS ---
+def implied_rate(principal, emi, months):
+    """Annual rate at which emi repays principal in months (for loans stored without their rate)."""
+    if emi * months <= principal: return 0.0
+    lo, hi = 0.0, 1.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        r = mid / 12
+        if principal * r / (1 - (1 + r) ** -months) > emi: hi = mid
+        else: lo = mid
+    return lo
+
+def loan_terms(loan):
+    """(annual rate, outstanding principal) of an active loan record.
+
+    Loans approved before schedules were stored carry neither; the rate is
+    recovered from principal/EMI/term and the principal from the instalments paid.
+    """
+    if "outstanding_principal" in loan:
+        return loan["interest_rate"], loan["outstanding_principal"]
+    months = max(1, round(loan["total_amount_payable"] / loan["emi_amount"]))
+    rate = implied_rate(loan["principal"], loan["emi_amount"], months)
+    paid = loan["total_paid"] / loan["emi_amount"]
+    r = rate / 12
+    if r == 0: outstanding = loan["principal"] - loan["total_paid"]
+    else:
+        g = (1 + r) ** paid
+        outstanding = loan["principal"] * g - loan["emi_amount"] * (g - 1) / r
+    return rate, max(0.0, round(outstanding, 2))
+
+def apply_payment(outstanding, annual_rate, amount):
+    """Splits a repayment into this month's interest and principal.
+
+    Returns (charged, new outstanding principal). Anything beyond the interest
+    reduces principal straight away, so paying several EMIs ahead of time saves
+    the interest those months would have carried. charged never exceeds the payoff amount.
+    """
+    interest = round(outstanding * annual_rate / 12, 2)
+    payoff = round(outstanding + interest, 2)
+    if amount >= payoff: return payoff, 0.0
+    return amount, round(outstanding - (amount - interest), 2)
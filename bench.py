@@ -0,0 +1,255 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import gc
+import json
+import tracemalloc
+import aggregates
+import ledger
+import storage
+from txnlog import TxnLog, now_timestamp, to_paise
+
+SIZES = (1000, 100000, 1000000)
+OPS = 1000           # Timed calls per operation
+HISTORY = 20         # Transactions generated per account
+PAGE_ROWS = 50       # Rows fetched by one history load
+PIN, PASSWORD = "1234", "pass"
+
+# --- SYNTHETIC BANK ---
+def synthetic_bank(accounts, history=HISTORY, seed=0):
+    """A bank dict with one Savings account per user, spread over the branches."""
+    rng = random.Random(seed)
+    data = storage.default_data()
+    branches = list(ledger.BRANCH_DATA.items())
+    start = now_timestamp() - history * 86400
+    for i in range(accounts):
+        branch, info = branches[i % len(branches)]
+        balance = to_paise(rng.randint(50000, 500000))
+        amounts, balances = [], []
+        for _ in range(history):
+            amounts.append(to_paise(rng.randint(100, 5000)))
+            balance += amounts[-1]
+            balances.append(balance)
+        data[f"user{i}"] = {"password": PASSWORD, "accounts": [{
+            "account_name": f"user{i}", "account_number": str(10**9 + i),
+            "account_type": "Savings", "balance": balance / 100, "pin": PIN,
+            "branch_name": branch, "branch_addr": info["address"], "ifsc": "BANK" + info["code"], "cibil": 700,
+            "transactions": TxnLog.from_columns([start + k * 86400 for k in range(history)], ["CREDIT"] * history,
+                                                amounts, ["Cash Deposit"] * history, balances),
+            "loans": [], "status": "active"
+        }]}
+    data["stats"] = aggregates.compute(data)
+    return data
+
+def make_store(backend, directory):
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(os.path.join(directory, "bench.db"))
+    if backend == "sharded":
+        from shard_store import ShardStore
+        return ShardStore(os.path.join(directory, "shards"))
+    return storage.JsonStore(os.path.join(directory, "bench.json"), os.path.join(directory, "bench.journal"),
+                             os.path.join(directory, "bench.lock"))
+
+# --- MEASUREMENT ---
+def measure(fn, args_list):
+    """Calls fn(*args) for each args; returns (ops/sec, [latencies in seconds])."""
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t)
+    return len(args_list) / (time.perf_counter() - started), latencies
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def summarize(name, ops_per_sec, latencies):
+    lat = sorted(latencies)
+    return {"op": name, "ops_per_sec": ops_per_sec, "p50_ms": percentile(lat, 0.50) * 1000,
+            "p95_ms": percentile(lat, 0.95) * 1000, "p99_ms": percentile(lat, 0.99) * 1000}
+
+def file_loans(users, rng):
+    """Queues one pending loan per user in a single commit; returns their ids."""
+    data = storage.load_data()
+    mut = storage.Mutation(data, "bench_loans")
+    ids = []
+    for n, u in enumerate(users):
+        acc = data[u]["accounts"][0]
+        ids.append(f"BENCH{n}")
+        mut.append(["pending_loans"], {
+            "id": ids[-1], "username": u, "account_index": 0, "account_number": acc["account_number"],
+            "type": "Personal Loan", "principal": rng.randint(10000, 500000), "interest_rate": "10.0%",
+            "tenure_years": rng.randint(1, 5)
+        })
+    storage.commit(mut)
+    return ids
+
+def run(accounts, backend="json", ops=OPS, history=HISTORY, seed=0):
+    """Benchmarks every operation on a fresh bank of the given size; returns one summary row per operation."""
+    rng = random.Random(seed)
+    previous = storage.get_store()
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(backend, directory)
+        store.save(synthetic_bank(accounts, history, seed))
+        storage.set_store(store)
+        try:
+            storage.load_data()  # Warm the cache so the first timed call is not the full parse
+            def pick():
+                i = rng.randrange(accounts)
+                return f"user{i}", str(10**9 + i)
+            results = []
+            picks = [pick() for _ in range(ops)]
+            results.append(summarize("login", *measure(ledger.authenticate, [(u, PASSWORD) for u, _ in picks])))
+            results.append(summarize("deposit", *measure(ledger.deposit, [(u, n, 500) for u, n in picks])))
+            pairs = [(pick(), pick()) for _ in range(ops)]
+            results.append(summarize("transfer", *measure(
+                ledger.transfer, [(a[0], a[1], b[0], b[1], 100) for a, b in pairs if a != b])))
+            ids = file_loans(rng.sample([f"user{i}" for i in range(accounts)], min(ops, accounts)), rng)
+            results.append(summarize("loan_approval", *measure(ledger.approve_loan, [(i,) for i in ids])))
+            results.append(summarize("history_load", *measure(
+                storage.account_transactions, [(u, n, None, None, None, 0, PAGE_ROWS) for u, n in picks])))
+            return results
+        finally:
+            storage.set_store(previous)
+
+# --- COLD START ---
+_IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import project, views
+for page in {pages!r}: views.load(page)
+print(time.perf_counter() - started)
+"""
+
+def startup(runs=5):
+    """Median ms for a fresh interpreter to import the app and the login page, and every page.
+
+    Run outside Streamlit, so it measures imports only: the part of the first
+    render that lazy page modules are meant to keep small.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    import views
+    results = {}
+    for label, pages in (("login", ["auth"]), ("all_pages", list(views.PAGES))):
+        times = sorted(float(subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(pages=pages)], cwd=here,
+                                            capture_output=True, text=True, check=True).stdout.split()[-1])
+                       for _ in range(runs))
+        results[label] = times[len(times) // 2] * 1000
+    return results
+
+# --- RESIDENT MEMORY ---
+def _resident(text, convert):
+    """Bytes still allocated after parsing one snapshot text and converting its users."""
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(text)
+    for key in data:
+        if storage.is_user(data, key): convert(data[key])
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+def memory(accounts, history=HISTORY):
+    """Resident bytes of a loaded bank in the in-memory layouts it has had.
+
+    dicts:         account dicts holding display dicts, one per transaction
+    dicts+log:     account dicts holding columnar TxnLogs
+    slotted:       Account/Loan records holding TxnLogs (what load_data builds)
+    """
+    bank = synthetic_bank(accounts, history)
+    legacy = {k: ({**v, "accounts": [{**a, "transactions": list(a["transactions"])} for a in v["accounts"]]}
+                  if storage.is_user(bank, k) else v) for k, v in bank.items()}
+    legacy_text, text = json.dumps(legacy), storage.dumps(bank)
+    del bank, legacy
+
+    def dict_logs(user):
+        for acc in user["accounts"]: acc["transactions"] = TxnLog.from_stored(acc["transactions"])
+    layouts = {"dicts": _resident(legacy_text, lambda user: None),
+               "dicts+log": _resident(text, dict_logs),
+               "slotted": _resident(text, storage.normalize_user)}
+    return {name: (size, size / (accounts * history)) for name, size in layouts.items()}
+
+# --- SNAPSHOT FORMATS ---
+def _median_time(fn, runs):
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return sorted(times)[len(times) // 2]
+
+def snapshots(accounts, history=HISTORY, runs=3):
+    """File size, write time, full load time and one user's read time per snapshot format.
+
+    JSON has to be parsed whole to reach any user; the binary snapshot bisects
+    its index and decodes that user's records only.
+    """
+    import snapshot
+    bank = synthetic_bank(accounts, history)
+    target = f"user{accounts // 2}"
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        def load_json(path):
+            with open(path) as f: data = json.load(f)
+            for key in data:
+                if storage.is_user(data, key): storage.normalize_user(data[key])
+            return data
+        def write_json(path, **kwargs):
+            with open(path, "w") as f: f.write(storage.dumps(bank, **kwargs))
+        def read_one(path):
+            with snapshot.Snapshot(path) as snap: return snap.user(target)
+        formats = {
+            "json indent=4": (os.path.join(directory, "a.json"), lambda p: write_json(p, indent=4), load_json, None),
+            "json": (os.path.join(directory, "b.json"), lambda p: write_json(p, separators=(",", ":")), load_json, None),
+            "binary": (os.path.join(directory, "c.snap"), lambda p: snapshot.write(p, bank), snapshot.read, read_one),
+        }
+        for name, (path, write, load, one) in formats.items():
+            write_s = _median_time(lambda: write(path), runs)
+            load_s = _median_time(lambda: load(path), runs)
+            one_s = _median_time(lambda: one(path), runs * 100) if one else load_s
+            results[name] = {"bytes": os.path.getsize(path), "write_s": write_s, "load_s": load_s, "user_ms": one_s * 1000}
+        assert read_one(formats["binary"][0]) == load_json(formats["json"][0])[target]
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Ledger throughput and latency on synthetic banks")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated account counts")
+    parser.add_argument("--backend", choices=("json", "sqlite", "sharded"), default="json")
+    parser.add_argument("--ops", type=int, default=OPS)
+    parser.add_argument("--history", type=int, default=HISTORY)
+    parser.add_argument("--no-fsync", action="store_true", help="Skip the per-commit journal fsync")
+    parser.add_argument("--startup", action="store_true", help="Only time cold imports of the login page and of every page")
+    parser.add_argument("--memory", action="store_true", help="Only compare resident bytes of a loaded bank by layout")
+    parser.add_argument("--snapshot", action="store_true", help="Only compare snapshot formats: size, write, load, one-user read")
+    args = parser.parse_args()
+    if args.no_fsync: storage.JOURNAL_FSYNC = False
+    if args.startup:
+        for label, ms in startup().items(): print(f"{label:<10} {ms:>9.1f} ms")
+        sys.exit()
+    if args.memory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"{size:,} accounts x {args.history} transactions")
+            for name, (total, per_txn) in memory(size, args.history).items():
+                print(f"  {name:<10} {total / 2**20:>9.1f} MiB {per_txn:>8.1f} B/transaction")
+        sys.exit()
+    if args.snapshot:
+        print(f"{'accounts':>10} {'format':<14} {'MiB':>8} {'write s':>8} {'load s':>8} {'1 user ms':>10}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            for name, r in snapshots(size, args.history).items():
+                print(f"{size:>10,} {name:<14} {r['bytes'] / 2**20:>8.1f} {r['write_s']:>8.2f} {r['load_s']:>8.2f} {r['user_ms']:>10.3f}")
+        sys.exit()
+
+    print(f"{'accounts':>10} {'operation':<14} {'ops/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        started = time.perf_counter()
+        for r in run(size, args.backend, args.ops, args.history):
+            print(f"{size:>10,} {r['op']:<14} {r['ops_per_sec']:>10,.0f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+        print(f"{'':>10} ({time.perf_counter() - started:.1f}s including generation)")
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+MAX_POINTS = 1500       # Roughly one point per horizontal pixel of a wide chart
+CACHED_ACCOUNTS = 256   # Accounts whose downsampled series are kept in memory
+
+_cache = OrderedDict()  # account_number -> (log length, {(start_ts, end_ts, max_points): frame})
+_cache_lock = threading.Lock()
+
+# --- DOWNSAMPLING ---
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of at most threshold points that keep the curve's shape.
+
+    The first and last points are always kept; every bucket in between contributes
+    the point forming the largest triangle with the previous pick and the average
+    of the next bucket, so peaks and dips survive where plain striding drops them.
+    """
+    import numpy as np
+    n = len(x)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = picked[i + 1] = lo + int(area.argmax())
+    return picked
+
+# --- CACHED SERIES ---
+def balance_series(account_number, log, start_ts=None, end_ts=None, max_points=MAX_POINTS):
+    """DataFrame (date, balance_after) of the account's balance curve, downsampled to max_points.
+
+    Results are cached per account and date range. An entry is only valid for the
+    log length it was built from, so any appended transaction (from this process
+    or replayed from another) invalidates the account's entries.
+    """
+    import pandas as pd
+    key = (start_ts, end_ts, max_points)
+    with _cache_lock:
+        entry = _cache.get(account_number)
+        if entry and entry[0] == len(log) and key in entry[1]:
+            _cache.move_to_end(account_number)
+            return entry[1][key]
+
+    length = len(log)
+    if log.ordered():
+        lo, hi = log.span(start_ts, end_ts)
+        cols = log.arrays(lo, min(hi, length))
+        ts, bal = cols["ts"], cols["bal"]
+    else:
+        cols = log.arrays(0, length)
+        ts, bal = cols["ts"], cols["bal"]
+        if start_ts is not None or end_ts is not None:
+            positions = log.matching(start_ts, end_ts)
+            positions = positions[positions < length]
+            ts, bal = ts[positions], bal[positions]
+    picked = lttb(ts, bal, max_points)
+    frame = pd.DataFrame({"date": pd.to_datetime(ts[picked], unit="s"), "balance_after": bal[picked] / 100})
+
+    with _cache_lock:
+        entry = _cache.get(account_number)
+        if not entry or entry[0] != length: entry = _cache[account_number] = (length, {})
+        entry[1][key] = frame
+        _cache.move_to_end(account_number)
+        while len(_cache) > CACHED_ACCOUNTS: _cache.popitem(last=False)
+    return frame
+
+def invalidate(account_number=None):
+    """Drops the cached series of one account, or of all accounts."""
+    with _cache_lock:
+        if account_number is None: _cache.clear()
+        else: _cache.pop(account_number, None)
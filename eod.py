@@ -0,0 +1,132 @@
+import calendar
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import aggregates
+import ledger
+from storage import load_data, is_user
+from ledger import OVERDRAFT_FIXED_RATE
+from txnlog import make_row, now_timestamp
+
+# --- CONFIGURATION ---
+LATE_PENALTY_RATE = 0.02  # Charged on an instalment still unpaid when the next one falls due
+EOD_WORKERS = 4           # Branches processed in parallel
+
+def run_key(business_date, branch):
+    return f"{business_date.isoformat()}/{branch}"
+
+# --- SCAN ---
+def _scan(data):
+    """Groups the accounts that can have end-of-day postings by branch.
+
+    Only overdrawn Current accounts and accounts with an active loan can be
+    charged, so everything else is left out before any locks are taken.
+    """
+    branches = {}
+    for u in list(data):
+        if not is_user(data, u): continue
+        for pos, acc in enumerate(data[u]["accounts"]):
+            overdrawn = acc["account_type"] == "Current" and acc["balance"] < 0
+            if overdrawn or any(l["status"] == "Active" for l in acc["loans"]):
+                branches.setdefault(acc.get("branch_name"), []).append((u, acc["account_number"]))
+    return branches
+
+# --- POSTINGS ---
+def _post_branch(business_date, branch, owners):
+    """Charges one branch in a single atomic commit; returns its summary (None if it had already run).
+
+    owners is the branch's [(username, account_number)] from the scan.
+    """
+    import numpy as np
+    key = run_key(business_date, branch)
+    stamp = business_date.isoformat()
+    guard = {u for u, _ in owners} | {"eod_runs"}
+
+    def build(data, mut):
+        if key in data["eod_runs"]: return None
+        accs = []
+        for u, number in owners:
+            user = data.get(u)
+            pos = next((p for p, a in enumerate(user["accounts"]) if a["account_number"] == number), None) if is_user(data, u) else None
+            if pos is not None: accs.append((u, pos, user["accounts"][pos]))  # Else closed since the scan
+
+        # Overdraft interest: one vectorized pass over the branch's accounts
+        bal = np.array([a["balance"] for _, _, a in accs], dtype=np.float64)
+        current = np.array([a["account_type"] == "Current" and a.get("status", "active") == "active" for _, _, a in accs], dtype=bool)
+        interest = np.where(current & (bal < 0), np.round(-bal * OVERDRAFT_FIXED_RATE / 365, 2), 0.0)
+
+        # Loan instalments: flatten every active loan into columns
+        rows = [(i, j, loan) for i, (_, _, a) in enumerate(accs) for j, loan in enumerate(a["loans"]) if loan["status"] == "Active"]
+        # Instalments fall due monthly on the approval day, or the month's last day if it is shorter
+        approved = np.array([loan["date"][:10] for _, _, loan in rows], dtype="datetime64[D]")
+        approval_day = (approved - approved.astype("datetime64[M]")).astype(np.int64) + 1
+        today = np.datetime64(stamp, "D")
+        month_len = calendar.monthrange(business_date.year, business_date.month)[1]
+        last_due = np.array([loan.get("last_due", "") for _, _, loan in rows], dtype=object)
+        due = (approved < today) & (np.minimum(approval_day, month_len) == business_date.day) & (last_due != stamp)
+        emi = np.array([loan["emi_amount"] for _, _, loan in rows], dtype=np.float64)
+        owed = np.array([loan.get("emi_due", 0) for _, _, loan in rows], dtype=np.float64)
+        remaining = np.array([loan["remaining_amount"] for _, _, loan in rows], dtype=np.float64)
+        penalty = np.where(due & (owed > 0), np.round(owed * LATE_PENALTY_RATE, 2), 0.0)
+        new_owed = np.where(due, np.round(owed + np.minimum(emi, np.maximum(remaining - owed, 0)), 2), owed)
+
+        # Postings per account, applied with one balance update each (Mutation.get would rescan every change)
+        charges = {}
+        for i in np.flatnonzero(interest):
+            charges.setdefault(i, []).append((float(interest[i]), f"Overdraft Interest {stamp}"))
+        for k in np.flatnonzero(due):
+            i, j, loan = rows[k]
+            u, pos, _ = accs[i]
+            loan_path = [u, "accounts", pos, "loans", j]
+            if penalty[k]:
+                mut.set(loan_path + ["penalties"], round(loan.get("penalties", 0) + float(penalty[k]), 2))
+                charges.setdefault(i, []).append((float(penalty[k]), f"Late Payment Penalty {loan['id']}"))
+            mut.set(loan_path + ["emi_due"], float(new_owed[k]))
+            mut.set(loan_path + ["last_due"], stamp)
+
+        ts = now_timestamp()
+        for i, items in charges.items():
+            u, pos, acc = accs[i]
+            balance = acc["balance"]
+            for amount, description in items:
+                balance = round(balance - amount, 2)
+                mut.append([u, "accounts", pos, "transactions"], make_row(ts, "DEBIT", amount, description, balance))
+            aggregates.balance_moved(mut, acc, acc["balance"], balance)
+            mut.set([u, "accounts", pos, "balance"], balance)
+        collected = float(interest.sum() + penalty.sum())
+
+        summary = {"accounts": len(accs), "overdraft_interest": round(float(interest.sum()), 2),
+                   "instalments_due": int(due.sum()), "penalties": round(float(penalty.sum()), 2)}
+        if collected: mut.inc(["bank_balance"], round(collected, 2))
+        mut.set(["eod_runs", key], summary)
+        return summary
+    return ledger.transact("eod", [number for _, number in owners], guard, build)
+
+def run_eod(business_date=None, workers=EOD_WORKERS, progress=None):
+    """Runs the end-of-day batch for business_date (default: today).
+
+    Each branch is charged in its own atomic commit and recorded in eod_runs,
+    so running a date twice, or resuming after a crash, never charges an
+    account twice. Returns {branch: summary} for the branches charged now.
+    """
+    business_date = business_date or datetime.date.today()
+    data = load_data()
+    todo = {b: n for b, n in _scan(data).items() if run_key(business_date, b) not in data["eod_runs"]}
+    report = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_post_branch, business_date, b, n): b for b, n in todo.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            summary = future.result()
+            if summary is not None: report[futures[future]] = summary
+            if progress: progress(done, len(futures))
+    return report
+
+if __name__ == "__main__":
+    import argparse, time
+    parser = argparse.ArgumentParser(description="End-of-day batch: overdraft interest and loan instalments")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None, help="Business date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=EOD_WORKERS)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    for branch, summary in run_eod(args.date, args.workers).items():
+        print(f"{branch}: {summary}")
+    print(f"Finished in {time.perf_counter() - started:.2f}s")
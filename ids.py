@@ -0,0 +1,91 @@
+import threading
+
+# --- CONFIGURATION ---
+BLOCK_SIZE = 1000      # Serials reserved per commit; unused ones are skipped if the process exits
+SERIAL_DIGITS = 8      # Up to 10**8 accounts (or loans) per branch
+KINDS = ("account", "loan")
+
+# --- CHECK DIGITS ---
+def luhn_digit(digits):
+    """Luhn check digit for a string of digits: catches every single-digit typo and most swaps."""
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9: d -= 9
+        total += d
+    return str(-total % 10)
+
+def branch_digits(branch):
+    """The 3-digit number of a branch's code (LJU001 -> 001)."""
+    from ledger import BRANCH_DATA
+    return BRANCH_DATA[branch]["code"][-3:]
+
+def account_number(branch, serial):
+    """12 digits: branch number, serial, Luhn check digit. Older random numbers have 10, so they never clash."""
+    body = f"{branch_digits(branch)}{serial:0{SERIAL_DIGITS}d}"
+    return body + luhn_digit(body)
+
+def loan_id(branch, serial):
+    """LN, branch code, serial, check digit. Older LN#### ids are shorter, so they never clash."""
+    from ledger import BRANCH_DATA
+    code = BRANCH_DATA[branch]["code"]
+    body = f"{code[-3:]}{serial:0{SERIAL_DIGITS}d}"
+    return f"LN{code}{serial:0{SERIAL_DIGITS}d}{luhn_digit(body)}"
+
+def valid_account_number(number):
+    """False only for a 12-digit number whose check digit is wrong (a typo); older numbers pass."""
+    if len(number) != 3 + SERIAL_DIGITS + 1 or not number.isdigit(): return True
+    return luhn_digit(number[:-1]) == number[-1]
+
+def valid_loan_id(loan):
+    if len(loan) != 2 + 6 + SERIAL_DIGITS + 1: return True
+    digits = loan[5:-1]
+    return digits.isdigit() and loan[-1].isdigit() and luhn_digit(digits) == loan[-1]
+
+# --- BLOCK RESERVATION ---
+_blocks = {}  # "<kind>/<branch code>" -> [next serial, end of reserved block]
+_lock = threading.Lock()
+
+def _reserve(key, count):
+    """Moves the stored high-water mark of key past count more serials; returns the first of them."""
+    import ledger
+    def build(data, mut):
+        start = data["id_blocks"].get(key, 0) + 1
+        mut.set(["id_blocks", key], start + count - 1)
+        return start
+    return ledger.transact("id_reserve", ["id_blocks"], ["id_blocks"], build)
+
+def serials(kind, branch, count=1):
+    """count unique serials for kind at branch, from this process's reserved block.
+
+    Only a block running out costs a commit (the high-water mark in id_blocks,
+    guarded like any other write), so opening thousands of accounts never scans
+    existing ones nor retries on a clash.
+    """
+    from ledger import BRANCH_DATA
+    if kind not in KINDS: raise ValueError(f"Unknown id kind: {kind}")
+    key = f"{kind}/{BRANCH_DATA[branch]['code']}"
+    out = []
+    with _lock:
+        block = _blocks.setdefault(key, [1, 1])
+        while len(out) < count:
+            if block[0] >= block[1]:
+                need = count - len(out)
+                start = _reserve(key, max(BLOCK_SIZE, need))
+                block[0], block[1] = start, start + max(BLOCK_SIZE, need)
+            take = min(count - len(out), block[1] - block[0])
+            out.extend(range(block[0], block[0] + take))
+            block[0] += take
+    return out
+
+def new_account_numbers(branch, count=1):
+    return [account_number(branch, s) for s in serials("account", branch, count)]
+
+def new_loan_ids(branch, count=1):
+    return [loan_id(branch, s) for s in serials("loan", branch, count)]
+
+def forget_blocks():
+    """Drops this process's reserved blocks; set_store() calls it, as they belong to the old store."""
+    with _lock: _blocks.clear()
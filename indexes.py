@@ -0,0 +1,165 @@
+import bisect
+from collections import defaultdict
+
+class AccountIndex:
+    """Secondary indexes over the accounts held in a bank dict.
+
+    account_number -> (username, position), plus IFSC and branch -> account
+    numbers. It is built once per full load and then kept current from the same
+    journal changes the data goes through, so every path that creates, removes
+    or deactivates an account (in this process or replayed from another) keeps
+    it consistent.
+
+    For the admin directory it also keeps (lowercased username, number) and
+    account numbers in sorted lists, so a prefix search is a bisection.
+    """
+    def __init__(self):
+        self.by_number = {}
+        self.by_ifsc = defaultdict(set)
+        self.by_branch = defaultdict(set)
+        self.inactive = set()
+        self._user_accounts = {}  # username -> account numbers in position order
+        self._names = []      # sorted (username.lower(), account number)
+        self._numbers = []    # sorted account numbers
+        self._branch_of = {}  # account number -> branch name
+        self._haystack = None  # (text, line starts) for substring search; None = rebuild on next use
+        self._sorted = True    # False while rebuild() appends, to sort once at the end
+
+    def rebuild(self, data):
+        self.__init__()
+        self._sorted = False
+        for username, user in data.items():
+            if isinstance(user, dict) and "accounts" in user:
+                self._add_user(username, user)
+        self._names.sort()
+        self._numbers.sort()
+        self._sorted = True
+
+    def locate(self, account_number):
+        return self.by_number.get(account_number)
+
+    # --- MAINTENANCE ---
+    def _add_account(self, username, acc):
+        number = acc["account_number"]
+        numbers = self._user_accounts.setdefault(username, [])
+        self.by_number[number] = (username, len(numbers))
+        numbers.append(number)
+        self.by_ifsc[acc.get("ifsc")].add(number)
+        self.by_branch[acc.get("branch_name")].add(number)
+        if acc.get("status", "active") != "active": self.inactive.add(number)
+        self._branch_of[number] = acc.get("branch_name")
+        if self._sorted:
+            bisect.insort(self._names, (username.lower(), number))
+            bisect.insort(self._numbers, number)
+        else:
+            self._names.append((username.lower(), number))
+            self._numbers.append(number)
+        self._haystack = None
+
+    def _add_user(self, username, user):
+        for acc in user["accounts"]:
+            self._add_account(username, acc)
+
+    def _drop_account(self, username, position):
+        numbers = self._user_accounts.get(username, [])
+        number = numbers.pop(position)
+        self.by_number.pop(number, None)
+        for group in (self.by_ifsc, self.by_branch):
+            for members in group.values(): members.discard(number)
+        self.inactive.discard(number)
+        self._branch_of.pop(number, None)
+        for items, item in ((self._names, (username.lower(), number)), (self._numbers, number)):
+            i = bisect.bisect_left(items, item)
+            if i < len(items) and items[i] == item: del items[i]
+        self._haystack = None
+        # Later accounts of this user move up one position
+        for pos in range(position, len(numbers)):
+            self.by_number[numbers[pos]] = (username, pos)
+
+    def _drop_user(self, username):
+        while self._user_accounts.get(username):
+            self._drop_account(username, len(self._user_accounts[username]) - 1)
+        self._user_accounts.pop(username, None)
+
+    def apply(self, data, changes):
+        """Updates the index for changes that have just been applied to data."""
+        for change in changes:
+            kind, path = change[0], change[1]
+            if not isinstance(path[0], str) or len(path) > 4 or (len(path) > 1 and path[1] != "accounts"):
+                continue
+            username = path[0]
+            if len(path) == 1:
+                self._drop_user(username)
+                if kind == "set" and isinstance(change[2], dict) and "accounts" in change[2]:
+                    self._add_user(username, change[2])
+            elif len(path) == 2 and kind == "add":
+                self._add_account(username, change[2])
+            elif len(path) == 3 and kind == "del":
+                self._drop_account(username, path[2])
+            elif len(path) == 4 and path[3] == "status":
+                number = data[username]["accounts"][path[2]]["account_number"]
+                if kind == "set" and change[2] != "active": self.inactive.add(number)
+                else: self.inactive.discard(number)
+
+    # --- SEARCH ---
+    def search(self, query, branch=None, contains=False):
+        """Account numbers whose username or number starts with (or contains) query, case-insensitively.
+
+        Prefix matches on the username come first in username order, then
+        matches on the number. A substring search scans one joined string with
+        str.find, which runs at memory speed rather than per account in Python.
+        """
+        return self.page(query, branch, contains, 0, None)[0]
+
+    def page(self, query, branch=None, contains=False, offset=0, limit=25):
+        """(numbers, total): matches [offset, offset+limit) of search() and how many there are.
+
+        Username prefix matches are a range of the sorted list, so without a
+        branch filter the page is sliced straight out of it; with one, the range
+        is counted in one pass that keeps only the page.
+        """
+        query = query.strip().lower()
+        stop = None if limit is None else offset + limit
+        if contains and query:
+            found = self._contains(query)
+            if branch is not None: found = [n for n in found if self._branch_of.get(n) == branch]
+            return found[offset:stop], len(found)
+        lo = bisect.bisect_left(self._names, (query,))
+        hi = bisect.bisect_left(self._names, (query + "\uffff",), lo)
+        numbers = []
+        if query:
+            start = bisect.bisect_left(self._numbers, query)
+            end = bisect.bisect_left(self._numbers, query + "\uffff", start)
+            numbers = [n for n in self._numbers[start:end] if not self.by_number[n][0].lower().startswith(query)]
+        if branch is None:
+            named = hi - lo
+            page = [number for _, number in self._names[lo + min(offset, named):hi if stop is None else lo + min(stop, named)]]
+        else:
+            numbers = [n for n in numbers if self._branch_of.get(n) == branch]
+            page, named = [], 0
+            for i in range(lo, hi):
+                number = self._names[i][1]
+                if self._branch_of.get(number) != branch: continue
+                if offset <= named and (stop is None or named < stop): page.append(number)
+                named += 1
+        if stop is None or len(page) < stop - offset:
+            page += numbers[max(offset - named, 0):None if stop is None else stop - named]
+        return page, named + len(numbers)
+
+    def _contains(self, query):
+        if self._haystack is None:
+            lines = [f"{name}\t{number}" for name, number in self._names]
+            starts, pos = [], 0
+            for line in lines:
+                starts.append(pos)
+                pos += len(line) + 1
+            self._haystack = ("\n".join(lines), starts)
+        text, starts = self._haystack
+        by_name, by_number, pos = [], [], text.find(query)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            name, number = self._names[i]
+            (by_name if pos < starts[i] + len(name) else by_number).append(number)
+            # Continue after this line, so an account is listed once
+            pos = text.find(query, starts[i + 1]) if i + 1 < len(starts) else -1
+        return by_name + sorted(by_number)
@@ -0,0 +1,90 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# --- CONFIGURATION ---
+WORKERS = 4            # Background jobs running at once per server process
+KEEP_FINISHED = 300    # Seconds a finished job stays in the table for its session to collect it
+
+class Job:
+    """One unit of background work and its live progress.
+
+    The job function receives the Job as its first argument and calls
+    job.update() as it goes; sessions poll the job table instead of holding
+    their script thread for the duration.
+    """
+    __slots__ = ("id", "name", "owner", "status", "done", "total", "message",
+                 "result", "error", "submitted", "started", "finished")
+
+    def __init__(self, job_id, name, owner):
+        self.id = job_id
+        self.name = name
+        self.owner = owner
+        self.status = "queued"  # queued -> running -> done | failed
+        self.done, self.total, self.message = 0, 0, ""
+        self.result = self.error = None
+        self.submitted, self.started, self.finished = time.time(), None, None
+
+    def update(self, done, total=None, message=None):
+        self.done = done
+        if total is not None: self.total = total
+        if message is not None: self.message = message
+
+    @property
+    def fraction(self):
+        if self.status == "done": return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def active(self): return self.status in ("queued", "running")
+
+# --- JOB TABLE ---
+_jobs = {}
+_jobs_lock = threading.Lock()
+_ids = itertools.count(1)
+_pool = None
+
+def _executor():
+    global _pool
+    with _jobs_lock:
+        if _pool is None: _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="bank-job")
+        return _pool
+
+def _execute(job, fn, args, kwargs):
+    job.status, job.started = "running", time.time()
+    try:
+        with metrics.span("jobs.run"): job.result = fn(job, *args, **kwargs)
+        job.status = "done"
+    except Exception as e:
+        job.error = str(e) or type(e).__name__
+        job.message = traceback.format_exc(limit=3)
+        job.status = "failed"
+    finally:
+        job.finished = time.time()
+
+def submit(name, fn, *args, owner=None, **kwargs):
+    """Runs fn(job, *args, **kwargs) on the worker pool; returns the job id."""
+    _prune()
+    with _jobs_lock:
+        job = Job(next(_ids), name, owner)
+        _jobs[job.id] = job
+    _executor().submit(_execute, job, fn, args, kwargs)
+    return job.id
+
+def get(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def jobs(owner=None):
+    """Jobs in submission order, optionally only those of one owner."""
+    with _jobs_lock:
+        return [j for j in _jobs.values() if owner is None or j.owner == owner]
+
+def _prune():
+    cutoff = time.time() - KEEP_FINISHED
+    with _jobs_lock:
+        for job_id in [j.id for j in _jobs.values() if j.finished and j.finished < cutoff]:
+            del _jobs[job_id]
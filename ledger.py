@@ -0,0 +1,460 @@
+import datetime
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+import aggregates
+import amortization
+import ids
+import metrics
+import storage
+import velocity
+from storage import Mutation, load_data, ConflictError
+from models import Account
+from txnlog import make_row, now_timestamp
+
+# --- CONFIGURATION & CONSTANTS ---
+MIN_BALANCE_SAVINGS = 10000
+OVERDRAFT_BASE_LIMIT = 50000
+OVERDRAFT_FIXED_RATE = 0.10  # 10% Flat Rate
+MAX_RETRIES = 5
+
+BRANCH_DATA = {
+    "LJ University": {"code": "LJU001", "address": "S.G. Highway", "tel": "079-111111"},
+    "Bodakdev": {"code": "BDK002", "address": "Judges Bungalow Rd", "tel": "079-222222"},
+    "Gurukul": {"code": "GRK003", "address": "Drive In Rd", "tel": "079-333333"},
+    "Vasna": {"code": "VSN004", "address": "Vasna Barrage Rd", "tel": "079-444444"}
+}
+
+# --- LOAN PRODUCTS ---
+class LoanType:
+    def __init__(self, name, max_amount, min_tenure, max_tenure, base_rate):
+        self.name = name
+        self.max_amount = max_amount
+        self.min_tenure = min_tenure
+        self.max_tenure = max_tenure
+        self.base_rate = base_rate
+
+    def calculate_rate(self, cibil_score):
+        if cibil_score >= 750: return max(0.01, self.base_rate - 0.01)
+        elif 650 <= cibil_score < 750: return self.base_rate
+        else: return self.base_rate + 0.02
+
+LOAN_OPTS = {
+    "Home Loan": LoanType("Home", 5000000, 5, 30, 0.07),
+    "Personal Loan": LoanType("Personal", 500000, 1, 5, 0.10),
+    "Credit Line": LoanType("Credit", 200000, 1, 3, 0.15),
+    "Vehicle Loan": LoanType("Vehicle", 1000000, 2, 7, 0.08)
+}
+
+class LedgerError(Exception):
+    """A banking rule rejected the operation. The message is safe to show to the user."""
+
+# --- BUSINESS RULES ---
+def get_current_date(): return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def get_overdraft_limit(cibil):
+    if cibil >= 750: return 100000
+    elif cibil >= 650: return 75000
+    else: return OVERDRAFT_BASE_LIMIT
+
+def calculate_emi(principal, annual_rate, tenure_years):
+    return amortization.emi(principal, annual_rate, tenure_years)
+
+def add_transaction(mut, username, account_index, t_type, amount, description):
+    current_bal = mut.get([username, "accounts", account_index, "balance"])
+    t = make_row(now_timestamp(), t_type, amount, description, current_bal)
+    mut.append([username, "accounts", account_index, "transactions"], t)
+
+def check_amount(amount):
+    """Raises LedgerError unless amount is a positive, finite number of rupees.
+
+    Checked here and not only by the pages' widgets: the ledger is also called headless.
+    """
+    if not (math.isfinite(amount) and amount > 0): raise LedgerError("Amount must be a positive number.")
+
+def check_debit(acc, amount, overdraft_msg="Insufficient funds. Exceeds overdraft limit."):
+    """Raises LedgerError if acc may not go down by amount."""
+    balance_after = acc["balance"] - amount
+    if acc["account_type"] == "Savings" and balance_after < MIN_BALANCE_SAVINGS:
+        raise LedgerError(f"Cannot withdraw. Minimum balance ₹{MIN_BALANCE_SAVINGS} required.")
+    elif acc["account_type"] == "Current" and balance_after < -get_overdraft_limit(acc["cibil"]):
+        raise LedgerError(overdraft_msg)
+
+def screen_debit(mut, username, idx, acc, amount, recipient=None):
+    """Applies the velocity rules to a customer debit and stages the account's updated counters."""
+    try: state = velocity.screen(acc, amount, recipient)
+    except ValueError as e: raise LedgerError(str(e))
+    mut.set([username, "accounts", idx, "velocity"], state)
+
+# --- LOCKING ---
+# One lock per account number (plus one per shared queue such as "pending_loans").
+# Operations on different accounts run in parallel; the commit itself is a single
+# journal append. Changes made by other server processes are caught by commit()'s
+# guard, and the operation is rebuilt on fresh data instead of overwriting them.
+_locks = {}
+_locks_guard = threading.Lock()
+
+@contextmanager
+def locked(keys):
+    keys = sorted(set(keys))  # Fixed order, so two transfers A->B and B->A cannot deadlock
+    with _locks_guard:
+        held = [_locks.setdefault(k, threading.Lock()) for k in keys]
+    for lock in held: lock.acquire()
+    try: yield
+    finally:
+        for lock in reversed(held): lock.release()
+
+def transact(op, keys, guard, build):
+    """Runs build(data, mut) under the given locks and commits it, retrying on conflicts."""
+    with metrics.span(f"ledger.{op}"):
+        for attempt in range(MAX_RETRIES):
+            with locked(keys):
+                data = load_data()
+                mut = Mutation(data, op)
+                result = build(data, mut)
+                try:
+                    storage.commit(mut, guard=guard)
+                    return result
+                except ConflictError:
+                    pass
+            time.sleep(random.uniform(0, 0.001 * 2 ** attempt))  # Back off so the other writer can finish
+
+        # Still losing the race: shut other writers out while rebuilding, so this attempt cannot conflict
+        with locked(keys), storage.exclusive():
+            data = load_data()
+            mut = Mutation(data, op)
+            result = build(data, mut)
+            storage.commit(mut, guard=guard)
+            return result
+
+def find_account(data, username, account_number, active_only=False):
+    """Returns the account's index in the user's account list."""
+    user = data.get(username)
+    if not isinstance(user, dict) or not user.get("accounts"):
+        raise LedgerError("Account holder not found.")
+    accounts = user["accounts"]
+    owner = storage.locate_account(account_number)
+    if owner and owner[0] == username and owner[1] < len(accounts) and accounts[owner[1]]["account_number"] == account_number:
+        i = owner[1]
+    else:
+        # Index out of step with this copy of the data (e.g. mid-reload): fall back to the user's own accounts
+        i = next((i for i, acc in enumerate(accounts) if acc["account_number"] == account_number), None)
+    if i is None or (active_only and accounts[i].get("status", "active") != "active"):
+        raise LedgerError("Account not found or inactive.")
+    return i
+
+# --- CUSTOMERS ---
+def authenticate(username, password):
+    """True if username is a customer with this password (the admin login is the UI's)."""
+    data = load_data()
+    return storage.is_user(data, username) and data[username]["password"] == password
+
+def verify_pin(username, account_number, pin):
+    data = load_data()
+    try: idx = find_account(data, username, account_number)
+    except LedgerError: return False
+    return data[username]["accounts"][idx].pin == pin
+
+def open_account(username, password, account_type, branch, initial_deposit, pin):
+    """Registers a new customer with one account; returns the account number."""
+    if account_type == "Savings" and initial_deposit < MIN_BALANCE_SAVINGS:
+        raise LedgerError(f"Minimum deposit for a Savings account is ₹{MIN_BALANCE_SAVINGS}.")
+    if not pin.isdigit(): raise LedgerError("PIN must be numeric")
+    if not (math.isfinite(initial_deposit) and initial_deposit >= 0): raise LedgerError("Initial deposit cannot be negative.")
+    b_info = BRANCH_DATA[branch]
+    account_number = ids.new_account_numbers(branch)[0]
+    acc = Account({
+        "account_name": username, "account_number": account_number,
+        "account_type": account_type, "balance": initial_deposit, "pin": pin,
+        "branch_name": branch, "branch_addr": b_info["address"],
+        "ifsc": "BANK" + b_info["code"], "cibil": 550,
+        "transactions": [], "loans": [], "status": "active"
+    })
+    def build(data, mut):
+        if username in data: raise LedgerError("User exists")
+        mut.set([username], {"password": password, "accounts": [acc]})
+        aggregates.record(mut, None, acc)
+        mut.inc(["bank_balance"], initial_deposit)
+    # The username is what two concurrent registrations collide on; the account number is new
+    transact("register", [username, account_number], [username], build)
+    return account_number
+
+def update_cibil(username, account_number, score):
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        mut.set([username, "accounts", idx, "cibil"], score)
+    transact("cibil_update", [account_number], [username], build)
+
+def request_reactivation(username, account_number, message):
+    if not message.strip(): raise LedgerError("Message cannot be empty.")
+    def build(data, mut):
+        find_account(data, username, account_number)
+        if any(r["username"] == username and r["account_number"] == account_number for r in data["reactivation_requests"]):
+            raise LedgerError("A request is already pending for this account.")
+        mut.append(["reactivation_requests"], {
+            "username": username, "account_number": account_number,
+            "message": message, "date": get_current_date()
+        })
+    transact("reactivation_request", ["reactivation_requests"], [username, "reactivation_requests"], build)
+
+def apply_loan(username, account_number, loan_type, principal, tenure_years):
+    """Files a loan request for admin approval, priced on the account's CIBIL score; returns its id."""
+    product = LOAN_OPTS[loan_type]
+    if not 0 < principal <= product.max_amount: raise LedgerError(f"Amount must be at most ₹{product.max_amount:,}.")
+    if not product.min_tenure <= tenure_years <= product.max_tenure:
+        raise LedgerError(f"Tenure must be {product.min_tenure} to {product.max_tenure} years.")
+    data = load_data()
+    branch = data[username]["accounts"][find_account(data, username, account_number)].get("branch_name")
+    req_id = ids.new_loan_ids(branch if branch in BRANCH_DATA else next(iter(BRANCH_DATA)))[0]
+    def build(data, mut):
+        idx = find_account(data, username, account_number, active_only=True)
+        rate = product.calculate_rate(data[username]["accounts"][idx]["cibil"])
+        mut.append(["pending_loans"], {
+            "id": req_id, "username": username, "account_index": idx,
+            "account_number": account_number,
+            "type": loan_type, "principal": principal, "interest_rate": f"{rate*100}%",
+            "tenure_years": tenure_years
+        })
+    transact("loan_apply", [account_number, "pending_loans"], [username, "pending_loans"], build)
+    return req_id
+
+# --- LEDGER OPERATIONS ---
+def deposit(username, account_number, amount, description="Cash Deposit"):
+    check_amount(amount)
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        path = [username, "accounts", idx, "balance"]
+        balance = mut.get(path)
+        aggregates.balance_moved(mut, data[username]["accounts"][idx], balance, balance + amount)
+        mut.set(path, balance + amount)
+        mut.inc(["bank_balance"], amount)
+        add_transaction(mut, username, idx, "CREDIT", amount, description)
+    transact("deposit", [account_number], [username], build)
+
+def withdraw(username, account_number, amount, description="Cash Withdrawal"):
+    check_amount(amount)
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        acc = data[username]["accounts"][idx]
+        check_debit(acc, amount, "Exceeds overdraft limit.")
+        screen_debit(mut, username, idx, acc, amount)
+        aggregates.balance_moved(mut, acc, acc["balance"], acc["balance"] - amount)
+        mut.set([username, "accounts", idx, "balance"], acc["balance"] - amount)
+        mut.inc(["bank_balance"], -amount)
+        add_transaction(mut, username, idx, "DEBIT", amount, description)
+    transact("withdraw", [account_number], [username], build)
+
+def transfer(username, account_number, recipient_username, recipient_account_number, amount):
+    """recipient_username may be left empty: the account number alone identifies the recipient."""
+    check_amount(amount)
+    if not ids.valid_account_number(recipient_account_number):
+        raise LedgerError("Invalid account number: the check digit does not match.")
+    if not recipient_username:
+        owner = storage.locate_account(recipient_account_number)
+        if owner is None: raise LedgerError("Recipient account not found or inactive.")
+        recipient_username = owner[0]
+
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        if not isinstance(data.get(recipient_username), dict) or not data[recipient_username].get("accounts"):
+            raise LedgerError("Recipient not found.")
+        try: rec_idx = find_account(data, recipient_username, recipient_account_number, active_only=True)
+        except LedgerError: raise LedgerError("Recipient account not found or inactive.")
+        check_debit(data[username]["accounts"][idx], amount)
+        screen_debit(mut, username, idx, data[username]["accounts"][idx], amount, recipient_account_number)
+
+        sender_path = [username, "accounts", idx, "balance"]
+        recipient_path = [recipient_username, "accounts", rec_idx, "balance"]
+        sender_balance, recipient_balance = mut.get(sender_path), mut.get(recipient_path)
+        aggregates.balance_moved(mut, data[username]["accounts"][idx], sender_balance, sender_balance - amount)
+        aggregates.balance_moved(mut, data[recipient_username]["accounts"][rec_idx], recipient_balance, recipient_balance + amount)
+        mut.set(sender_path, sender_balance - amount)
+        add_transaction(mut, username, idx, "DEBIT", amount, f"Transfer to {recipient_username} ({recipient_account_number})")
+        mut.set(recipient_path, mut.get(recipient_path) + amount)
+        add_transaction(mut, recipient_username, rec_idx, "CREDIT", amount, f"Transfer from {username} ({account_number})")
+    transact("transfer", [account_number, recipient_account_number], [username, recipient_username], build)
+
+def _pending_loan(data, loan_id):
+    for i, req in enumerate(data["pending_loans"]):
+        if req["id"] == loan_id: return i, req
+    raise LedgerError("Loan request is no longer pending.")
+
+def _loan_account(data, req):
+    """Resolves the account a pending loan was requested against."""
+    if "account_number" in req:
+        return find_account(data, req["username"], req["account_number"])
+    if not isinstance(data.get(req["username"]), dict):
+        raise LedgerError("Account holder not found.")
+    return req["account_index"]  # Requests filed before account numbers were recorded
+
+def _loan_keys(loan_id):
+    data = load_data()
+    req = _pending_loan(data, loan_id)[1]
+    acc_idx = _loan_account(data, req)
+    return req, ["pending_loans", data[req["username"]]["accounts"][acc_idx]["account_number"]]
+
+def _disburse(data, mut, req):
+    u, acc_idx = req["username"], _loan_account(data, req)
+    rate_val = float(req["interest_rate"].strip('%')) / 100
+    emi, total_p, total_interest = amortization.quote(req["principal"], rate_val, req["tenure_years"])
+
+    loan_record = {
+        "id": req["id"], "type": req["type"], "principal": req["principal"],
+        "total_amount_payable": total_p, "total_paid": 0, "remaining_amount": total_p,
+        "total_interest": total_interest, "emi_amount": emi,
+        "interest_rate": rate_val, "tenure_years": req["tenure_years"],
+        "outstanding_principal": req["principal"],
+        "status": "Active", "date": get_current_date()
+    }
+    balance_path = [u, "accounts", acc_idx, "balance"]
+    acc, balance = data[u]["accounts"][acc_idx], mut.get(balance_path)
+    aggregates.record(mut, dict(acc, balance=balance, loans=[]),
+                      dict(acc, balance=balance + req["principal"], loans=[loan_record]))
+    mut.append([u, "accounts", acc_idx, "loans"], loan_record)
+    mut.set(balance_path, balance + req["principal"])
+    mut.inc(["bank_balance"], -req["principal"])
+    add_transaction(mut, u, acc_idx, "CREDIT", req["principal"], f"Loan Disbursed: {req['id']}")
+
+def _decline(data, mut, req):
+    u, acc_idx = req["username"], _loan_account(data, req)
+    rej_record = {"id": req["id"], "type": req["type"], "status": "Rejected", "date": get_current_date()}
+    mut.append([u, "accounts", acc_idx, "loans"], rej_record)
+
+LOAN_DECISIONS = {"approve": _disburse, "reject": _decline}
+
+def approve_loan(loan_id):
+    req, keys = _loan_keys(loan_id)
+    def build(data, mut):
+        pos, req = _pending_loan(data, loan_id)
+        _disburse(data, mut, req)
+        mut.delete(["pending_loans", pos])
+    transact("loan_approve", keys, ["pending_loans", req["username"]], build)
+
+def reject_loan(loan_id):
+    req, keys = _loan_keys(loan_id)
+    def build(data, mut):
+        pos, req = _pending_loan(data, loan_id)
+        _decline(data, mut, req)
+        mut.delete(["pending_loans", pos])
+    transact("loan_reject", keys, ["pending_loans", req["username"]], build)
+
+def decide_loans(decisions, progress=None):
+    """Approves and rejects many pending loans in one atomic commit.
+
+    decisions maps loan id -> "approve" or "reject". A request that cannot be
+    processed (no longer pending, account gone) is reported and skipped; the
+    rest are still applied. Returns one report row per decision.
+    progress(done, total) is called as requests are processed.
+    """
+    data = load_data()
+    keys, guard = {"pending_loans"}, {"pending_loans"}
+    for req in data["pending_loans"]:
+        if req["id"] not in decisions: continue
+        guard.add(req["username"])
+        try: keys.add(data[req["username"]]["accounts"][_loan_account(data, req)]["account_number"])
+        except (LedgerError, KeyError, IndexError): pass  # Reported by build()
+
+    def build(data, mut):
+        pending = {req["id"]: (pos, req) for pos, req in enumerate(data["pending_loans"])}
+        report, done = [], []
+        for n, (loan_id, action) in enumerate(decisions.items()):
+            if progress: progress(n, len(decisions))
+            row = {"id": loan_id, "action": action, "username": None, "principal": None}
+            if loan_id not in pending:
+                report.append(dict(row, result="Failed", detail="Loan request is no longer pending."))
+                continue
+            pos, req = pending[loan_id]
+            row.update(username=req["username"], principal=req["principal"])
+            try: LOAN_DECISIONS[action](data, mut, req)
+            except LedgerError as e:
+                report.append(dict(row, result="Failed", detail=str(e)))
+                continue
+            done.append(pos)
+            report.append(dict(row, result="Approved" if action == "approve" else "Rejected", detail=""))
+        # Delete from the back so earlier positions stay valid
+        for pos in sorted(done, reverse=True): mut.delete(["pending_loans", pos])
+        return report
+    return transact("loan_batch", keys, guard, build)
+
+def _find_loan(acc, loan_id):
+    for i, loan in enumerate(acc["loans"]):
+        if loan["id"] == loan_id and loan["status"] == "Active": return i, loan
+    raise LedgerError("Loan not found or already closed.")
+
+def repay_loan(username, account_number, loan_id, amount):
+    """Pays amount towards an active loan; returns the amount actually charged.
+
+    The payment covers this month's interest first and the rest comes off the
+    principal, after which the remaining schedule is rebuilt at the same EMI.
+    """
+    check_amount(amount)
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        acc = data[username]["accounts"][idx]
+        loan_idx, loan = _find_loan(acc, loan_id)
+        rate, outstanding = amortization.loan_terms(loan)
+        charged, outstanding = amortization.apply_payment(outstanding, rate, amount)
+        charged = round(charged, 2)  # amount may be a sum of float EMIs
+        if acc["balance"] < charged: raise LedgerError("Insufficient Funds")
+
+        remaining = 0.0
+        if outstanding > 0:
+            remaining = round(float(amortization.remaining_schedule(outstanding, rate, loan["emi_amount"])["payment"].sum()), 2)
+        total_paid = loan["total_paid"] + charged
+        loan_path = [username, "accounts", idx, "loans", loan_idx]
+        paid_loan = dict(loan, outstanding_principal=outstanding, interest_rate=rate, status="Active" if outstanding > 0 else "Closed")
+        aggregates.record(mut, dict(acc, loans=[loan]), dict(acc, balance=acc["balance"] - charged, loans=[paid_loan]))
+        mut.inc([username, "accounts", idx, "balance"], -charged)
+        mut.set(loan_path + ["total_paid"], total_paid)
+        mut.set(loan_path + ["remaining_amount"], remaining)
+        mut.set(loan_path + ["total_interest"], round(total_paid + remaining - loan["principal"], 2))
+        mut.set(loan_path + ["interest_rate"], rate)
+        mut.set(loan_path + ["outstanding_principal"], outstanding)
+        if loan.get("emi_due"): mut.set(loan_path + ["emi_due"], round(max(0.0, loan["emi_due"] - charged), 2))
+        if outstanding <= 0: mut.set(loan_path + ["status"], "Closed")
+        add_transaction(mut, username, idx, "DEBIT", charged, f"Loan EMI Payment {loan_id}")
+        return charged
+    return transact("emi_payment", [account_number], [username], build)
+
+def remove_account(username, account_number):
+    """Deletes an account, and the user entry with it once no accounts are left."""
+    user = load_data().get(username)
+    if not isinstance(user, dict): raise LedgerError("Account holder not found.")
+    # Removing shifts the positions of the user's other accounts, so lock all of them
+    keys = [acc["account_number"] for acc in user["accounts"]]
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        aggregates.record(mut, data[username]["accounts"][idx], None)
+        if len(data[username]["accounts"]) == 1:
+            mut.delete([username])
+        else:
+            mut.delete([username, "accounts", idx])
+    transact("remove_account", keys, [username], build)
+
+def deactivate_account(username, account_number, reason):
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        acc = data[username]["accounts"][idx]
+        if acc.get("status") == "deactivated":
+            raise LedgerError("Account is already deactivated.")
+        aggregates.record(mut, acc, dict(acc, status="deactivated"))
+        mut.set([username, "accounts", idx, "status"], "deactivated")
+        mut.set([username, "accounts", idx, "admin_note"], reason)
+    transact("deactivate", [account_number], [username], build)
+
+def reactivate_account(username, account_number):
+    """Reactivates an account and clears its pending reactivation requests."""
+    def build(data, mut):
+        idx = find_account(data, username, account_number)
+        acc = data[username]["accounts"][idx]
+        aggregates.record(mut, acc, dict(acc, status="active"))
+        mut.set([username, "accounts", idx, "status"], "active")
+        if "admin_note" in data[username]["accounts"][idx]: mut.delete([username, "accounts", idx, "admin_note"])
+        requests = data["reactivation_requests"]
+        # Delete from the back so earlier positions stay valid
+        for pos in reversed(range(len(requests))):
+            if requests[pos]["username"] == username and requests[pos]["account_number"] == account_number:
+                mut.delete(["reactivation_requests", pos])
+    transact("reactivate", [account_number, "reactivation_requests"], [username, "reactivation_requests"], build)
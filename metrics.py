@@ -0,0 +1,110 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+ENABLED = os.environ.get("BANK_METRICS", "1") != "0"
+# Latency histogram bucket upper bounds in milliseconds (log-spaced); the last bucket is open-ended
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Metric:
+    """Call count, latency histogram and byte counters of one instrumented name.
+
+    Recording is a bisect into fixed buckets plus a few additions, so it costs
+    about a microsecond and needs no sample storage however long the server runs.
+    """
+    __slots__ = ("calls", "total", "max", "buckets", "bytes_read", "bytes_written", "errors")
+
+    def __init__(self):
+        self.calls, self.total, self.max, self.errors = 0, 0.0, 0.0, 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.bytes_read = self.bytes_written = 0
+
+    def percentile(self, q):
+        """Upper bound (ms) of the bucket holding the q-th call; the max for the open-ended bucket."""
+        if not self.calls: return 0.0
+        rank, seen = q * self.calls, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank: return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+_metrics = {}
+_lock = threading.Lock()
+_since = time.time()
+
+def _metric(name):
+    m = _metrics.get(name)
+    if m is None:
+        with _lock: m = _metrics.setdefault(name, Metric())
+    return m
+
+# --- RECORDING ---
+def record(name, seconds, error=False):
+    if not ENABLED: return
+    ms = seconds * 1000
+    m = _metric(name)
+    with _lock:
+        m.calls += 1
+        m.total += ms
+        if ms > m.max: m.max = ms
+        m.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        if error: m.errors += 1
+
+def add_bytes(name, read=0, written=0):
+    if not ENABLED: return
+    m = _metric(name)
+    with _lock:
+        m.bytes_read += read
+        m.bytes_written += written
+
+@contextmanager
+def span(name):
+    """Times the block under name; a block that raises is also counted as an error."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        record(name, time.perf_counter() - started, failed)
+
+def timed(name):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name): return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+# --- READING ---
+def snapshot():
+    """One row per name, sorted by total time spent."""
+    with _lock:
+        rows = [{"name": name, "calls": m.calls, "errors": m.errors, "total_ms": round(m.total, 3),
+                 "mean_ms": round(m.total / m.calls, 3) if m.calls else 0.0,
+                 "p50_ms": m.percentile(0.50), "p95_ms": m.percentile(0.95), "p99_ms": m.percentile(0.99),
+                 "max_ms": round(m.max, 3), "bytes_read": m.bytes_read, "bytes_written": m.bytes_written}
+                for name, m in _metrics.items()]
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+def export():
+    """Machine-readable dump: the rows plus the raw histograms, as JSON text."""
+    with _lock:
+        histograms = {name: m.buckets[:] for name, m in _metrics.items()}
+    return json.dumps({"since": _since, "at": time.time(), "buckets_ms": BUCKETS_MS,
+                       "metrics": snapshot(), "histograms": histograms}, indent=2)
+
+def reset():
+    global _since
+    with _lock:
+        _metrics.clear()
+        _since = time.time()
@@ -0,0 +1,113 @@
+import sys
+from collections.abc import MutableMapping
+from txnlog import TxnLog
+
+class _Missing:
+    """Marks a slot whose field the stored record did not have."""
+    __slots__ = ()
+    def __repr__(self): return "MISSING"
+    def __reduce__(self): return "MISSING"
+
+MISSING = _Missing()
+
+class Record(MutableMapping):
+    """A fixed set of fields in __slots__, behaving as the dict it was loaded from.
+
+    Pages, the ledger and the journal all address records by key (acc["balance"],
+    [user, "accounts", 0, "balance"]), so a record is a mapping; but a slot costs
+    8 bytes where a dict entry costs about 30 plus the table's spare room. Keys
+    outside FIELDS (rare or newer ones) go to a small overflow dict. Repeated
+    strings such as branch names are interned, so a bank holds one copy of each.
+    """
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    INTERNED = ()
+
+    def __init__(self, stored=()):
+        if not isinstance(stored, (dict, Record)): stored = dict(stored)
+        # Filled a slot at a time rather than through __setitem__: this runs once per account on every load
+        for f in self.FIELDS: setattr(self, f, stored.get(f, MISSING))
+        for f in self.INTERNED:
+            value = getattr(self, f)
+            if type(value) is str: setattr(self, f, sys.intern(value))
+        self._extra = {k: v for k, v in stored.items() if k not in self.FIELDS} or None
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not MISSING: return value
+        elif self._extra and key in self._extra: return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            if key in self.INTERNED and type(value) is str: value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None: self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS and getattr(self, key) is not MISSING: setattr(self, key, MISSING)
+        elif self._extra and key in self._extra: del self._extra[key]
+        else: raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.FIELDS: return getattr(self, key) is not MISSING
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        for f in self.FIELDS:
+            if getattr(self, f) is not MISSING: yield f
+        if self._extra: yield from self._extra
+
+    def __len__(self):
+        return sum(getattr(self, f) is not MISSING for f in self.FIELDS) + len(self._extra or ())
+
+    def get(self, key, default=None):  # Hot path: skips the KeyError of the generic Mapping.get
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        return self._extra.get(key, default) if self._extra else default
+
+    def to_stored(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_stored()!r})"
+
+class Loan(Record):
+    __slots__ = ("id", "type", "status", "date", "principal", "interest_rate", "tenure_years", "emi_amount",
+                 "total_amount_payable", "total_paid", "remaining_amount", "total_interest",
+                 "outstanding_principal", "emi_due", "last_due", "penalties")
+    FIELDS = frozenset(__slots__)
+    INTERNED = frozenset(("type", "status"))
+
+class Account(Record):
+    __slots__ = ("account_name", "account_number", "account_type", "balance", "pin", "branch_name", "branch_addr",
+                 "ifsc", "cibil", "status", "transactions", "loans")
+    FIELDS = frozenset(__slots__)
+    INTERNED = frozenset(("account_name", "account_type", "pin", "branch_name", "branch_addr", "ifsc", "status"))
+
+    def __setitem__(self, key, value):
+        if key == "transactions": value = TxnLog.from_stored([] if value is None else value)
+        elif key == "loans": value = LoanList(to_loan(loan) for loan in value)
+        super().__setitem__(key, value)
+
+    def __init__(self, stored=()):
+        super().__init__(stored)
+        txns = self.transactions  # Not truth-tested: that would make a LazyTxnLog read its rows
+        self.transactions = TxnLog() if txns is MISSING or txns is None else TxnLog.from_stored(txns)
+        self.loans = LoanList() if self.loans is MISSING else LoanList(map(to_loan, self.loans))
+
+class LoanList(list):
+    """An account's loans: appended loans become Loan records too."""
+    __slots__ = ()
+    def append(self, loan): super().append(to_loan(loan))
+
+def to_loan(loan):
+    return loan if isinstance(loan, Loan) else Loan(loan)
+
+def to_account(acc):
+    """The Account form of a stored account dict (unchanged if it already is one)."""
+    return acc if isinstance(acc, Account) else Account(acc)
@@ -0,0 +1,149 @@
+import csv
+import json
+import math
+import os
+import aggregates
+import ledger
+import storage
+from ledger import LedgerError, check_debit, find_account
+from txnlog import make_row, now_timestamp
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 5000  # Postings applied per atomic commit
+FIELDS = ["from_account", "to_account", "amount", "narration"]
+REPORT_FIELDS = ["line"] + FIELDS + ["result", "detail"]
+
+# --- INPUT ---
+def read_postings(path):
+    """Yields (line, posting) from a CSV with a FIELDS header or from JSONL.
+
+    A posting without from_account is a credit paid in from outside the bank
+    (payroll), so it raises the recipient and the bank's liquidity alike.
+    Lines that cannot be parsed are yielded with the error instead of a posting.
+    """
+    with open(path, newline="") as f:
+        if os.path.splitext(path)[1].lower() in (".jsonl", ".json"):
+            for n, line in enumerate(f, 1):
+                if not line.strip(): continue
+                try: yield n, _posting(json.loads(line))
+                except (ValueError, TypeError, AttributeError) as e: yield n, str(e)
+        else:
+            for n, row in enumerate(csv.DictReader(f), 2):  # Line 1 is the header
+                try: yield n, _posting(row)
+                except (ValueError, TypeError) as e: yield n, str(e)
+
+def _posting(row):
+    amount = float(row.get("amount") or "nan")
+    if not (math.isfinite(amount) and amount > 0): raise ValueError("Amount must be a positive number.")
+    posting = {"from_account": str(row.get("from_account") or "").strip(), "to_account": str(row.get("to_account") or "").strip(),
+               "amount": round(amount, 2), "narration": str(row.get("narration") or "").strip()}
+    if not posting["to_account"]: raise ValueError("to_account is required.")
+    if posting["from_account"] == posting["to_account"]: raise ValueError("Cannot post to the same account.")
+    return posting
+
+# --- POSTING ---
+def _post_chunk(chunk):
+    """Applies one chunk of (line, posting) in a single commit; returns its report rows."""
+    owners = storage.locate_accounts({n for _, p in chunk for n in (p["from_account"], p["to_account"]) if n})
+    keys, guard = list(owners), {owner[0] for owner in owners.values()}
+
+    def build(data, mut):
+        accounts = {}  # account number -> [username, index, account, running balance, rows]
+        def account(number, role):
+            if number not in accounts:
+                owner = owners.get(number)
+                if owner is None: raise LedgerError(f"{role} account not found.")
+                u, idx = owner
+                accs = data[u]["accounts"] if storage.is_user(data, u) else []
+                if idx >= len(accs) or accs[idx]["account_number"] != number:
+                    try: idx = find_account(data, u, number)  # Moved since the lookup
+                    except LedgerError: raise LedgerError(f"{role} account not found.")
+                acc = data[u]["accounts"][idx]
+                if acc.get("status", "active") != "active": raise LedgerError(f"{role} account is inactive.")
+                accounts[number] = [u, idx, acc, acc["balance"], []]
+            return accounts[number]
+
+        ts, report, cash_in = now_timestamp(), [], 0.0
+        for line, p in chunk:
+            row = dict(p, line=line, result="Accepted", detail="")
+            amount = p["amount"]
+            try:
+                recipient = account(p["to_account"], "Recipient")
+                if p["from_account"]:
+                    sender = account(p["from_account"], "Sender")
+                    check_debit(dict(sender[2], balance=sender[3]), amount)
+            except LedgerError as e:
+                report.append(dict(row, result="Rejected", detail=str(e)))
+                continue
+            if p["from_account"]:
+                sender[3] = round(sender[3] - amount, 2)
+                sender[4].append(make_row(ts, "DEBIT", amount, p["narration"] or f"Transfer to {recipient[0]} ({p['to_account']})", sender[3]))
+                description = p["narration"] or f"Transfer from {sender[0]} ({p['from_account']})"
+            else:
+                cash_in += amount
+                description = p["narration"] or "Batch Credit"
+            recipient[3] = round(recipient[3] + amount, 2)
+            recipient[4].append(make_row(ts, "CREDIT", amount, description, recipient[3]))
+            report.append(row)
+
+        # One balance update and one history extension per account, however many postings touched it
+        stats = {}
+        for u, idx, acc, balance, rows in accounts.values():
+            if not rows: continue
+            for group, key, delta in aggregates.balance_deltas(acc, acc["balance"], balance):
+                stats[group, key] = stats.get((group, key), 0) + delta
+            mut.set([u, "accounts", idx, "balance"], balance)
+            mut.extend([u, "accounts", idx, "transactions"], rows)
+        for (group, key), delta in stats.items():
+            if round(delta, 2): mut.inc(["stats", group, key], round(delta, 2))
+        if cash_in: mut.inc(["bank_balance"], round(cash_in, 2))
+        return report
+    return ledger.transact("batch_post", keys, guard, build)
+
+def post(postings, batch_size=BATCH_SIZE, progress=None):
+    """Validates and applies (line, posting) pairs in atomic batches; returns one report row per line.
+
+    Postings are checked in order against the running balances, with the same
+    minimum-balance and overdraft rules as a transfer, so a rejected line never
+    stops the rest of its batch. progress(done, None) is called after every batch.
+    The velocity limits are not applied: they screen customer-initiated debits,
+    and a posting file is an operator's run in which one payer (an employer's
+    payroll) legitimately debits hundreds of times.
+    """
+    report, chunk, done = [], [], 0
+    def flush():
+        nonlocal done
+        if chunk: report.extend(_post_chunk(chunk))
+        done += len(chunk)
+        chunk.clear()
+        if progress: progress(done, None)
+    with storage.bulk():
+        for line, p in postings:
+            if isinstance(p, str):
+                report.append({"line": line, "result": "Rejected", "detail": p})
+                continue
+            chunk.append((line, p))
+            if len(chunk) >= batch_size: flush()
+        flush()
+    return sorted(report, key=lambda r: r["line"])
+
+def write_report(report, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(report)
+
+if __name__ == "__main__":
+    import argparse, time
+    parser = argparse.ArgumentParser(description="Post a CSV/JSONL file of transfers and credits in atomic batches")
+    parser.add_argument("file", help="CSV (from_account,to_account,amount,narration) or .jsonl")
+    parser.add_argument("--report", help="Per-line report CSV (default: <file>.report.csv)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    report = post(read_postings(args.file), args.batch_size)
+    elapsed = time.perf_counter() - started
+    write_report(report, args.report or args.file + ".report.csv")
+    accepted = sum(r["result"] == "Accepted" for r in report)
+    print(f"{accepted:,} accepted, {len(report) - accepted:,} rejected in {elapsed:.2f}s "
+          f"({len(report) / elapsed if elapsed else 0:,.0f} postings/sec)")
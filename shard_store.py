@@ -0,0 +1,443 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+import metrics
+from indexes import AccountIndex
+from storage import (Store, ConflictError, GLOBAL_KEYS, apply_changes, default_data, directory_row, dumps,
+                     is_user, normalize_user)
+from txnlog import LazyTxnLog, TxnLog
+
+try: import fcntl
+except ImportError: fcntl = None  # Windows: only one server process may write
+
+GLOBALS = tuple(k for k in GLOBAL_KEYS if k != "journal_seq")
+CACHE_SHARDS = 4096  # Parsed shards kept per process (least recently used are dropped)
+DIRECTORY = "directory.json"
+DIRECTORY_LOG = "directory.log"
+DIRECTORY_LOG_BYTES = 1024 * 1024  # Fold the directory log into the directory past this size
+
+class ShardView(MutableMapping):
+    """Lazily filled stand-in for the bank dict, one shard file per key.
+
+    A user's shard is read the first time the page asks for that user, so a
+    login or a deposit touches that user and nobody else. The version of every
+    key read is remembered for commit()'s conflict check.
+    """
+    def __init__(self, store):
+        self._store = store
+        self._rows = {}
+        self.versions = {}
+
+    def __getitem__(self, key):
+        if key not in self._rows:
+            self._rows[key] = self._store._fetch(key, self.versions)
+        return self._rows[key]
+
+    def __setitem__(self, key, value): self._rows[key] = value
+    def __delitem__(self, key): self._rows.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._rows or self._store._exists(key)
+
+    def __iter__(self):
+        yield from GLOBALS
+        yield from self._store.usernames()
+
+    def __len__(self): return len(GLOBALS) + len(self._store.usernames())
+
+    def forget(self, keys):
+        for key in keys:
+            self._rows.pop(key, None)
+            self.versions.pop(key, None)
+
+class ShardStore(Store):
+    """One JSON file per user plus one per global key, under a directory.
+
+    users/<bucket>/<username>.json      a user and their accounts (bucket = hash prefix)
+    history/<bucket>/<number>.jsonl     an account's transactions, appended to by each commit
+    globals/<key>.json                  bank_balance, pending_loans, ...
+    directory.json                      username -> [[account number, branch, IFSC], ...]
+    directory.log                       {username: entries or null} per commit since directory.json
+
+    A user's shard holds, per account, the length of its history file instead
+    of the rows, so a commit rewrites a small shard and appends its own rows to
+    the history. The directory serves locate() and the admin searches without
+    opening every shard. A commit that adds, removes or moves an account appends
+    just that user's entries to the directory log; checkpoint() folds the log
+    into directory.json.
+
+    A commit writes the new shards beside the old ones, then records the
+    renames and appends in intent.json and performs them. Whoever finds an
+    intent left by a crash finishes it, so a transfer between two users' shards
+    is applied to both or to neither.
+    """
+    def __init__(self, root):
+        self.root = root
+        for sub in ("users", "globals", "history"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self._lock = threading.RLock()
+        self._flock_depth = 0
+        self._cache = OrderedDict()  # path -> (marker, parsed shard)
+        self._dir = None  # [(directory.json marker, log inode), log bytes applied, directory, AccountIndex or None]
+        with self._lock, self._file_lock():
+            self._recover()
+            if not os.path.exists(self._dir_path()): self._build_directory()
+
+    # --- LAYOUT ---
+    def _path(self, key):
+        if key in GLOBALS: return os.path.join(self.root, "globals", f"{key}.json")
+        bucket = hashlib.sha1(key.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root, "users", bucket, quote(key, safe="") + ".json")
+
+    def _history(self, account_number):
+        bucket = hashlib.sha1(account_number.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root, "history", bucket, quote(account_number, safe="") + ".jsonl")
+
+    def _dir_path(self):
+        return os.path.join(self.root, DIRECTORY)
+
+    def _log_path(self):
+        return os.path.join(self.root, DIRECTORY_LOG)
+
+    @staticmethod
+    def _marker(path):
+        try:
+            st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError: return None
+
+    # --- LOCKING ---
+    @contextmanager
+    def _file_lock(self):
+        """Serializes commits between server processes. Reentrant; hold self._lock first."""
+        if fcntl is None or self._flock_depth:
+            self._flock_depth += 1
+            try: yield
+            finally: self._flock_depth -= 1
+            return
+        with open(os.path.join(self.root, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._flock_depth += 1
+            try: yield
+            finally:
+                self._flock_depth -= 1
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        with self._lock, self._file_lock():
+            yield
+
+    # --- READS ---
+    def load(self):
+        return ShardView(self)
+
+    def usernames(self):
+        return sorted(self._directory()[0])
+
+    def _directory(self):
+        """(directory, AccountIndex over it): directory.json, plus the log lines other processes appended.
+
+        A checkpoint replaces both files, so either one's identity changing means a full re-read.
+        """
+        marker, log = self._marker(self._dir_path()), self._marker(self._log_path())
+        with self._lock:
+            if self._dir is None or self._dir[0] != (marker, log and log[0]):
+                marker, names = self._read(self._dir_path())
+                self._dir = [(marker, log and log[0]), 0, names or {}, None]
+            if log and log[2] > self._dir[1]:
+                with open(self._log_path(), "rb") as f:
+                    f.seek(self._dir[1])
+                    for line in f:
+                        if not line.endswith(b"\n"): break  # Still being appended
+                        self._dir[1] += len(line)
+                        self._update_directory(json.loads(line))
+            _, _, names, index = self._dir
+            if index is None:
+                index = self._dir[3] = AccountIndex()
+                index.rebuild({u: self._as_user(entries) for u, entries in names.items()})
+            return names, index
+
+    @staticmethod
+    def _as_user(entries):
+        return {"accounts": [{"account_number": n, "branch_name": b, "ifsc": i} for n, b, i in entries]}
+
+    def _update_directory(self, updates):
+        """Applies {username: entries, or None for a removed user} to the cached directory and its index."""
+        _, _, names, index = self._dir
+        for username, entries in updates.items():
+            if entries is None: names.pop(username, None)
+            else: names[username] = entries
+            if index is not None:
+                index.apply(names, [["del", [username]] if entries is None else ["set", [username], self._as_user(entries)]])
+
+    def _account(self, owner, account_number):
+        """(username, position) of the account in the user's shard as it is now, or None.
+
+        The directory may be a commit behind the shard, so its position is checked.
+        """
+        if owner is None: return None
+        username, pos = owner
+        try: accounts = self._fetch(username, {})["accounts"]
+        except KeyError: return None
+        if pos < len(accounts) and accounts[pos]["account_number"] == account_number: return owner
+        pos = next((i for i, acc in enumerate(accounts) if acc["account_number"] == account_number), None)
+        return None if pos is None else (username, pos)
+
+    def locate(self, account_number):
+        return self._account(self._directory()[1].locate(account_number), account_number)
+
+    def locate_many(self, account_numbers):
+        index = self._directory()[1]
+        found = {}
+        for number in account_numbers:
+            owner = self._account(index.locate(number), number)
+            if owner: found[number] = owner
+        return found
+
+    def search_accounts(self, query, branch=None, contains=False, offset=0, limit=25):
+        """Searched in the directory; only the shards of the accounts on the page are read."""
+        index = self._directory()[1]
+        found, total = index.page(query, branch, contains, offset, limit)
+        rows = []
+        for number in found:
+            owner = self._account(index.locate(number), number)
+            if owner: rows.append(directory_row(owner[0], self._fetch(owner[0], {})["accounts"][owner[1]]))
+        return rows, total
+
+    def branch_accounts(self, branch_name=None, ifsc=None):
+        index = self._directory()[1]
+        if ifsc is not None:
+            numbers = index.by_ifsc.get(ifsc, set())
+            if branch_name is not None: numbers = numbers & index.by_branch.get(branch_name, set())
+        elif branch_name is not None: numbers = index.by_branch.get(branch_name, set())
+        else: numbers = index.by_number.keys()
+        return list(numbers)
+
+    def _exists(self, key):
+        return key in GLOBALS or os.path.exists(self._path(key))
+
+    def _read(self, path):
+        """(marker, parsed shard) straight from disk; (None, None) if it does not exist."""
+        try:
+            with open(path) as f:
+                st = os.fstat(f.fileno())  # The file actually read, even if it is replaced meanwhile
+                metrics.add_bytes("storage.load", read=st.st_size)
+                return (st.st_ino, st.st_mtime_ns, st.st_size), json.load(f)
+        except FileNotFoundError: return None, None
+
+    def _fetch(self, key, versions):
+        path = self._path(key)
+        marker = self._marker(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == marker:
+                self._cache.move_to_end(path)
+                versions[key] = marker
+                return cached[1]
+        marker, value = self._read(path)
+        if marker is None:
+            if key in GLOBALS: value = default_data()[key]
+            else: raise KeyError(key)
+        elif key not in GLOBALS:
+            for acc in value["accounts"]:
+                if "history" in acc:  # Read when something uses the rows, up to this version's length
+                    history, size = self._history(acc["account_number"]), acc.pop("history")
+                    acc["transactions"] = LazyTxnLog(lambda history=history, size=size: self._read_history(history, size))
+            normalize_user(value)
+        versions[key] = marker
+        with self._lock:
+            self._cache[path] = (marker, value)
+            if len(self._cache) > CACHE_SHARDS: self._cache.popitem(last=False)
+        return value
+
+    def _read_history(self, path, size):
+        """The log in the first size bytes of a history file.
+
+        Each line is either a list of appended rows or a whole log in column
+        form, which starts the history afresh (a new account, a replaced user).
+        """
+        log = TxnLog()
+        try:
+            with open(path, "rb") as f: text = f.read(size)
+        except FileNotFoundError: return log
+        metrics.add_bytes("storage.load", read=len(text))
+        for line in text.splitlines():
+            part = json.loads(line)
+            if isinstance(part, dict): log = TxnLog.from_stored(part)
+            else: log.extend(part)
+        return log
+
+    def _build_directory(self):
+        """Writes the directory of a store created before it existed, from the user shards."""
+        names = {}
+        for bucket in os.scandir(os.path.join(self.root, "users")):
+            if not bucket.is_dir(): continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(".json"): continue
+                user = self._read(entry.path)[1]
+                if user is not None: names[unquote(entry.name[:-5])] = self._entries(user)
+        self._write_directory(names)
+
+    # --- WRITES ---
+    @staticmethod
+    def _entries(user):
+        return [[acc["account_number"], acc.get("branch_name"), acc.get("ifsc")] for acc in user["accounts"]]
+
+    def _stored_user(self, user, lengths, tails, intent):
+        """The shard form of user: each account's rows go to its history file, the shard keeps the length."""
+        accounts = []
+        for acc in user["accounts"]:
+            number, log = acc["account_number"], acc.get("transactions")
+            if log is None: log = TxnLog()
+            offset = lengths.get(number, 0)
+            if log is tails.get(number):  # Only the rows this commit appended
+                text = dumps(list(log.stored_rows()), separators=(",", ":")) + "\n" if len(log) else ""
+            else: text = dumps(log, separators=(",", ":")) + "\n"
+            if text: intent["append"][self._history(number)] = [offset, text]
+            stored = {k: v for k, v in acc.items() if k != "transactions"}
+            stored["history"] = offset + len(text.encode("utf-8"))
+            accounts.append(stored)
+        return dict(user, accounts=accounts)
+
+    def _write(self, path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        text = dumps(value, separators=(",", ":"))
+        metrics.add_bytes("storage.commit", written=len(text))
+        with open(path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_directory(self, names):
+        """Replaces directory.json with names and starts an empty directory log."""
+        self._write(self._dir_path() + ".tmp", names)
+        os.replace(self._dir_path() + ".tmp", self._dir_path())
+        # Replaying the old log over the new directory changes nothing, so a reader between the two steps is fine
+        with open(self._log_path() + ".tmp", "w"): pass
+        os.replace(self._log_path() + ".tmp", self._log_path())
+        self._dir = None
+
+    def checkpoint(self):
+        """Folds the directory log into directory.json."""
+        with self._lock, self._file_lock():
+            self._recover()
+            self._write_directory(self._directory()[0])
+
+    def _finish(self, intent):
+        """Performs a committed intent's appends, renames and deletions; safe to repeat.
+
+        Appends go first, so a reader holding a shard renamed in finds all the
+        history it refers to. Each is written at its recorded offset, which also
+        cuts off anything a crashed commit left past it.
+        """
+        for path, (offset, text) in intent.get("append", {}).items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(text.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        for path in intent["replace"]:
+            if os.path.exists(path + ".tmp"): os.replace(path + ".tmp", path)
+        for path in intent["delete"]:
+            if os.path.exists(path): os.remove(path)
+
+    def _recover(self):
+        intent_path = os.path.join(self.root, "intent.json")
+        try:
+            with open(intent_path) as f: intent = json.load(f)
+        except FileNotFoundError: return
+        except ValueError: intent = None  # Unreadable, so its commit never completed: drop it
+        if intent: self._finish(intent)
+        os.remove(intent_path)
+
+    def commit(self, mutation, guard=None):
+        view = mutation.data
+        touched = {change[1][0] for change in mutation.changes}
+        with self._lock, self._file_lock():
+            self._recover()
+            if guard:
+                read = getattr(view, "versions", {})
+                for key in guard:
+                    if key in read and self._marker(self._path(key)) != read[key]:
+                        raise ConflictError(mutation.op)
+
+            # Apply to fresh copies of the touched shards, never to the ones pages are holding.
+            # Stored histories stay on disk: each account gets an empty log to collect the new rows.
+            current, lengths, tails = {}, {}, {}
+            for key in touched:
+                marker, value = self._read(self._path(key))
+                if marker is None:
+                    if key in GLOBALS: current[key] = default_data()[key]
+                    continue
+                if key not in GLOBALS:
+                    for acc in value["accounts"]:
+                        if "history" in acc:
+                            lengths[acc["account_number"]] = acc.pop("history")
+                            acc["transactions"] = tails[acc["account_number"]] = TxnLog()
+                    normalize_user(value)
+                current[key] = value
+            before = {key: [a["account_number"] for a in value["accounts"]]
+                      for key, value in current.items() if key not in GLOBALS}
+            apply_changes(current, mutation.changes)
+
+            names = self._directory()[0]
+            logged = self._dir[1]
+            intent = {"append": {}, "replace": [], "delete": []}
+            updates = {}
+            for key in touched:
+                path = self._path(key)
+                if key in current:
+                    stored = current[key] if key in GLOBALS else self._stored_user(current[key], lengths, tails, intent)
+                    self._write(path + ".tmp", stored)
+                    intent["replace"].append(path)
+                else: intent["delete"].append(path)
+                if key in GLOBALS: continue
+                entries = self._entries(current[key]) if key in current else None
+                if names.get(key) != entries: updates[key] = entries
+                kept = {entry[0] for entry in entries or ()}
+                intent["delete"] += [self._history(n) for n in before.get(key, []) if n not in kept]
+            if updates:
+                line = dumps(updates, separators=(",", ":")) + "\n"
+                intent["append"][self._log_path()] = [logged, line]
+
+            intent_path = os.path.join(self.root, "intent.json")
+            self._write(intent_path + ".tmp", intent)
+            os.replace(intent_path + ".tmp", intent_path)  # The commit point
+            self._finish(intent)
+            os.remove(intent_path)
+
+            for key in touched: self._cache.pop(self._path(key), None)  # Re-read with lazy histories when next used
+            if updates:
+                self._dir[0] = (self._dir[0][0], self._marker(self._log_path())[0])  # Created by the first append
+                self._dir[1] = logged + len(line.encode("utf-8"))
+                self._update_directory(updates)
+                if self._dir[1] >= DIRECTORY_LOG_BYTES: self._write_directory(names)
+        if isinstance(view, ShardView): view.forget(touched)
+
+    def save(self, data):
+        """Replaces every shard with data (used by the JSON migrator and the benchmarks)."""
+        with self._lock, self._file_lock():
+            for sub in ("users", "globals", "history", "accounts"):  # accounts/: number links of older stores
+                shutil.rmtree(os.path.join(self.root, sub), ignore_errors=True)
+            for sub in ("users", "globals", "history"):
+                os.makedirs(os.path.join(self.root, sub))
+            self._cache.clear()
+            for key in GLOBALS:
+                self._write(self._path(key), data.get(key, default_data()[key]))
+            names = {}
+            for key in list(data):
+                if not is_user(data, key): continue
+                intent = {"append": {}}
+                self._write(self._path(key), self._stored_user(data[key], {}, {}, intent))
+                self._finish(dict(intent, replace=[], delete=[]))
+                names[key] = self._entries(data[key])
+            self._write_directory(names)
@@ -0,0 +1,204 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from storage import dumps, is_user, replayed_bank
+from models import to_account
+from txnlog import TxnLog
+
+# --- FORMAT ---
+# A binary alternative to the bank_data.json snapshot, read through mmap:
+#
+#   header    magic, byte order, user count, index offset, globals offset
+#   records   per user: the user record, then one record per account
+#   globals   record: JSON of the bank-wide keys (pending_loans, stats, ...)
+#   names     the usernames, UTF-8, back to back
+#   index     one entry per user, sorted by name: (name offset, name length, user record offset)
+#
+# Every record is a 4-byte length and a payload. A user record holds its account
+# record offsets and one JSON document: the user's fields and each account's
+# fields (loans included). An account record holds the account's transactions as
+# raw columns, which load with one array.frombytes() each instead of a parse per
+# row. A reader finds a user by bisecting the index and decodes only that user's records.
+MAGIC = b"BANKSNP1"
+EXTENSION = ".snap"
+HEADER = struct.Struct("<8s8sQQQ")
+RECORD = struct.Struct("<I")
+ENTRY = struct.Struct("<QIQ")
+OFFSET = struct.Struct("<Q")
+ACCOUNT = struct.Struct("<I")  # Transaction count
+
+# --- WRITING ---
+def _account_parts(acc):
+    """(JSON-able fields, account record payload) of one account."""
+    log = TxnLog.from_stored(acc.get("transactions") or [])
+    types, descs, columns = log.to_buffers()
+    fields = {k: v for k, v in acc.items() if k != "transactions"}
+    return [fields, types, descs], b"".join([ACCOUNT.pack(len(log)), *columns])
+
+def write(path, data):
+    """Writes data as a binary snapshot atomically; returns the file size."""
+    tmp = path + ".tmp"
+    entries = []
+    with open(tmp, "wb") as f:
+        f.write(bytes(HEADER.size))
+        def record(payload):
+            offset = f.tell()
+            f.write(RECORD.pack(len(payload)))
+            f.write(payload)
+            return offset
+        for key in data:
+            if not is_user(data, key): continue
+            parts = [_account_parts(acc) for acc in data[key]["accounts"]]
+            metas, accounts = [meta for meta, _ in parts], [payload for _, payload in parts]
+            fields = dumps([{k: v for k, v in data[key].items() if k != "accounts"}, metas],
+                           separators=(",", ":")).encode()
+            # The user record goes first; its account offsets follow from the record sizes
+            user_offset = f.tell()
+            offset = user_offset + 2 * RECORD.size + len(accounts) * OFFSET.size + len(fields)
+            offsets = []
+            for payload in accounts:
+                offsets.append(offset)
+                offset += RECORD.size + len(payload)
+            record(b"".join([RECORD.pack(len(offsets)), *map(OFFSET.pack, offsets), fields]))
+            for payload in accounts: record(payload)
+            entries.append((key.encode(), user_offset))
+        globals_offset = record(dumps({k: v for k, v in data.items() if not is_user(data, k)},
+                                      separators=(",", ":")).encode())
+        entries.sort()
+        index = []
+        for name, user_offset in entries:
+            index.append(ENTRY.pack(f.tell(), len(name), user_offset))
+            f.write(name)
+        index_offset = f.tell()
+        f.write(b"".join(index))
+        size = f.tell()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, sys.byteorder.encode(), len(entries), index_offset, globals_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return size
+
+# --- READING ---
+class Snapshot:
+    """A memory-mapped binary snapshot. Only what is asked for is decoded.
+
+        with Snapshot("bank_data.snap") as snap:
+            user = snap.user("alice")   # bisects the index, decodes alice's records only
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, order, self.count, self._index, self._globals = HEADER.unpack_from(self._map, 0)
+        except (ValueError, struct.error):
+            self._file.close()
+            raise ValueError(f"{path} is not a bank snapshot")
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a bank snapshot")
+        self._swap = order.rstrip(b"\0").decode() != sys.byteorder
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def _record(self, offset):
+        """(payload start, payload length) of the record at offset."""
+        return offset + RECORD.size, RECORD.unpack_from(self._map, offset)[0]
+
+    def _entry(self, i):
+        name_offset, name_length, user_offset = ENTRY.unpack_from(self._map, self._index + i * ENTRY.size)
+        return self._map[name_offset:name_offset + name_length], user_offset
+
+    def _find(self, username):
+        name = username.encode()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < name: lo = mid + 1
+            else: hi = mid
+        if lo < self.count:
+            found, user_offset = self._entry(lo)
+            if found == name: return user_offset
+        return None
+
+    def _account(self, offset, meta):
+        fields, types, descs = meta
+        start, _ = self._record(offset)
+        (rows,) = ACCOUNT.unpack_from(self._map, start)
+        pos = start + ACCOUNT.size
+        columns = []
+        for width in (8, 8, 8, 4, 1):
+            columns.append(self._map[pos:pos + width * rows])
+            pos += width * rows
+        fields["transactions"] = TxnLog.from_buffers(types, descs, *columns, swap=self._swap)
+        return to_account(fields)
+
+    def _user(self, offset):
+        start, length = self._record(offset)
+        (n,) = RECORD.unpack_from(self._map, start)
+        offsets = struct.unpack_from(f"<{n}Q", self._map, start + RECORD.size)
+        user, metas = json.loads(self._map[start + RECORD.size + n * OFFSET.size:start + length])
+        user["accounts"] = list(map(self._account, offsets, metas))
+        return user
+
+    def __contains__(self, username): return self._find(username) is not None
+
+    def usernames(self):
+        for i in range(self.count): yield self._entry(i)[0].decode()
+
+    def user(self, username):
+        """One user entry in the in-memory form load_data() returns; KeyError if absent."""
+        offset = self._find(username)
+        if offset is None: raise KeyError(username)
+        return self._user(offset)
+
+    def globals(self):
+        start, length = self._record(self._globals)
+        return json.loads(self._map[start:start + length])
+
+    def load(self):
+        """The whole bank, as json.load() of the JSON snapshot plus normalize_user() would give."""
+        data = self.globals()
+        for i in range(self.count):
+            name, offset = self._entry(i)
+            data[name.decode()] = self._user(offset)
+        return data
+
+def read(path):
+    with Snapshot(path) as snap:
+        return snap.load()
+
+# --- CONVERSION ---
+def from_json(json_file, snap_file):
+    """Writes the JSON snapshot (with its journal replayed) as a binary snapshot; returns the user count."""
+    data = replayed_bank(json_file)
+    write(snap_file, data)
+    return sum(1 for u in data if is_user(data, u))
+
+def to_json(snap_file, json_file):
+    """Writes the binary snapshot (with its journal replayed) in the JSON layout; returns the user count."""
+    data = replayed_bank(snap_file)
+    tmp = json_file + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(dumps(data, separators=(",", ":")))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, json_file)
+    return sum(1 for u in data if is_user(data, u))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert between the JSON and binary bank snapshots")
+    parser.add_argument("direction", choices=("to-binary", "to-json"))
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args()
+    convert = from_json if args.direction == "to-binary" else to_json
+    print(f"Converted {convert(args.source, args.target)} users into {args.target}")
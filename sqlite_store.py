@@ -0,0 +1,436 @@
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from storage import Store, ConflictError, apply_changes, default_data, directory_row, is_user
+from txnlog import LazyTxnLog, TxnLog, normalize_row
+from models import to_account
+
+TXN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL, ts INTEGER, type TEXT,
+    paise INTEGER, description TEXT, balance_paise INTEGER
+);
+CREATE INDEX IF NOT EXISTS transactions_account ON transactions (account_id, id);
+CREATE INDEX IF NOT EXISTS transactions_time ON transactions (account_id, ts);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, version INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY, password TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY, username TEXT NOT NULL, position INTEGER NOT NULL,
+    account_number TEXT NOT NULL, account_name TEXT, account_type TEXT, balance NUMERIC,
+    pin TEXT, branch_name TEXT, branch_addr TEXT, ifsc TEXT, cibil INTEGER,
+    status TEXT, admin_note TEXT, extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS accounts_owner ON accounts (username, position);
+CREATE INDEX IF NOT EXISTS accounts_number ON accounts (account_number);
+CREATE INDEX IF NOT EXISTS accounts_ifsc ON accounts (ifsc);
+""" + TXN_SCHEMA + """
+CREATE TABLE IF NOT EXISTS loans (
+    account_id INTEGER NOT NULL, position INTEGER NOT NULL, loan_id TEXT, status TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS loans_account ON loans (account_id, position);
+CREATE INDEX IF NOT EXISTS loans_status ON loans (status);
+CREATE TABLE IF NOT EXISTS pending_loans (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, loan_id TEXT, username TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS pending_loans_user ON pending_loans (username);
+CREATE TABLE IF NOT EXISTS reactivation_requests (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, account_number TEXT, data TEXT
+);
+"""
+
+ACCOUNT_COLUMNS = ("account_name", "account_number", "account_type", "balance", "pin",
+                   "branch_name", "branch_addr", "ifsc", "cibil", "status", "admin_note")
+TXN_INSERT = "INSERT INTO transactions (account_id, ts, type, paise, description, balance_paise) VALUES (?, ?, ?, ?, ?, ?)"
+QUEUES = ("pending_loans", "reactivation_requests")
+DOCUMENTS = ("eod_runs", "stats", "id_blocks")  # Small global dicts kept as JSON values in meta
+
+class BankView(MutableMapping):
+    """Lazily filled stand-in for the bank dict.
+
+    A user's rows are read the first time the page asks for that user, so a
+    dashboard touches one user rather than the whole bank; an account's
+    transactions are read only when something uses them (LazyTxnLog). The
+    version of every key read is remembered for commit()'s conflict check.
+    """
+    def __init__(self, store):
+        self._store = store
+        self._rows = {}
+        self.versions = {}
+
+    def __getitem__(self, key):
+        if key not in self._rows:
+            self._rows[key] = self._store._fetch(key, self.versions)
+        return self._rows[key]
+
+    def __setitem__(self, key, value): self._rows[key] = value
+    def __delitem__(self, key): self._rows.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._rows or self._store._exists(key)
+
+    def __iter__(self):
+        yield from ("bank_balance",) + QUEUES + DOCUMENTS
+        yield from self._store.usernames()
+
+    def __len__(self): return len(QUEUES) + len(DOCUMENTS) + 1 + self._store.user_count()
+
+    def forget(self, keys):
+        for key in keys:
+            self._rows.pop(key, None)
+            self.versions.pop(key, None)
+
+class SqliteStore(Store):
+    """Users, accounts, transactions, loans and request queues as indexed SQLite tables."""
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._rollups = {}  # (username, account number) -> (account id, last transaction id, TxnLog._months)
+        conn = self._conn()
+        self._upgrade(conn)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('bank_balance', ?)",
+                     (default_data()["bank_balance"],))
+
+    def _upgrade(self, conn):
+        """Converts transactions stored as formatted strings to the numeric columns."""
+        columns = [r[1] for r in conn.execute("PRAGMA table_info(transactions)")]
+        if "amount" not in columns: return
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("SELECT id, account_id, date, type, amount, description, balance_after FROM transactions").fetchall()
+        conn.execute("DROP TABLE transactions")
+        for statement in TXN_SCHEMA.split(";"):
+            if statement.strip(): conn.execute(statement)  # executescript() would commit early
+        for r in rows:
+            ts, t_type, paise, desc, bal = normalize_row(
+                {"date": r[2], "type": r[3], "amount": r[4], "description": r[5], "balance_after": r[6]})
+            conn.execute("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", (r[0], r[1], ts, t_type, paise, desc, bal))
+        conn.execute("COMMIT")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- READS ---
+    def load(self):
+        return BankView(self)
+
+    def usernames(self):
+        return [r[0] for r in self._conn().execute("SELECT username FROM users ORDER BY rowid")]
+
+    def user_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def locate(self, account_number):
+        row = self._conn().execute(
+            "SELECT username, position FROM accounts WHERE account_number = ?", (account_number,)).fetchone()
+        return tuple(row) if row else None
+
+    def locate_many(self, account_numbers):
+        numbers, found = list(account_numbers), {}
+        for i in range(0, len(numbers), 900):  # Stay under SQLite's bound-parameter limit
+            part = numbers[i:i + 900]
+            rows = self._conn().execute(f"SELECT account_number, username, position FROM accounts "
+                                        f"WHERE account_number IN ({','.join('?' * len(part))})", part)
+            found.update((r[0], (r[1], r[2])) for r in rows)
+        return found
+
+    def transactions(self, username, account_number, start_ts=None, end_ts=None, types=None, offset=0, limit=None):
+        conn = self._conn()
+        row = conn.execute("SELECT id FROM accounts WHERE username = ? AND account_number = ?",
+                           (username, account_number)).fetchone()
+        if row is None: raise KeyError(account_number)
+        where, params = ["account_id = ?"], [row[0]]
+        if start_ts is not None: where.append("ts >= ?"); params.append(start_ts)
+        if end_ts is not None: where.append("ts < ?"); params.append(end_ts)
+        if types is not None:
+            where.append(f"type IN ({', '.join('?' * len(types))})"); params.extend(types)
+        where = " AND ".join(where)
+        total = conn.execute(f"SELECT COUNT(*) FROM transactions WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT ts, type, paise, description, balance_paise FROM transactions WHERE {where} "
+                            "ORDER BY id LIMIT ? OFFSET ?", params + [-1 if limit is None else limit, offset]).fetchall()
+        return (TxnLog.from_columns(*zip(*rows)) if rows else TxnLog()), total
+
+    def search_accounts(self, query, branch=None, contains=False, offset=0, limit=25):
+        query = query.strip().lower()
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%" if contains else f"{escaped}%"
+        name_match = "lower(username) LIKE :p ESCAPE '\\'"
+        where = f"({name_match} OR (:q != '' AND account_number LIKE :p ESCAPE '\\'))"
+        params = {"p": pattern, "q": query, "branch": branch, "limit": limit, "offset": offset}
+        if branch is not None: where += " AND branch_name = :branch"
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM accounts WHERE {where}", params).fetchone()[0]
+        # Same order as the other backends: username matches by name, then number matches by number
+        rows = conn.execute(f"SELECT username, account_number, account_type, branch_name, status, balance, "
+                            f"{name_match} AS by_name FROM accounts WHERE {where} ORDER BY by_name DESC, "
+                            "CASE WHEN by_name THEN lower(username) ELSE '' END, account_number "
+                            "LIMIT :limit OFFSET :offset", params).fetchall()
+        return [directory_row(r[0], {"account_number": r[1], "account_type": r[2], "branch_name": r[3],
+                                     "status": r[4] or "active", "balance": r[5]}) for r in rows], total
+
+    def branch_accounts(self, branch_name=None, ifsc=None):
+        clauses, params = [], []
+        if branch_name is not None: clauses.append("branch_name = ?"); params.append(branch_name)
+        if ifsc is not None: clauses.append("ifsc = ?"); params.append(ifsc)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return [r[0] for r in self._conn().execute(f"SELECT account_number FROM accounts{where}", params)]
+
+    def _exists(self, key):
+        if key == "bank_balance" or key in QUEUES or key in DOCUMENTS: return True
+        return self._conn().execute("SELECT 1 FROM users WHERE username = ?", (key,)).fetchone() is not None
+
+    def _fetch(self, key, versions):
+        conn = self._conn()
+        own = not conn.in_transaction
+        if own: conn.execute("BEGIN")  # One read snapshot for the rows and their version
+        try:
+            row = conn.execute("SELECT version FROM versions WHERE key = ?", (key,)).fetchone()
+            versions[key] = row[0] if row else 0
+            if key == "bank_balance":
+                row = conn.execute("SELECT value FROM meta WHERE key = 'bank_balance'").fetchone()
+                return row[0] if row else default_data()["bank_balance"]
+            if key in QUEUES:
+                return [json.loads(r[0]) for r in conn.execute(f"SELECT data FROM {key} ORDER BY seq")]
+            if key in DOCUMENTS: return self._document(conn, key)
+            return self._fetch_user(conn, key)
+        finally:
+            if own: conn.execute("COMMIT")
+
+    def _fetch_user(self, conn, username):
+        row = conn.execute("SELECT password, extra FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None: raise KeyError(username)
+        user = {"password": row[0], **json.loads(row[1] or "{}"), "accounts": []}
+        loans = {}
+        for account_id, data in conn.execute("SELECT l.account_id, l.data FROM loans l JOIN accounts a ON a.id = l.account_id "
+                                             "WHERE a.username = ? ORDER BY l.account_id, l.position", (username,)):
+            loans.setdefault(account_id, []).append(json.loads(data))
+        cur = conn.execute("SELECT * FROM accounts WHERE username = ? ORDER BY position", (username,))
+        names = [d[0] for d in cur.description]
+        for values in cur.fetchall():
+            rec = dict(zip(names, values))
+            acc = {k: rec[k] for k in ACCOUNT_COLUMNS if rec[k] is not None}
+            acc.update(json.loads(rec["extra"] or "{}"))
+            # History is read through the paged query only when a page or report uses it
+            acc["transactions"] = LazyTxnLog(*self._history(username, rec["id"], rec["account_number"]))
+            acc["loans"] = loans.get(rec["id"], [])
+            user["accounts"].append(to_account(acc))
+        return user
+
+    def _history(self, username, account_id, account_number):
+        """fetch() and remember() for an account's LazyTxnLog.
+
+        Rows are only ever appended, so the monthly rollups of an earlier load
+        still describe the rows up to its last transaction id: the new log starts
+        from them and months() recomputes only the latest month.
+        """
+        key = (username, account_number)
+        last = []
+
+        def fetch():
+            rows = self._conn().execute("SELECT id, ts, type, paise, description, balance_paise FROM transactions "
+                                        "WHERE account_id = ? ORDER BY id", (account_id,)).fetchall()
+            if not rows: return TxnLog()
+            ids, *columns = zip(*rows)
+            log = TxnLog.from_columns(*columns)
+            last.append(ids[-1])
+            cached = self._rollups.get(key)
+            if cached and cached[0] == account_id and cached[1] <= ids[-1]: log._months = cached[2]
+            return log
+
+        def remember(months):
+            if last: self._rollups[key] = (account_id, last[0], months)
+        return fetch, remember
+
+    def _document(self, conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default_data()[key]
+
+    # --- WRITES ---
+    def _insert_user(self, conn, username, user):
+        extra = {k: v for k, v in user.items() if k not in ("password", "accounts")}
+        conn.execute("INSERT INTO users (username, password, extra) VALUES (?, ?, ?)",
+                     (username, user.get("password"), json.dumps(extra)))
+        for pos, acc in enumerate(user.get("accounts", [])):
+            self._insert_account(conn, username, pos, acc)
+
+    def _insert_account(self, conn, username, pos, acc):
+        extra = {k: v for k, v in acc.items() if k not in ACCOUNT_COLUMNS + ("transactions", "loans")}
+        cur = conn.execute(
+            f"INSERT INTO accounts (username, position, {', '.join(ACCOUNT_COLUMNS)}, extra) "
+            f"VALUES (?, ?, {', '.join('?' * len(ACCOUNT_COLUMNS))}, ?)",
+            (username, pos, *(acc.get(k) for k in ACCOUNT_COLUMNS), json.dumps(extra)))
+        account_id = cur.lastrowid
+        log = TxnLog.from_stored(acc.get("transactions") or [])
+        conn.executemany(TXN_INSERT, [(account_id, *normalize_row(row)) for row in log.stored_rows()])
+        for i, loan in enumerate(acc.get("loans", [])):
+            self._insert_loan(conn, account_id, i, loan)
+
+    def _insert_loan(self, conn, account_id, pos, loan):
+        conn.execute("INSERT INTO loans (account_id, position, loan_id, status, data) VALUES (?, ?, ?, ?, ?)",
+                     (account_id, pos, loan.get("id"), loan.get("status"), json.dumps(dict(loan))))
+
+    def _insert_queued(self, conn, queue, item):
+        if queue == "pending_loans":
+            conn.execute("INSERT INTO pending_loans (loan_id, username, data) VALUES (?, ?, ?)",
+                         (item.get("id"), item.get("username"), json.dumps(item)))
+        else:
+            conn.execute("INSERT INTO reactivation_requests (username, account_number, data) VALUES (?, ?, ?)",
+                         (item.get("username"), item.get("account_number"), json.dumps(item)))
+
+    def _delete_accounts(self, conn, where, params):
+        ids = [r[0] for r in conn.execute(f"SELECT id FROM accounts WHERE {where}", params)]
+        for account_id in ids:
+            conn.execute("DELETE FROM transactions WHERE account_id = ?", (account_id,))
+            conn.execute("DELETE FROM loans WHERE account_id = ?", (account_id,))
+            conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+
+    def _account_id(self, conn, username, pos):
+        row = conn.execute("SELECT id FROM accounts WHERE username = ? AND position = ?", (username, pos)).fetchone()
+        if row is None: raise KeyError(f"{username}/accounts/{pos}")
+        return row[0]
+
+    def _update_json(self, conn, table, where, params, field, kind, value):
+        row = conn.execute(f"SELECT rowid, data FROM {table} WHERE {where}", params).fetchone()
+        if row is None: raise KeyError(table)
+        item = json.loads(row[1])
+        if kind == "set": item[field] = value
+        elif kind == "inc": item[field] += value
+        elif kind == "del": item.pop(field, None)
+        extra = ", status = ?" if table == "loans" else ""
+        args = (json.dumps(item),) + ((item.get("status"),) if extra else ()) + (row[0],)
+        conn.execute(f"UPDATE {table} SET data = ?{extra} WHERE rowid = ?", args)
+
+    def _apply(self, conn, change):
+        """Translates one journal-style change into SQL."""
+        kind, path = change[0], change[1]
+        value = change[2] if len(change) > 2 else None
+        top, rest = path[0], path[1:]
+
+        if top == "journal_seq": return
+        if top == "bank_balance":
+            if kind == "inc":
+                conn.execute("UPDATE meta SET value = value + ? WHERE key = 'bank_balance'", (value,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bank_balance', ?)", (value,))
+            return
+        if top in DOCUMENTS:
+            holder = {top: self._document(conn, top)}
+            apply_changes(holder, [change])
+            return conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (top, json.dumps(holder[top])))
+        if top in QUEUES:
+            if kind == "add" and not rest: return self._insert_queued(conn, top, value)
+            nth = f"seq = (SELECT seq FROM {top} ORDER BY seq LIMIT 1 OFFSET ?)"
+            if kind == "del" and len(rest) == 1: return conn.execute(f"DELETE FROM {top} WHERE {nth}", (rest[0],))
+            if len(rest) == 2: return self._update_json(conn, top, nth, (rest[0],), rest[1], kind, value)
+        elif not rest:
+            self._delete_accounts(conn, "username = ?", (top,))
+            conn.execute("DELETE FROM users WHERE username = ?", (top,))
+            if kind == "set": self._insert_user(conn, top, value)
+            return
+        elif rest[0] != "accounts":
+            if rest == ["password"]: return conn.execute("UPDATE users SET password = ? WHERE username = ?", (value, top))
+        elif len(rest) == 1 and kind == "add":
+            pos = conn.execute("SELECT COUNT(*) FROM accounts WHERE username = ?", (top,)).fetchone()[0]
+            return self._insert_account(conn, top, pos, value)
+        elif len(rest) == 2 and kind == "del":
+            self._delete_accounts(conn, "username = ? AND position = ?", (top, rest[1]))
+            return conn.execute("UPDATE accounts SET position = position - 1 WHERE username = ? AND position > ?",
+                                (top, rest[1]))
+        elif len(rest) >= 3:
+            account_id = self._account_id(conn, top, rest[1])
+            field = rest[2]
+            if field == "transactions" and kind == "add" and len(rest) == 3:
+                return conn.execute(TXN_INSERT, (account_id, *normalize_row(value)))
+            if field == "transactions" and kind == "ext" and len(rest) == 3:
+                return conn.executemany(TXN_INSERT, [(account_id, *normalize_row(row)) for row in value])
+            if field == "loans":
+                if kind == "add" and len(rest) == 3:
+                    pos = conn.execute("SELECT COUNT(*) FROM loans WHERE account_id = ?", (account_id,)).fetchone()[0]
+                    return self._insert_loan(conn, account_id, pos, value)
+                if len(rest) == 5:
+                    return self._update_json(conn, "loans", "account_id = ? AND position = ?",
+                                             (account_id, rest[3]), rest[4], kind, value)
+            elif len(rest) == 3 and field in ACCOUNT_COLUMNS:
+                if kind == "set": return conn.execute(f"UPDATE accounts SET {field} = ? WHERE id = ?", (value, account_id))
+                if kind == "inc": return conn.execute(f"UPDATE accounts SET {field} = {field} + ? WHERE id = ?", (value, account_id))
+                if kind == "del": return conn.execute(f"UPDATE accounts SET {field} = NULL WHERE id = ?", (account_id,))
+            elif len(rest) == 3:
+                row = conn.execute("SELECT extra FROM accounts WHERE id = ?", (account_id,)).fetchone()
+                extra = json.loads(row[0] or "{}")
+                if kind == "del": extra.pop(field, None)
+                elif kind == "inc": extra[field] += value
+                else: extra[field] = value
+                return conn.execute("UPDATE accounts SET extra = ? WHERE id = ?", (json.dumps(extra), account_id))
+        raise ValueError(f"Unsupported change for SQLite storage: {kind} {path}")
+
+    def commit(self, mutation, guard=None):
+        conn = self._conn()
+        view = mutation.data
+        touched = {change[1][0] for change in mutation.changes}
+        own = not conn.in_transaction  # Inside exclusive() the caller owns the transaction
+        if own: conn.execute("BEGIN IMMEDIATE")
+        try:
+            if guard:
+                read = getattr(view, "versions", {})
+                for key in guard:
+                    if key not in read: continue
+                    row = conn.execute("SELECT version FROM versions WHERE key = ?", (key,)).fetchone()
+                    if (row[0] if row else 0) != read[key]:
+                        raise ConflictError(mutation.op)
+            for change in mutation.changes:
+                self._apply(conn, change)
+            conn.executemany(
+                "INSERT INTO versions (key, version) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET version = version + 1", [(k,) for k in touched])
+            if own: conn.execute("COMMIT")
+        except BaseException:
+            if own: conn.execute("ROLLBACK")
+            raise
+        # Cached rows of the touched keys are stale now; they are re-read on next access
+        if isinstance(view, BankView): view.forget(touched)
+
+    @contextmanager
+    def exclusive(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def save(self, data):
+        """Replaces the whole database with data (used by the JSON migrator)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("meta", "versions", "users", "accounts", "transactions", "loans") + QUEUES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('bank_balance', ?)",
+                         (data.get("bank_balance", default_data()["bank_balance"]),))
+            for key in DOCUMENTS:
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(data.get(key, default_data()[key]))))
+            for queue in QUEUES:
+                for item in data.get(queue, []):
+                    self._insert_queued(conn, queue, item)
+            for key in list(data):
+                if is_user(data, key):
+                    self._insert_user(conn, key, data[key])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
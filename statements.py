@@ -0,0 +1,204 @@
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+import storage
+from txnlog import TXN_TYPES, next_month, to_paise, to_timestamp, type_code
+
+CSV_COLUMNS = ["date", "type", "amount", "description", "balance_after"]
+CHUNK_ROWS = 5000
+BACKGROUND_ROWS = 20000  # Longer statements are built as a background job
+MONTH_END_DIR = "statements"
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "bank_statements")  # CSVs prepared by background jobs
+KEEP_EXPORTS = 3600  # Seconds an export stays downloadable (well past jobs.KEEP_FINISHED)
+ACCOUNTS_PER_TASK = 200  # Accounts per worker task, and per checkpoint flush
+SUMMARY_COLUMNS = ["account_number", "username", "account_name", "account_type", "branch_name", "month",
+                   "opening_balance", "credits", "debits", "closing_balance", "transactions"]
+
+# --- CSV EXPORT ---
+def iter_csv(username, account_number, start_ts=None, end_ts=None, types=None, chunk_rows=CHUNK_ROWS):
+    """Yields the statement as CSV text, one chunk of rows at a time.
+
+    Rows are fetched from storage page by page, so peak memory is bounded by
+    chunk_rows regardless of how long the history is.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    offset = 0
+    while True:
+        page, total = storage.account_transactions(username, account_number, start_ts, end_ts, types,
+                                                   offset, chunk_rows)
+        writer.writerows(page)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        offset += len(page)
+        if not len(page) or offset >= total: break
+
+def _prune_exports():
+    cutoff = time.time() - KEEP_EXPORTS
+    for entry in os.scandir(EXPORT_DIR) if os.path.isdir(EXPORT_DIR) else ():
+        try:
+            if entry.stat().st_mtime < cutoff: os.remove(entry.path)
+        except OSError: pass  # Already removed by another session
+
+def csv_file(username, account_number, start_ts=None, end_ts=None, types=None, progress=None):
+    """Streams the statement into a file under EXPORT_DIR and returns its path.
+
+    The path, not an open file, is what a background job hands back: every
+    download opens the file afresh with open_export(). Exports older than
+    KEEP_EXPORTS are removed as new ones are written.
+    progress(rows_written, total_rows) is called after every chunk.
+    """
+    _prune_exports()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="statement_", suffix=".csv", dir=EXPORT_DIR)
+    total = storage.account_transactions(username, account_number, start_ts, end_ts, types, 0, 0)[1]
+    with os.fdopen(fd, "wb") as f:
+        for i, chunk in enumerate(iter_csv(username, account_number, start_ts, end_ts, types)):
+            f.write(chunk.encode("utf-8"))
+            if progress: progress(min((i + 1) * CHUNK_ROWS, total), total)
+    return path
+
+def open_export(path):
+    """The export as a file for st.download_button, which reads it itself when the button is clicked."""
+    return open(path, "rb")
+
+# --- MONTH-END RUN ---
+
+def previous_month(today=None):
+    first = (today or datetime.date.today()).replace(day=1)
+    return (first - datetime.timedelta(days=1)).strftime("%Y-%m")
+
+def _month_part(acc, start_ts, end_ts):
+    """(rows of the month as a TxnLog, balance in paise at the start of the month)."""
+    log = acc["transactions"]
+    if log.ordered():
+        lo, hi = log.span(start_ts, end_ts)
+        part, before, after = log.slice(lo, hi), lo - 1, lo if lo < len(log) else None
+    else:
+        part = log.take(log.matching(start_ts, end_ts))
+        earlier, later = log.matching(None, start_ts), log.matching(start_ts)
+        before = int(earlier[-1]) if len(earlier) else -1
+        after = int(later[0]) if len(later) else None
+    if before >= 0: return part, log.bal[before]
+    if after is not None:  # Nothing earlier: undo the first row since
+        undo = log.paise[after] if TXN_TYPES[log.kind[after]] == "DEBIT" else -log.paise[after]
+        return part, log.bal[after] + undo
+    return part, to_paise(acc["balance"])  # No transactions at all
+
+def _write_atomic(path, text):
+    with open(path + ".tmp", "w", newline="") as f: f.write(text)
+    os.replace(path + ".tmp", path)
+
+def _render(month, directory, types, items):
+    """Worker: writes <account>.csv and <account>.json for each item; returns their summaries."""
+    for t in types: type_code(t)  # Same category codes as the parent that packed the logs
+    summaries = []
+    for info, opening, part in items:
+        credits = debits = 0
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for i in range(len(part)):
+            if TXN_TYPES[part.kind[i]] == "DEBIT": debits += part.paise[i]
+            else: credits += part.paise[i]
+            writer.writerow(part.row(i))
+        closing = part.bal[-1] if len(part) else opening
+        summary = dict(info, month=month, opening_balance=opening / 100, credits=credits / 100, debits=debits / 100,
+                       closing_balance=closing / 100, transactions=len(part))
+        number = info["account_number"]
+        _write_atomic(os.path.join(directory, f"{number}.csv"), buf.getvalue())
+        _write_atomic(os.path.join(directory, f"{number}.json"), json.dumps(summary, separators=(",", ":")))
+        summaries.append(summary)
+    return summaries
+
+def _read_checkpoint(path):
+    """Summaries of the accounts already written; a line torn by a crash is ignored."""
+    done = {}
+    if not os.path.exists(path): return done
+    with open(path) as f:
+        for line in f:
+            try: summary = json.loads(line)
+            except ValueError: continue
+            done[summary["account_number"]] = summary
+    return done
+
+def _tasks(data, start_ts, end_ts, skip):
+    """Yields lists of (account info, opening paise, month rows) for the accounts not in skip."""
+    chunk = []
+    for u in storage.get_store().usernames():
+        for acc in data[u]["accounts"]:
+            if acc["account_number"] in skip: continue
+            part, opening = _month_part(acc, start_ts, end_ts)
+            info = {"account_number": acc["account_number"], "username": u, "account_name": acc.get("account_name", u),
+                    "account_type": acc.get("account_type", ""), "branch_name": acc.get("branch_name", "")}
+            chunk.append((info, opening, part))
+            if len(chunk) >= ACCOUNTS_PER_TASK:
+                yield chunk
+                chunk = []
+    if chunk: yield chunk
+
+def run_month_end(month=None, out_dir=MONTH_END_DIR, workers=None, progress=None):
+    """Writes a CSV and a JSON summary per account for month ("YYYY-MM", default: last month).
+
+    Accounts are fanned out in chunks across a process pool. Every finished
+    chunk is appended to <out_dir>/<month>/checkpoint.jsonl, so a run that
+    crashed resumes with the accounts still missing. summary.csv collects all
+    accounts at the end. progress(done, total) is called per chunk; returns the
+    number of accounts written by this run.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+    import multiprocessing
+    month = month or previous_month()
+    start_ts = to_timestamp(f"{month}-01 00:00:00")
+    end_ts = next_month(start_ts)
+    directory = os.path.join(out_dir, month)
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = os.path.join(directory, "checkpoint.jsonl")
+    done = _read_checkpoint(checkpoint)
+
+    data = storage.load_data()
+    total = sum(len(data[u]["accounts"]) for u in storage.get_store().usernames())
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    # Spawned workers: the server process has threads, which fork would copy mid-flight
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool, \
+            open(checkpoint, "a") as log:
+        pending = set()
+        def drain(return_when):
+            nonlocal pending, written
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                for summary in future.result():
+                    log.write(json.dumps(summary, separators=(",", ":")) + "\n")
+                    done[summary["account_number"]] = summary
+                    written += 1
+                log.flush()
+                if progress: progress(len(done), total)
+        for chunk in _tasks(data, start_ts, end_ts, set(done)):
+            pending.add(pool.submit(_render, month, directory, list(TXN_TYPES), chunk))
+            if len(pending) >= 2 * workers: drain(FIRST_COMPLETED)  # Bounded: month rows are held until rendered
+        drain(ALL_COMPLETED)
+
+    with open(os.path.join(directory, "summary.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(sorted(done.values(), key=lambda s: s["account_number"]))
+    return written
+
+if __name__ == "__main__":
+    import argparse, time
+    parser = argparse.ArgumentParser(description="Month-end statements for every account")
+    parser.add_argument("--month", default=None, help="YYYY-MM (default: last month)")
+    parser.add_argument("--out", default=MONTH_END_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    n = run_month_end(args.month, args.out, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"{n:,} statements written in {elapsed:.2f}s ({n / elapsed if elapsed else 0:,.0f}/sec)")
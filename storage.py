@@ -0,0 +1,545 @@
+import json
+import os
+import datetime
+import threading
+from contextlib import contextmanager, nullcontext
+import aggregates
+import ids
+import metrics
+from indexes import AccountIndex
+from txnlog import TxnLog
+from models import Record, to_account
+
+try: import fcntl
+except ImportError: fcntl = None  # Windows: only one server process may write
+
+# --- CONFIGURATION ---
+STORAGE_BACKEND = os.environ.get("BANK_STORAGE", "json")  # "json", "sqlite" or "sharded"
+SNAPSHOT_FORMAT = os.environ.get("BANK_SNAPSHOT", "json")  # "json" or "binary" (memory-mapped, see snapshot.py)
+DATA_FILE = "bank_data.snap" if SNAPSHOT_FORMAT == "binary" else "bank_data.json"
+JOURNAL_FILE = "bank_data.journal"
+LOCK_FILE = "bank_data.lock"
+SQLITE_FILE = "bank_data.db"
+SHARD_DIR = "bank_shards"
+JOURNAL_MODE = True              # False = rewrite the whole snapshot on every commit
+JOURNAL_FSYNC = True             # fsync each appended record before acknowledging it
+CHECKPOINT_BYTES = 4 * 1024 * 1024  # Compact the journal into the snapshot past this size
+GLOBAL_KEYS = ("bank_balance", "pending_loans", "reactivation_requests", "eod_runs", "stats", "id_blocks", "journal_seq")
+
+class ConflictError(Exception):
+    """Another process changed data this mutation depends on; rebuild and retry it."""
+
+def default_data():
+    return {
+        "bank_balance": 10000000,
+        "pending_loans": [],
+        "reactivation_requests": [],
+        "eod_runs": {},  # "<business date>/<branch>" -> summary of that branch's end-of-day run
+        "stats": aggregates.empty(),  # Running bank-wide totals, see aggregates.py
+        "id_blocks": {}  # "<kind>/<branch code>" -> last serial reserved, see ids.py
+    }
+
+def directory_row(username, acc):
+    """What the admin account directory shows of one account."""
+    return {"account_number": acc["account_number"], "username": username, "account_type": acc.get("account_type"),
+            "branch_name": acc.get("branch_name"), "status": acc.get("status", "active"), "balance": acc["balance"]}
+
+def is_user(data, key):
+    return key not in GLOBAL_KEYS and isinstance(data.get(key), dict) and "accounts" in data[key]
+
+def _encode(obj):
+    """json.dump hook for the in-memory types that have a compact stored form."""
+    if isinstance(obj, TxnLog): return obj.to_stored()
+    if isinstance(obj, Record): return obj.to_stored()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj, **kwargs):
+    return json.dumps(obj, default=_encode, **kwargs)
+
+def normalize_user(user):
+    """Converts a stored user entry to the in-memory form (slotted accounts, columnar transaction logs)."""
+    if "accounts" in user: user["accounts"] = [to_account(acc) for acc in user["accounts"]]
+    return user
+
+# --- CHANGE RECORDING ---
+def _resolve(data, path):
+    node = data
+    for key in path:
+        node = node[key]
+    return node
+
+def apply_changes(data, changes):
+    """Applies a list of journal changes (set/inc/add/ext/del on a key path) to data."""
+    for change in changes:
+        kind, path = change[0], change[1]
+        parent = _resolve(data, path[:-1])
+        key = path[-1]
+        if kind == "set":
+            parent[key] = change[2]
+            if len(path) == 1 and isinstance(change[2], dict): normalize_user(change[2])
+        elif kind == "inc":
+            # Totals keyed by branch or loan type start at zero the first time they are counted
+            parent[key] = (parent.get(key, 0) if isinstance(parent, dict) else parent[key]) + change[2]
+        elif kind == "add":
+            parent[key].append(to_account(change[2]) if len(path) == 2 and path[1] == "accounts" else change[2])
+        elif kind == "ext": parent[key].extend(change[2])
+        elif kind == "del": del parent[key]
+        else: raise ValueError(f"Unknown journal change: {kind}")
+
+class Mutation:
+    """Collects the edits made by one banking operation.
+
+    Nothing touches the bank state until the mutation is passed to commit(),
+    which applies the edits and persists them as one atomic unit.
+    """
+    def __init__(self, data, op):
+        self.data = data
+        self.op = op
+        self.changes = []
+
+    def get(self, path):
+        """Reads a value as it will be after this mutation is committed."""
+        value = _resolve(self.data, path)
+        for change in self.changes:
+            if change[1] == path:
+                if change[0] == "set": value = change[2]
+                elif change[0] == "inc": value += change[2]
+        return value
+
+    def set(self, path, value): self.changes.append(["set", list(path), value])
+    def inc(self, path, delta): self.changes.append(["inc", list(path), delta])
+    def append(self, path, value): self.changes.append(["add", list(path), value])
+    def extend(self, path, values): self.changes.append(["ext", list(path), list(values)])
+    def delete(self, path): self.changes.append(["del", list(path)])
+
+# --- STORAGE INTERFACE ---
+class Store:
+    """What every storage backend provides.
+
+    load() returns a mapping shaped like the original bank_data.json: usernames
+    plus the global keys. Backends may fill it lazily, so a page only pays for
+    the users it actually looks at.
+    """
+    def load(self): raise NotImplementedError
+    def save(self, data): raise NotImplementedError
+    def commit(self, mutation, guard=None): raise NotImplementedError
+
+    def exclusive(self):
+        """Context in which no other writer can commit (used when optimistic retries keep losing)."""
+        return nullcontext()
+
+    def bulk(self):
+        """Context for a run of many commits (batch posting): housekeeping waits until it ends."""
+        return nullcontext()
+
+    def checkpoint(self):
+        """Compacts what the backend has appended since the last one (e.g. before a backup)."""
+        self.save(self.load())
+
+    def usernames(self):
+        data = self.load()
+        return [u for u in data if is_user(data, u)]
+
+    def locate(self, account_number):
+        """Returns (username, position) of the account with this number, or None."""
+        data = self.load()
+        for u in self.usernames():
+            for pos, acc in enumerate(data[u]["accounts"]):
+                if acc["account_number"] == account_number: return u, pos
+        return None
+
+    def locate_many(self, account_numbers):
+        """Returns {account_number: (username, position)} for those of the numbers that exist."""
+        found = {}
+        for number in account_numbers:
+            owner = self.locate(number)
+            if owner: found[number] = owner
+        return found
+
+    def transactions(self, username, account_number, start_ts=None, end_ts=None, types=None, offset=0, limit=None):
+        """Returns (page, total): a TxnLog of the matching rows [offset, offset+limit) and the match count.
+
+        start_ts is inclusive and end_ts exclusive; types limits the transaction types.
+        """
+        data = self.load()
+        log = next(acc["transactions"] for acc in data[username]["accounts"] if acc["account_number"] == account_number)
+        stop = None if limit is None else offset + limit
+        if types is None and log.ordered():
+            lo, hi = log.span(start_ts, end_ts)  # Bisection on the time index, no scan
+            return log.slice(lo + offset, hi if stop is None else min(hi, lo + stop)), hi - lo
+        positions = log.matching(start_ts, end_ts, types)
+        return log.take(positions[offset:stop]), len(positions)
+
+    def branch_accounts(self, branch_name=None, ifsc=None):
+        """Returns the account numbers held at a branch (by name or IFSC)."""
+        data = self.load()
+        return [acc["account_number"] for u in self.usernames() for acc in data[u]["accounts"]
+                if (branch_name is None or acc.get("branch_name") == branch_name)
+                and (ifsc is None or acc.get("ifsc") == ifsc)]
+
+    def search_accounts(self, query, branch=None, contains=False, offset=0, limit=25):
+        """Returns (rows, total): directory rows [offset, offset+limit) of the accounts whose
+        username or number starts with (or contains) query, and the match count."""
+        data, query = self.load(), query.strip().lower()
+        names, numbers = [], []
+        for u in sorted(self.usernames(), key=str.lower):
+            for pos, acc in enumerate(data[u]["accounts"]):
+                if branch is not None and acc.get("branch_name") != branch: continue
+                name, number = u.lower(), acc["account_number"]
+                if (query in name) if contains else name.startswith(query): names.append((name, number, u, pos))
+                elif (query in number) if contains else (query and number.startswith(query)): numbers.append((number, u, pos))
+        found = [(u, pos) for _, _, u, pos in sorted(names)] + [(u, pos) for _, u, pos in sorted(numbers)]
+        return [directory_row(u, data[u]["accounts"][pos]) for u, pos in found[offset:offset + limit]], len(found)
+
+# --- JSON SNAPSHOT + JOURNAL BACKEND ---
+class JsonStore(Store):
+    """bank_data.json (or binary bank_data.snap) snapshot plus an append-only journal of mutations.
+
+    One parsed copy of the bank is shared by every session and rerun in the
+    server process. It is revalidated with a stat() of the snapshot and journal
+    instead of a re-parse, and only the journal tail other processes appended
+    is replayed.
+    """
+    def __init__(self, data_file=None, journal_file=None, lock_file=None):
+        self.data_file = data_file or DATA_FILE
+        self.journal_file = journal_file or JOURNAL_FILE
+        self.lock_file = lock_file or LOCK_FILE
+        self.binary = self.data_file.endswith(".snap")
+        self._lock = threading.RLock()
+        self._flock_depth = 0
+        self._bulk_depth = 0
+        self._cache = {"data": None, "snapshot": None, "offset": 0}
+        self.index = AccountIndex()
+
+    def _read_journal(self, offset=0):
+        """Yields (record, end_offset) for every complete journal record after offset."""
+        if not os.path.exists(self.journal_file): return
+        with open(self.journal_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"): break  # Torn write from a crash, ignore the tail
+                offset += len(line)
+                try: record = json.loads(line)
+                except ValueError: break
+                yield record, offset
+
+    def _read_snapshot(self):
+        if os.path.exists(self.data_file):
+            metrics.add_bytes("storage.load", read=os.path.getsize(self.data_file))
+            try:
+                if self.binary:
+                    import snapshot
+                    data = snapshot.read(self.data_file)
+                else:
+                    with open(self.data_file, "r") as f:
+                        data = json.load(f)
+            except: data = default_data()
+        else: data = default_data()
+
+        # Snapshots written before running totals existed: count them once here
+        if "stats" not in data: data["stats"] = aggregates.compute(data)
+        # Ensure all keys exist
+        for key, val in default_data().items():
+            if key not in data:
+                data[key] = val
+        for key in data:
+            if is_user(data, key): normalize_user(data[key])
+        return data
+
+    def _replay(self, data, offset=0, touched=None):
+        """Applies journal records newer than data's journal_seq; returns the new offset.
+
+        The top-level keys (usernames and globals) of every replayed change are added to touched.
+        """
+        applied, start = data.get("journal_seq", 0), offset
+        for record, offset in self._read_journal(offset):
+            if record["seq"] <= applied: continue
+            apply_changes(data, record["ch"])
+            if data is self._cache["data"]: self.index.apply(data, record["ch"])
+            applied = data["journal_seq"] = record["seq"]
+            if touched is not None: touched.update(change[1][0] for change in record["ch"])
+        metrics.add_bytes("storage.load", read=offset - start)
+        return offset
+
+    def _snapshot_marker(self):
+        try:
+            st = os.stat(self.data_file)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError: return None
+
+    def _journal_size(self):
+        try: return os.path.getsize(self.journal_file)
+        except OSError: return 0
+
+    def _sync(self):
+        """Brings the cached state up to date with disk, reading only what changed.
+
+        Returns (data, touched): the top-level keys other processes changed, or None after a full reload.
+        """
+        cache = self._cache
+        snapshot = self._snapshot_marker()
+        data = cache["data"]
+        if data is not None and snapshot == cache["snapshot"]:
+            size = self._journal_size()
+            if size == cache["offset"]: return data, set()
+            if size > cache["offset"]:
+                # Another process appended records: replay just the tail
+                touched = set()
+                cache["offset"] = self._replay(data, cache["offset"], touched)
+                return data, touched
+
+        # Snapshot replaced (checkpoint elsewhere) or first load: full reload
+        data = self._read_snapshot()
+        cache.update(data=data, snapshot=snapshot, offset=self._replay(data))
+        self.index.rebuild(data)
+        return data, None
+
+    @contextmanager
+    def _file_lock(self):
+        """Serializes journal appends between server processes. Reentrant; hold self._lock first."""
+        if fcntl is None or self._flock_depth:
+            self._flock_depth += 1
+            try: yield
+            finally: self._flock_depth -= 1
+            return
+        with open(self.lock_file, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._flock_depth += 1
+            try: yield
+            finally:
+                self._flock_depth -= 1
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        with self._lock, self._file_lock():
+            yield
+
+    @contextmanager
+    def bulk(self):
+        with self._lock: self._bulk_depth += 1
+        try: yield
+        finally:
+            with self._lock:
+                self._bulk_depth -= 1
+                # One checkpoint for the whole run instead of one every few MB of journal
+                if not self._bulk_depth and JOURNAL_MODE and self._journal_size() >= CHECKPOINT_BYTES:
+                    self.save(self._sync()[0])  # save() re-syncs under the file lock
+
+    def load(self):
+        with self._lock:
+            return self._sync()[0]
+
+    def locate(self, account_number):
+        with self._lock:
+            self._sync()
+            return self.index.locate(account_number)
+
+    def locate_many(self, account_numbers):
+        with self._lock:
+            self._sync()
+            return {n: self.index.locate(n) for n in account_numbers if self.index.locate(n)}
+
+    def search_accounts(self, query, branch=None, contains=False, offset=0, limit=25):
+        with self._lock:
+            data = self._sync()[0]
+            found, total = self.index.page(query, branch, contains, offset, limit)
+            owners = [self.index.locate(n) for n in found]
+            return [directory_row(u, data[u]["accounts"][pos]) for u, pos in owners], total
+
+    def branch_accounts(self, branch_name=None, ifsc=None):
+        with self._lock:
+            self._sync()
+            if ifsc is not None:
+                numbers = self.index.by_ifsc.get(ifsc, set())
+                if branch_name is not None: numbers = numbers & self.index.by_branch.get(branch_name, set())
+            elif branch_name is not None: numbers = self.index.by_branch.get(branch_name, set())
+            else: numbers = self.index.by_number.keys()
+            return list(numbers)
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.update(data=None, snapshot=None, offset=0)
+
+    def save(self, data):
+        """Writes a full snapshot atomically and starts a fresh journal.
+
+        Runs under the file lock, so no other process can append a record between
+        the snapshot and the truncate; if data is the cached bank, records other
+        processes appended before the lock was taken are replayed into it first.
+        """
+        with self._lock, self._file_lock():
+            if data is self._cache["data"]: data = self._sync()[0]
+            if self.binary:
+                import snapshot
+                size = snapshot.write(self.data_file, data)
+            else:
+                tmp = self.data_file + ".tmp"
+                with open(tmp, "w") as f:
+                    # Compact one-shot dumps() runs in the C encoder; indent would force the pure-Python one
+                    text = dumps(data, separators=(",", ":"))
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.data_file)
+                size = len(text)
+            metrics.add_bytes("storage.save", written=size)
+            # Records up to journal_seq are now in the snapshot; replay skips them even if this truncate is lost
+            with open(self.journal_file, "w"): pass
+            if data is not self._cache["data"]: self.index.rebuild(data)
+            self._cache.update(data=data, snapshot=self._snapshot_marker(), offset=0)
+
+    def commit(self, mutation, guard=None):
+        with self._lock, self._file_lock():
+            # Pick up other processes' records first. Changes always land on the synced cache:
+            # numbered from a stale copy, a record could reuse a seq already folded into the snapshot
+            stale = mutation.data is not self._cache["data"]
+            data, touched = self._sync()
+            if guard and (stale or touched is None or touched & set(guard)):
+                raise ConflictError(mutation.op)
+            mutation.data = data
+            apply_changes(data, mutation.changes)
+            self.index.apply(data, mutation.changes)
+            if not JOURNAL_MODE:
+                self.save(data)
+                return
+
+            data["journal_seq"] = data.get("journal_seq", 0) + 1
+            record = {
+                "seq": data["journal_seq"],
+                "op": mutation.op,
+                "ts": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "ch": mutation.changes
+            }
+            line = dumps(record, separators=(",", ":")) + "\n"
+            # A record torn by a crash would swallow this one into an unreadable line: cut it off first
+            end = self._cache["offset"]
+            if self._journal_size() > end:
+                with open(self.journal_file, "r+b") as f: f.truncate(end)
+            with open(self.journal_file, "a") as f:
+                f.write(line)
+                f.flush()
+                if JOURNAL_FSYNC: os.fsync(f.fileno())
+                size = f.tell()
+            metrics.add_bytes("storage.commit", written=len(line))
+
+            self._cache["offset"] = size
+            if size >= CHECKPOINT_BYTES and not self._bulk_depth:
+                self.save(data)
+
+# --- ACTIVE BACKEND ---
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STORAGE_BACKEND == "sqlite":
+                from sqlite_store import SqliteStore
+                _store = SqliteStore(SQLITE_FILE)
+            elif STORAGE_BACKEND == "sharded":
+                from shard_store import ShardStore
+                _store = ShardStore(SHARD_DIR)
+            else:
+                _store = JsonStore()
+        return _store
+
+def set_store(store):
+    """Switches the backend used by load_data()/commit() (tools, migrations, benchmarks)."""
+    global _store
+    with _store_lock:
+        _store = store
+    ids.forget_blocks()
+
+@metrics.timed("storage.load")
+def load_data():
+    """Returns the up-to-date bank state.
+
+    The mapping may be shared across sessions, so never edit it in place:
+    describe changes with a Mutation and persist them with commit().
+    """
+    return get_store().load()
+
+@metrics.timed("storage.save")
+def save_data(data):
+    get_store().save(data)
+
+@metrics.timed("storage.commit")
+def commit(mutation, guard=None):
+    """Applies a mutation to the bank state and persists it atomically.
+
+    guard is the set of top-level keys (usernames, "pending_loans", ...) the mutation was
+    computed from. If another process changed any of them since, ConflictError is raised
+    and nothing is written.
+    """
+    if not mutation.changes: return
+    get_store().commit(mutation, guard)
+
+def usernames():
+    return get_store().usernames()
+
+def exclusive():
+    return get_store().exclusive()
+
+def bulk():
+    return get_store().bulk()
+
+def locate_account(account_number):
+    return get_store().locate(account_number)
+
+def locate_accounts(account_numbers):
+    return get_store().locate_many(account_numbers)
+
+def search_accounts(query, branch=None, contains=False, offset=0, limit=25):
+    return get_store().search_accounts(query, branch, contains, offset, limit)
+
+def account_transactions(username, account_number, start_ts=None, end_ts=None, types=None, offset=0, limit=None):
+    return get_store().transactions(username, account_number, start_ts, end_ts, types, offset, limit)
+
+def invalidate_cache():
+    store = get_store()
+    if hasattr(store, "invalidate"): store.invalidate()
+
+def checkpoint():
+    """Folds the journal into the snapshot, or the sharded directory log into the directory (e.g. before a backup)."""
+    get_store().checkpoint()
+
+def replayed_bank(json_file=None):
+    """The snapshot (JSON or binary) with its journal replayed."""
+    json_file = json_file or DATA_FILE
+    journal_file = JOURNAL_FILE if json_file == DATA_FILE else os.path.splitext(json_file)[0] + ".journal"
+    return JsonStore(json_file, journal_file).load()
+
+def migrate_json_to_sqlite(json_file=None, sqlite_file=None):
+    """One-shot copy of the JSON snapshot (with its journal replayed) into a new SQLite database."""
+    from sqlite_store import SqliteStore
+    data = replayed_bank(json_file)
+    SqliteStore(sqlite_file or SQLITE_FILE).save(data)
+    return sum(1 for u in data if is_user(data, u))
+
+def migrate_json_to_shards(json_file=None, shard_dir=None):
+    """One-shot copy of the JSON snapshot (with its journal replayed) into per-user shard files."""
+    from shard_store import ShardStore
+    data = replayed_bank(json_file)
+    ShardStore(shard_dir or SHARD_DIR).save(data)
+    return sum(1 for u in data if is_user(data, u))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Bank storage maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="Copy bank_data.json into a SQLite database or a shard directory")
+    m.add_argument("--json", default=DATA_FILE)
+    m.add_argument("--to", choices=("sqlite", "sharded"), default="sqlite")
+    m.add_argument("--db", default=SQLITE_FILE)
+    m.add_argument("--dir", default=SHARD_DIR)
+    sub.add_parser("checkpoint", help="Fold the journal into the JSON snapshot")
+    args = parser.parse_args()
+
+    if args.command == "migrate" and args.to == "sharded":
+        print(f"Migrated {migrate_json_to_shards(args.json, args.dir)} users into {args.dir}")
+    elif args.command == "migrate":
+        print(f"Migrated {migrate_json_to_sqlite(args.json, args.db)} users into {args.db}")
+    elif args.command == "checkpoint":
+        checkpoint()
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+import velocity
+
+def make_store(backend, directory):
+    directory = str(directory)
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(os.path.join(directory, "bank.db"))
+    if backend == "sharded":
+        from shard_store import ShardStore
+        return ShardStore(os.path.join(directory, "shards"))
+    suffix = ".snap" if backend == "binary" else ".json"
+    return storage.JsonStore(os.path.join(directory, "bank" + suffix), os.path.join(directory, "bank.journal"),
+                             os.path.join(directory, "bank.lock"))
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_FSYNC", False)
+    monkeypatch.setattr(velocity, "RULES", {rule: None for rule in velocity.RULES})  # Tests of the limits set their own
+    yield
+    storage.set_store(None)
+
+@pytest.fixture
+def store(tmp_path):
+    """A fresh JSON-backed bank in tmp_path, made the active store."""
+    s = make_store("json", tmp_path)
+    storage.set_store(s)
+    return s
+
+@pytest.fixture(params=["json", "sqlite", "sharded"])
+def backend(request):
+    return request.param
+
+@pytest.fixture
+def any_store(backend, tmp_path):
+    """A fresh bank on each backend in turn, made the active store."""
+    s = make_store(backend, tmp_path)
+    storage.set_store(s)
+    return s
@@ -0,0 +1,24 @@
+import pytest
+import ledger
+import storage
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+def page():  # Runs as the app script, so it imports what it uses
+    import storage
+    from views import admin_accounts
+    admin_accounts.render(storage.load_data())
+
+def test_each_rerun_searches_once(store, monkeypatch):
+    for i in range(30):
+        ledger.open_account(f"user{i:02d}", "pw", "Savings", "Bodakdev", 20000, "1111")
+    calls = []
+    search = storage.search_accounts
+    monkeypatch.setattr(storage, "search_accounts", lambda *args: calls.append(args[3:]) or search(*args))
+    app = AppTest.from_function(page).run()
+    assert calls == [(0, 25)] and len(app.radio[0].options) == 25
+    app.number_input[0].set_value(2).run()
+    assert calls[1:] == [(25, 25)] and len(app.radio[0].options) == 5
+    app.text_input[0].set_value("user1").run()  # A new search is back on page 1
+    assert calls[2:] == [(0, 25)] and len(app.radio[0].options) == 10
+    assert not app.exception
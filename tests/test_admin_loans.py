@@ -0,0 +1,27 @@
+import pytest
+import ledger
+import storage
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+def page():  # Runs as the app script, so it imports what it uses
+    import storage
+    from views import admin_loans
+    admin_loans.render(storage.load_data())
+
+@pytest.fixture
+def requests(store):
+    number = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.apply_loan("alice", number, "Personal Loan", 100000, 2)
+    ledger.apply_loan("alice", number, "Home Loan", 900000, 10)
+    return [req["id"] for req in storage.load_data()["pending_loans"]]
+
+@pytest.mark.parametrize("button, status", [("app", "Active"), ("rej", "Rejected")])
+def test_one_request_is_decided_from_the_page(requests, button, status):
+    app = AppTest.from_function(page).run()
+    app.selectbox[0].select(requests[1]).run()
+    app.button(key=f"{button}_{requests[1]}").click().run()
+    assert not app.exception
+    data = storage.load_data()
+    assert [req["id"] for req in data["pending_loans"]] == requests[:1]
+    assert [(loan["id"], loan["status"]) for loan in data["alice"]["accounts"][0]["loans"]] == [(requests[1], status)]
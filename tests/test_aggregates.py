@@ -0,0 +1,29 @@
+import threading
+import aggregates
+import ledger
+import storage
+
+def test_reconcile_repairs_drift(any_store):
+    ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.transact("corrupt", ["stats"], None, lambda data, mut: mut.inc(["stats", "deposits", "Bodakdev"], 123))
+    assert aggregates.reconcile()
+    assert aggregates.reconcile(fix=True)
+    assert aggregates.reconcile() == []
+
+def test_no_deposit_lands_between_reconcile_scan_and_fix(any_store, monkeypatch):
+    number = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.transact("corrupt", ["stats"], None, lambda data, mut: mut.inc(["stats", "deposits", "Bodakdev"], 123))
+    compute, depositor = aggregates.compute, []
+    def slow_compute(data):
+        fresh = compute(data)
+        if not depositor:  # A teller deposits while the scan is running
+            depositor.append(threading.Thread(target=ledger.deposit, args=("alice", number, 500)))
+            depositor[0].start()
+            depositor[0].join(0.3)
+        return fresh
+    monkeypatch.setattr(aggregates, "compute", slow_compute)
+    aggregates.reconcile(fix=True)
+    depositor[0].join()
+    monkeypatch.setattr(aggregates, "compute", compute)
+    assert storage.load_data()["alice"]["accounts"][0]["balance"] == 50500
+    assert aggregates.reconcile() == []
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import amortization
+
+LOANS = [(100000, 0.105, 2), (2500000, 0.085, 20), (50000, 0.0, 1)]
+
+@pytest.mark.parametrize("principal, rate, years", LOANS)
+def test_schedule_repays_exactly_the_principal(principal, rate, years):
+    sched = amortization.schedule(principal, rate, years)
+    emi = amortization.emi(principal, rate, years)
+    assert len(sched["payment"]) == years * 12
+    assert sched["balance"][-1] == 0
+    assert sched["principal"].sum() == pytest.approx(principal, abs=0.01)
+    assert np.all(sched["payment"][:-1] == emi)
+    assert abs(sched["payment"][-1] - emi) < 1  # Only the EMI's rounding to the paisa moves into the last instalment
+    assert np.allclose(sched["interest"] + sched["principal"], sched["payment"])
+
+def test_batch_schedules_match_one_at_a_time():
+    principals, rates, years = zip(*LOANS)
+    emis = [amortization.emi(*loan) for loan in LOANS]
+    table = amortization.schedules(principals, rates, emis, [y * 12 for y in years])
+    for i, loan in enumerate(LOANS):
+        one = amortization.schedule(*loan)
+        n = len(one["payment"])
+        assert np.allclose(table["balance"][i, :n], one["balance"])
+        assert not table["payment"][i, n:].any()  # Zero past the loan's term
+
+def test_quote_totals_the_schedule():
+    emi, total, interest = amortization.quote(100000, 0.105, 2)
+    assert total == pytest.approx(float(amortization.schedule(100000, 0.105, 2)["payment"].sum()), abs=0.01)
+    assert interest == pytest.approx(total - 100000, abs=0.01)
+
+def test_remaining_schedule_clears_the_outstanding_principal():
+    emi = amortization.emi(100000, 0.105, 2)
+    outstanding = amortization.schedule(100000, 0.105, 2)["balance"][5]
+    rest = amortization.remaining_schedule(outstanding, 0.105, emi)
+    assert len(rest["payment"]) == 18
+    assert rest["balance"][-1] == 0
+    with pytest.raises(ValueError):
+        amortization.payoff_months(100000, 0.12, 500)  # Less than a month's interest
+
+def test_prepayment_goes_to_principal_and_never_overcharges():
+    charged, outstanding = amortization.apply_payment(100000, 0.12, 11000)
+    assert (charged, outstanding) == (11000, 90000)  # 1,000 of interest, the rest off the principal
+    assert amortization.apply_payment(1000, 0.12, 5000) == (1010, 0.0)
+
+def test_terms_of_a_loan_stored_without_its_schedule():
+    emi = amortization.emi(100000, 0.105, 2)
+    legacy = {"principal": 100000, "emi_amount": emi, "total_amount_payable": round(emi * 24, 2),
+              "total_paid": round(emi * 6, 2)}
+    rate, outstanding = amortization.loan_terms(legacy)
+    assert rate == pytest.approx(0.105, abs=1e-6)
+    assert outstanding == pytest.approx(amortization.schedule(100000, 0.105, 2)["balance"][5], abs=1)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+import charts
+from txnlog import TxnLog, make_row
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    charts.invalidate()
+    yield
+    charts.invalidate()
+
+def walk(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64) * 60, np.cumsum(rng.normal(0, 100, n))
+
+@pytest.mark.parametrize("n, threshold", [(10000, 500), (1001, 3), (50, 40)])
+def test_lttb_keeps_the_ends_and_the_order(n, threshold):
+    x, y = walk(n)
+    picked = charts.lttb(x, y, threshold)
+    assert len(picked) == threshold
+    assert picked[0] == 0 and picked[-1] == n - 1
+    assert np.all(np.diff(picked) > 0)  # Strictly increasing, so x stays monotonic
+
+def test_lttb_keeps_an_isolated_spike():
+    x, y = walk(5000)
+    y[2345] += 1e6
+    assert 2345 in charts.lttb(x, y, 100)
+
+def test_short_series_are_not_downsampled():
+    x, y = walk(20)
+    assert list(charts.lttb(x, y, 100)) == list(range(20))
+
+def log_of(n, start=1_700_000_000):
+    log = TxnLog()
+    balance = 0
+    for i in range(n):
+        balance += 100 if i % 3 else -50
+        log.append(make_row(start + i * 3600, "CREDIT" if i % 3 else "DEBIT", 100 if i % 3 else 50, "Row", balance))
+    return log
+
+def test_balance_series_is_capped_and_cached_until_the_log_grows():
+    log = log_of(5000)
+    frame = charts.balance_series("A1", log, max_points=300)
+    assert len(frame) == 300
+    assert frame["date"].is_monotonic_increasing
+    assert frame["balance_after"].iloc[-1] == log.bal[-1] / 100
+    assert charts.balance_series("A1", log, max_points=300) is frame
+    log.append(make_row(1_700_000_000 + 5000 * 3600, "CREDIT", 1, "Row", log.bal[-1] / 100 + 1))
+    grown = charts.balance_series("A1", log, max_points=300)
+    assert grown is not frame and grown["balance_after"].iloc[-1] == log.bal[-1] / 100
+
+def test_a_date_range_is_cached_separately():
+    log = log_of(2000)
+    start, end = log.ts[100], log.ts[400]
+    part = charts.balance_series("A1", log, start, end, max_points=1000)
+    assert len(part) == 300 and part["date"].iloc[0].timestamp() == start
+    assert len(charts.balance_series("A1", log, max_points=1000)) == 1000
+    assert charts.balance_series("A1", log, start, end, max_points=1000) is part
@@ -0,0 +1,50 @@
+import datetime
+import pytest
+import eod
+import ledger
+import storage
+
+DAY = datetime.date(2024, 5, 15)
+
+def set_field(username, path, value):
+    ledger.transact("test_setup", [username], [username], lambda data, mut: mut.set([username, "accounts", 0] + path, value))
+
+@pytest.fixture
+def bank(store):
+    a = ledger.open_account("alice", "pw", "Current", "Bodakdev", 1000, "1111")
+    set_field("alice", ["balance"], -36500)  # Overdrawn: a day's interest is 36500 * rate / 365
+    b = ledger.open_account("bob", "pw", "Savings", "Vasna", 50000, "2222")
+    ledger.apply_loan("bob", b, "Personal Loan", 100000, 2)
+    ledger.approve_loan(storage.load_data()["pending_loans"][0]["id"])
+    set_field("bob", ["loans", 0, "date"], "2024-04-15 10:00:00")  # First instalment falls due on DAY
+    return a, b
+
+def balances():
+    data = storage.load_data()
+    return data["alice"]["accounts"][0]["balance"], data["bob"]["accounts"][0]["balance"]
+
+def test_a_business_date_is_charged_once(bank):
+    before = balances()
+    report = eod.run_eod(DAY)
+    interest = round(36500 * ledger.OVERDRAFT_FIXED_RATE / 365, 2)
+    assert report["Bodakdev"]["overdraft_interest"] == interest
+    assert report["Vasna"]["instalments_due"] == 1
+    after = balances()
+    assert after == (round(before[0] - interest, 2), before[1])
+    loan = storage.load_data()["bob"]["accounts"][0]["loans"][0]
+    assert loan["emi_due"] == loan["emi_amount"] and loan["last_due"] == DAY.isoformat()
+
+    assert eod.run_eod(DAY) == {}
+    assert balances() == after
+    # A branch whose run lands after another process recorded it is skipped inside the commit too
+    owners = eod._scan(storage.load_data())["Bodakdev"]
+    assert eod._post_branch(DAY, "Bodakdev", owners) is None
+    assert balances() == after
+
+def test_an_unpaid_instalment_is_penalised_the_next_month(bank):
+    eod.run_eod(DAY)
+    report = eod.run_eod(datetime.date(2024, 6, 15))
+    loan = storage.load_data()["bob"]["accounts"][0]["loans"][0]
+    assert report["Vasna"]["penalties"] == round(loan["emi_amount"] * eod.LATE_PENALTY_RATE, 2)
+    assert loan["emi_due"] == round(2 * loan["emi_amount"], 2)
+    assert storage.load_data()["eod_runs"].keys() >= {eod.run_key(DAY, "Vasna"), "2024-06-15/Vasna"}
@@ -0,0 +1,38 @@
+import threading
+import ids
+import ledger
+import storage
+
+def test_luhn_catches_single_digit_typos():
+    number = ids.account_number("Bodakdev", 42)
+    assert len(number) == 12 and ids.valid_account_number(number)
+    for i in range(len(number)):
+        for d in "0123456789":
+            if d != number[i]: assert not ids.valid_account_number(number[:i] + d + number[i + 1:])
+    assert ids.valid_account_number("1234567890")  # Older random numbers are not checked
+
+def test_loan_ids_carry_a_check_digit():
+    loan = ids.loan_id("Vasna", 7)
+    assert ids.valid_loan_id(loan)
+    assert not ids.valid_loan_id(loan[:-1] + str((int(loan[-1]) + 1) % 10))
+    assert ids.valid_loan_id("LN1234")
+
+def test_one_commit_reserves_a_block(store, monkeypatch):
+    commits = []
+    commit = storage.commit
+    monkeypatch.setattr(storage, "commit", lambda mut, guard=None: commits.append(mut.op) or commit(mut, guard))
+    first = ids.serials("account", "Bodakdev", 5)
+    more = ids.serials("account", "Bodakdev", ids.BLOCK_SIZE)
+    assert first == list(range(1, 6))
+    assert more == list(range(6, 6 + ids.BLOCK_SIZE))
+    assert commits == ["id_reserve", "id_reserve"]
+    assert storage.load_data()["id_blocks"]["account/" + ledger.BRANCH_DATA["Bodakdev"]["code"]] == 2 * ids.BLOCK_SIZE
+
+def test_serials_are_unique_across_threads_and_restarts(store):
+    out = []
+    threads = [threading.Thread(target=lambda: out.extend(ids.serials("loan", "Vasna", 300))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    ids.forget_blocks()  # As after a restart: the rest of the reserved block is skipped
+    out += ids.serials("loan", "Vasna", 10)
+    assert len(out) == len(set(out)) == 2410
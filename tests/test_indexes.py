@@ -0,0 +1,77 @@
+import ids
+import ledger
+import storage
+from conftest import make_store
+from indexes import AccountIndex
+
+def snapshot_of(index):
+    return (index.by_number, {k: v for k, v in index.by_branch.items() if v}, {k: v for k, v in index.by_ifsc.items() if v},
+            index.inactive, index._names, index._numbers)
+
+def rebuilt(data):
+    index = AccountIndex()
+    index.rebuild(data)
+    return index
+
+def add_account(username, branch):
+    """A further account for an existing customer (the pages have no ledger call for it yet)."""
+    number = ids.new_account_numbers(branch)[0]
+    def build(data, mut):
+        acc = data[username]["accounts"][0]
+        mut.append([username, "accounts"], dict(acc, account_number=number, branch_name=branch, transactions=[], loans=[],
+                                                ifsc="BANK" + ledger.BRANCH_DATA[branch]["code"]))
+    ledger.transact("add_account", [number], [username], build)
+    return number
+
+def test_index_follows_every_change_to_the_accounts(store):
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    a2 = add_account("alice", "Vasna")
+    a3 = add_account("alice", "Gurukul")
+    b = ledger.open_account("bob", "pw", "Savings", "Vasna", 10000, "2222")
+    ledger.deactivate_account("bob", b, "Moved abroad")
+    ledger.remove_account("alice", a2)  # Later accounts move up a position
+    data = storage.load_data()
+    assert snapshot_of(store.index) == snapshot_of(rebuilt(data))
+    assert store.locate(a3) == ("alice", 1) and store.locate(a2) is None
+    assert store.index.inactive == {b}
+    ledger.reactivate_account("bob", b)
+    assert not store.index.inactive
+    assert storage.locate_accounts([a, b, "000"]) == {a: ("alice", 0), b: ("bob", 0)}
+
+def test_index_catches_up_with_another_process(store, tmp_path):
+    ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    other = make_store("json", tmp_path)
+    storage.set_store(other)
+    number = ledger.open_account("carol", "pw", "Savings", "Vasna", 15000, "3333")
+    storage.set_store(store)
+    assert store.locate(number) == ("carol", 0)
+    assert number in store.branch_accounts("Vasna")
+    assert snapshot_of(store.index) == snapshot_of(rebuilt(store.load()))
+
+def directory(rows):
+    return [(row["username"], row["account_number"]) for row in rows]
+
+def test_prefix_search_lists_names_then_numbers(any_store):
+    numbers = {name: ledger.open_account(name, "pw", "Savings", branch, 20000, "1111")
+               for name, branch in [("alice", "Bodakdev"), ("Albert", "Vasna"), ("bob", "Bodakdev"), ("carol", "Vasna")]}
+    rows, total = storage.search_accounts("AL")
+    assert total == 2 and directory(rows) == [("Albert", numbers["Albert"]), ("alice", numbers["alice"])]
+    prefix = numbers["bob"][:3]  # The branch number: every Bodakdev account
+    rows, total = storage.search_accounts(prefix)
+    assert sorted(directory(rows)) == [("alice", numbers["alice"]), ("bob", numbers["bob"])]
+    rows, total = storage.search_accounts("o", contains=True)
+    assert directory(rows) == [("bob", numbers["bob"]), ("carol", numbers["carol"])]
+    rows, total = storage.search_accounts("", branch="Vasna", limit=1, offset=1)
+    assert total == 2 and directory(rows) == [("carol", numbers["carol"])]
+    assert rows[0]["balance"] == 20000 and rows[0]["status"] == "active"
+
+def test_a_page_is_the_same_slice_of_the_search(store):
+    for name, branch in [("alice", "Bodakdev"), ("Albert", "Vasna"), ("bob", "Bodakdev"), ("carol", "Vasna"), ("al", "Vasna")]:
+        ledger.open_account(name, "pw", "Savings", branch, 20000, "1111")
+    index = rebuilt(storage.load_data())
+    prefix = next(iter(index.by_number))[:3]  # A branch number
+    for query, branch, contains in [("", None, False), ("al", None, False), ("", "Vasna", False), (prefix, "Vasna", False),
+                                    (prefix, None, False), ("o", None, True), ("a", "Vasna", True)]:
+        found = index.search(query, branch, contains)
+        for offset in range(len(found) + 2):
+            assert index.page(query, branch, contains, offset, 2) == (found[offset:offset + 2], len(found))
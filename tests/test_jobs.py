@@ -0,0 +1,43 @@
+import threading
+import time
+import jobs
+
+def wait(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while jobs.get(job_id).active:
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+def test_progress_is_visible_while_a_job_runs():
+    step, seen = threading.Event(), threading.Event()
+    def work(job, n):
+        for i in range(n):
+            job.update(i + 1, n, f"row {i + 1}")
+            if i == 1:
+                seen.set()
+                step.wait(5)
+        return n * 10
+    job_id = jobs.submit("count", work, 4, owner="alice")
+    assert seen.wait(5)
+    job = jobs.get(job_id)
+    assert (job.status, job.done, job.total, job.message, job.fraction) == ("running", 2, 4, "row 2", 0.5)
+    step.set()
+    job = wait(job_id)
+    assert (job.status, job.result, job.fraction) == ("done", 40, 1.0)
+    assert job in jobs.jobs(owner="alice") and job not in jobs.jobs(owner="bob")
+
+def test_an_exception_becomes_the_jobs_error():
+    def work(job):
+        job.update(1, 3)
+        raise ValueError("Statement source is gone")
+    job = wait(jobs.submit("broken", work))
+    assert (job.status, job.error, job.result) == ("failed", "Statement source is gone", None)
+    assert "ValueError" in job.message and job.finished is not None
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    job = wait(jobs.submit("old", lambda job: None))
+    monkeypatch.setattr(jobs, "KEEP_FINISHED", 0)
+    job.finished -= 1
+    jobs.submit("new", lambda job: None)
+    assert jobs.get(job.id) is None
@@ -0,0 +1,116 @@
+import json
+import os
+import pytest
+import ledger
+import storage
+from conftest import make_store
+from storage import ConflictError
+
+def test_checkpoint_keeps_records_appended_by_another_process(store, tmp_path):
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    data = store.load()
+    other = make_store("json", tmp_path)  # A second server process on the same files
+    storage.set_store(other)
+    ledger.deposit("alice", a, 777)
+    store.save(data)  # A checkpoint computed before the deposit landed
+    reopened = make_store("json", tmp_path)
+    assert reopened.load()["alice"]["accounts"][0]["balance"] == 50777
+
+def stored(store):
+    return storage.dumps(store.load(), sort_keys=True)
+
+def history(store):
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    b = ledger.open_account("bob", "pw", "Current", "Vasna", 20000, "2222")
+    ledger.deposit("alice", a, 1500)
+    ledger.transfer("alice", a, "bob", b, 700)
+    return a, b
+
+def test_a_restart_replays_the_journal(store, tmp_path):
+    history(store)
+    assert not os.path.exists(store.data_file)  # Nothing checkpointed yet: all of it is in the journal
+    with open(store.journal_file) as f: seqs = [json.loads(line)["seq"] for line in f]
+    assert seqs == list(range(1, len(seqs) + 1))
+    assert stored(make_store("json", tmp_path)) == stored(store)
+
+def test_checkpoint_folds_the_journal_into_the_snapshot(store, tmp_path, monkeypatch):
+    a, _ = history(store)
+    storage.checkpoint()
+    assert os.path.getsize(store.journal_file) == 0
+    seq = store.load()["journal_seq"]
+    ledger.deposit("alice", a, 1)
+    with open(store.journal_file) as f: assert json.loads(f.readline())["seq"] == seq + 1
+    monkeypatch.setattr(storage, "CHECKPOINT_BYTES", 1)  # Every commit now checkpoints
+    ledger.deposit("alice", a, 2)
+    assert os.path.getsize(store.journal_file) == 0
+    assert stored(make_store("json", tmp_path)) == stored(store)
+
+def test_records_already_in_the_snapshot_are_not_replayed(store, tmp_path):
+    history(store)
+    with open(store.journal_file, "rb") as f: journal = f.read()
+    storage.checkpoint()
+    with open(store.journal_file, "wb") as f: f.write(journal)  # The truncate after the checkpoint was lost
+    assert stored(make_store("json", tmp_path)) == stored(store)
+
+def test_a_commit_built_before_a_checkpoint_elsewhere_is_not_lost(store, tmp_path):
+    a, _ = history(store)
+    data = store.load()
+    bank = data["bank_balance"]
+    storage.set_store(make_store("json", tmp_path))
+    ledger.deposit("alice", a, 300)
+    storage.checkpoint()
+    store.load()  # Another session syncs first: the cache is replaced and data is now stale
+    guarded = storage.Mutation(data, "deposit")
+    guarded.inc(["alice", "accounts", 0, "balance"], 5)
+    with pytest.raises(ConflictError): store.commit(guarded, guard=["alice"])
+    unguarded = storage.Mutation(data, "fee_refund")
+    unguarded.inc(["bank_balance"], 5)
+    store.commit(unguarded)
+    restarted = make_store("json", tmp_path).load()
+    assert restarted["bank_balance"] == bank + 305
+    assert restarted["alice"]["accounts"][0]["balance"] == 51100
+    assert storage.dumps(restarted, sort_keys=True) == stored(store)
+
+def test_a_torn_record_is_dropped_and_later_records_survive(store, tmp_path):
+    a, _ = history(store)
+    expected = stored(store)
+    with open(store.journal_file, "ab") as f: f.write(b'{"seq":99,"op":"depo')  # Crashed mid-append
+    restarted = make_store("json", tmp_path)
+    assert stored(restarted) == expected
+    storage.set_store(restarted)
+    ledger.deposit("alice", a, 250)
+    assert stored(make_store("json", tmp_path)) == stored(restarted)
+
+def count_reads(store, monkeypatch):
+    reads = []
+    for name in ("_read_snapshot", "_read_journal"):
+        original = getattr(store, name)
+        monkeypatch.setattr(store, name, lambda *args, _name=name, _read=original: reads.append(_name) or _read(*args))
+    return reads
+
+def test_an_unchanged_bank_is_not_read_again(store, monkeypatch):
+    history(store)
+    data = store.load()
+    reads = count_reads(store, monkeypatch)
+    assert all(store.load() is data for _ in range(3))
+    assert reads == []
+
+def test_records_from_another_process_are_replayed_from_the_tail(store, tmp_path, monkeypatch):
+    a, _ = history(store)
+    data = store.load()
+    storage.set_store(make_store("json", tmp_path))  # A second server process on the same files
+    ledger.deposit("alice", a, 300)
+    reads = count_reads(store, monkeypatch)
+    assert store.load() is data and data["alice"]["accounts"][0]["balance"] == 51100
+    assert reads == ["_read_journal"]
+
+def test_a_checkpoint_elsewhere_reloads_the_snapshot(store, tmp_path, monkeypatch):
+    a, _ = history(store)
+    data = store.load()
+    storage.set_store(make_store("json", tmp_path))
+    ledger.deposit("alice", a, 300)
+    storage.checkpoint()
+    reads = count_reads(store, monkeypatch)
+    fresh = store.load()
+    assert fresh is not data and fresh["alice"]["accounts"][0]["balance"] == 51100
+    assert reads[0] == "_read_snapshot"
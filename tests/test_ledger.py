@@ -0,0 +1,57 @@
+import threading
+import pytest
+import aggregates
+import ledger
+import storage
+from ledger import LedgerError
+
+def open_pair():
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    b = ledger.open_account("bob", "pw", "Current", "Vasna", 20000, "2222")
+    return a, b
+
+def balance(username, number=None):
+    data = storage.load_data()
+    return data[username]["accounts"][0]["balance"]
+
+def test_money_movements(any_store):
+    a, b = open_pair()
+    ledger.deposit("alice", a, 1000)
+    ledger.withdraw("alice", a, 500)
+    ledger.transfer("alice", a, "bob", b, 2000)
+    assert balance("alice") == 48500 and balance("bob") == 22000
+    data = storage.load_data()
+    assert len(data["alice"]["accounts"][0]["transactions"]) == 3
+    assert aggregates.drift(data["stats"], aggregates.compute(data)) == []
+
+def test_concurrent_registration_of_one_username(store):
+    for trial in range(30):
+        results = []
+        def register():
+            try: results.append(ledger.open_account(f"user{trial}", "pw", "Savings", "Bodakdev", 20000, "1111"))
+            except LedgerError: results.append(None)
+        threads = [threading.Thread(target=register) for _ in range(2)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert results.count(None) == 1  # Exactly one of the two succeeded
+        assert storage.load_data()[f"user{trial}"]["accounts"][0]["account_number"] in results
+    data = storage.load_data()
+    assert data["stats"]["account_count"]["Bodakdev"] == 30
+    assert aggregates.drift(data["stats"], aggregates.compute(data)) == []
+
+@pytest.mark.parametrize("amount", [0, -30000, float("inf"), float("nan")])
+def test_amounts_must_be_positive_and_finite(store, amount):
+    a, b = open_pair()
+    for call in (lambda: ledger.deposit("alice", a, amount), lambda: ledger.withdraw("alice", a, amount),
+                 lambda: ledger.transfer("alice", a, "bob", b, amount)):
+        with pytest.raises(LedgerError): call()
+    assert balance("alice") == 50000 and balance("bob") == 20000
+
+def test_repayment_charge_is_rounded(store):
+    a, _ = open_pair()
+    loan_id = ledger.apply_loan("alice", a, "Personal Loan", 100000, 2)
+    ledger.approve_loan(loan_id)
+    loan = storage.load_data()["alice"]["accounts"][0]["loans"][0]
+    charged = ledger.repay_loan("alice", a, loan_id, loan["emi_amount"] * 3 + 0.1 + 0.2)
+    assert charged == round(charged, 2)
+    assert balance("alice") == round(150000 - charged, 2)
@@ -0,0 +1,36 @@
+import ledger
+import storage
+
+def apply(username, loan_type, principal, years=2):
+    number = storage.load_data()[username]["accounts"][0]["account_number"]
+    ledger.apply_loan(username, number, loan_type, principal, years)
+    return storage.load_data()["pending_loans"][-1]["id"]
+
+def test_a_batch_of_decisions_is_one_commit(store, monkeypatch):
+    ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.open_account("bob", "pw", "Savings", "Vasna", 50000, "2222")
+    ledger.open_account("carol", "pw", "Savings", "Vasna", 50000, "3333")
+    first, second = apply("alice", "Personal Loan", 100000), apply("bob", "Home Loan", 300000, 10)
+    refused, gone = apply("alice", "Personal Loan", 50000), apply("carol", "Personal Loan", 70000)
+    ledger.remove_account("carol", storage.load_data()["carol"]["accounts"][0]["account_number"])
+    bank = storage.load_data()["bank_balance"]
+
+    commits = []
+    commit = storage.commit
+    monkeypatch.setattr(storage, "commit", lambda mut, guard=None: commits.append(mut.op) or commit(mut, guard))
+    progress = []
+    report = ledger.decide_loans({first: "approve", refused: "reject", "LN0000": "approve", second: "approve",
+                                  gone: "approve"}, lambda done, total: progress.append((done, total)))
+
+    assert commits == ["loan_batch"]
+    assert [(r["id"], r["result"]) for r in report] == [(first, "Approved"), (refused, "Rejected"), ("LN0000", "Failed"),
+                                                         (second, "Approved"), (gone, "Failed")]
+    assert report[2]["detail"] == "Loan request is no longer pending."
+    assert report[4]["detail"] == "Account holder not found."
+    assert progress[-1] == (4, 5)
+    data = storage.load_data()
+    assert [req["id"] for req in data["pending_loans"]] == [gone]  # A failed request stays queued
+    assert data["bank_balance"] == bank - 400000
+    assert data["alice"]["accounts"][0]["balance"] == 150000
+    assert [(l["id"], l["status"]) for l in data["alice"]["accounts"][0]["loans"]] == [(first, "Active"), (refused, "Rejected")]
+    assert data["bob"]["accounts"][0]["balance"] == 350000
@@ -0,0 +1,54 @@
+import json
+import pytest
+import metrics
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def row(name):
+    return next(r for r in metrics.snapshot() if r["name"] == name)
+
+def test_calls_fall_into_their_buckets():
+    for ms in (0.01, 0.05, 0.3, 3, 3, 20000):
+        metrics.record("op", ms / 1000)
+    buckets = metrics._metrics["op"].buckets
+    assert buckets[0] == 2  # Bounds are inclusive: 0.05 ms is in the first bucket
+    assert buckets[metrics.BUCKETS_MS.index(0.5)] == 1
+    assert buckets[metrics.BUCKETS_MS.index(5)] == 2
+    assert buckets[-1] == 1  # Past the last bound: the open-ended bucket
+    assert sum(buckets) == 6
+
+def test_quantiles_report_bucket_bounds():
+    for _ in range(90): metrics.record("op", 0.0008)  # 0.8 ms
+    for _ in range(9): metrics.record("op", 0.04)     # 40 ms
+    metrics.record("op", 30)                           # 30 s, past every bound
+    r = row("op")
+    assert (r["p50_ms"], r["p95_ms"], r["p99_ms"]) == (1, 50, 50)
+    assert r["max_ms"] == 30000 and r["calls"] == 100
+    assert r["mean_ms"] == pytest.approx((90 * 0.8 + 9 * 40 + 30000) / 100, abs=1e-3)
+    metrics.record("tail", 30)
+    assert row("tail")["p50_ms"] == 30000  # The open-ended bucket reports the max
+
+def test_spans_count_errors_and_bytes():
+    with metrics.span("ok"): pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("bad"): raise RuntimeError
+    metrics.add_bytes("ok", read=10, written=4)
+    assert (row("ok")["errors"], row("bad")["errors"]) == (0, 1)
+    assert (row("ok")["bytes_read"], row("ok")["bytes_written"]) == (10, 4)
+
+def test_export_includes_the_histograms():
+    metrics.record("op", 0.002)
+    dump = json.loads(metrics.export())
+    assert dump["buckets_ms"] == list(metrics.BUCKETS_MS)
+    assert sum(dump["histograms"]["op"]) == 1 and dump["metrics"][0]["name"] == "op"
+
+def test_nothing_is_recorded_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    with metrics.span("op"): pass
+    metrics.record("op", 1)
+    assert metrics.snapshot() == []
@@ -0,0 +1,63 @@
+import json
+import sys
+import pytest
+import ledger
+import storage
+from conftest import make_store
+from models import Account, Loan, LoanList, MISSING
+from txnlog import TxnLog
+
+def stored_account(**extra):
+    return dict({"account_name": "alice", "account_number": "1234", "account_type": "Savings", "balance": 500,
+                 "branch_name": "".join(["Bod", "akdev"]), "status": "active", "transactions": [], "loans": []}, **extra)
+
+def test_accounts_keep_their_fields_in_slots():
+    acc = Account(stored_account(nickname="Main"))
+    assert not hasattr(acc, "__dict__")
+    with pytest.raises(AttributeError): acc.colour = "blue"
+    assert acc.pin is MISSING and "pin" not in acc and acc.get("pin", "none") == "none"
+    assert acc["nickname"] == "Main" and acc._extra == {"nickname": "Main"}  # Unknown keys overflow
+    acc["pin"] = "1111"
+    del acc["nickname"]
+    kept = acc.to_stored()
+    assert isinstance(kept.pop("transactions"), TxnLog)
+    expected = stored_account(pin="1111")
+    del expected["transactions"]
+    assert kept == expected
+
+def test_repeated_strings_are_interned():
+    a, b = Account(stored_account()), Account(json.loads(json.dumps(stored_account())))
+    assert a["branch_name"] is b["branch_name"]
+    a["status"] = "".join(["in", "active"])
+    assert a["status"] is sys.intern("inactive")
+
+def test_loans_are_records_however_they_arrive():
+    acc = Account(stored_account(loans=[{"id": "LN1", "status": "Active"}]))
+    assert type(acc["loans"]) is LoanList and isinstance(acc["loans"][0], Loan)
+    acc["loans"] = [{"id": "LN2", "status": "Active"}]
+    assert type(acc["loans"]) is LoanList and isinstance(acc["loans"][0], Loan)
+    acc["loans"].append({"id": "LN3", "status": "Closed", "penalties": 0})
+    assert isinstance(acc["loans"][-1], Loan) and acc["loans"][-1].to_stored()["penalties"] == 0
+    acc["transactions"] = []
+    assert isinstance(acc["transactions"], TxnLog)
+
+def bank():
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.deposit("alice", a, 1234.5)
+    ledger.apply_loan("alice", a, "Personal Loan", 100000, 2)
+    ledger.approve_loan(storage.load_data()["pending_loans"][0]["id"])
+    return a
+
+def reloaded(tmp_path):
+    data = make_store("json", tmp_path).load()
+    acc = data["alice"]["accounts"][0]
+    assert type(acc) is Account and type(acc["loans"]) is LoanList and type(acc["loans"][0]) is Loan
+    return storage.dumps(data, sort_keys=True)
+
+def test_records_round_trip_through_the_journal_and_the_snapshot(store, tmp_path):
+    bank()
+    expected = storage.dumps(storage.load_data(), sort_keys=True)
+    assert json.loads(expected)["alice"]["accounts"][0]["loans"][0]["status"] == "Active"
+    assert reloaded(tmp_path) == expected  # Replayed from the journal
+    storage.checkpoint()
+    assert reloaded(tmp_path) == expected  # Read from the snapshot
@@ -0,0 +1,58 @@
+import datetime
+import os
+import sys
+import pytest
+import ledger
+import statements
+import storage
+
+class Interrupted(Exception):
+    pass
+
+@pytest.fixture(autouse=True)
+def _no_main_script(monkeypatch):
+    # An in-process AppTest leaves its page script as __main__; spawned workers would re-run it
+    monkeypatch.delattr(sys.modules["__main__"], "__file__", raising=False)
+
+@pytest.fixture
+def bank(store):
+    for i, name in enumerate(["alice", "bob", "carol", "dave", "erin"]):
+        ledger.open_account(name, "pw", "Savings", "Vasna", 10000 + i * 1000, f"{i:04d}")
+    data = storage.load_data()
+    ledger.deposit("alice", data["alice"]["accounts"][0]["account_number"], 250)
+    ledger.withdraw("dave", data["dave"]["accounts"][0]["account_number"], 400)
+    ts = storage.load_data()["alice"]["accounts"][0]["transactions"].ts[-1]
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+def outputs(directory):
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if name != "checkpoint.jsonl":
+            with open(os.path.join(directory, name)) as f: files[name] = f.read()
+    return files
+
+def test_a_resumed_run_matches_a_clean_one(bank, tmp_path, monkeypatch):
+    month = bank
+    monkeypatch.setattr(statements, "ACCOUNTS_PER_TASK", 1)
+    calls = []
+    def crash(done, total):
+        calls.append(done)
+        if len(calls) == 1: raise Interrupted
+    with pytest.raises(Interrupted):
+        statements.run_month_end(month, str(tmp_path / "resumed"), workers=1, progress=crash)
+    directory = tmp_path / "resumed" / month
+    finished = statements._read_checkpoint(str(directory / "checkpoint.jsonl"))
+    assert 0 < len(finished) < 5 and not (directory / "summary.csv").exists()
+    stamps = {n: os.stat(directory / f"{n}.csv").st_mtime_ns for n in finished}
+
+    progress = []
+    written = statements.run_month_end(month, str(tmp_path / "resumed"), workers=1,
+                                       progress=lambda done, total: progress.append((done, total)))
+    assert written == 5 - len(finished)
+    assert progress[-1] == (5, 5)
+    assert {n: os.stat(directory / f"{n}.csv").st_mtime_ns for n in finished} == stamps  # Not regenerated
+
+    assert statements.run_month_end(month, str(tmp_path / "clean"), workers=2) == 5
+    assert outputs(directory) == outputs(tmp_path / "clean" / month)
+    summary = outputs(directory)["summary.csv"].splitlines()
+    assert len(summary) == 6 and "alice" in summary[1]
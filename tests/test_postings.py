@@ -0,0 +1,14 @@
+import json
+import ledger
+import postings
+import storage
+
+def test_bad_amounts_reject_their_line_only(store, tmp_path):
+    payee = ledger.open_account("bob", "pw", "Savings", "Vasna", 10000, "2222")
+    path = tmp_path / "payroll.jsonl"
+    lines = [{"to_account": payee, "amount": amount} for amount in ("inf", "nan", "-5", "100")]  # Paid in from outside
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    report = postings.post(postings.read_postings(str(path)))
+    assert [r["result"] for r in report] == ["Rejected", "Rejected", "Rejected", "Accepted"]
+    data = storage.load_data()
+    assert data["bob"]["accounts"][0]["balance"] == 10100
@@ -0,0 +1,105 @@
+import json
+import os
+import ledger
+import shard_store
+import storage
+from conftest import make_store
+from shard_store import ShardStore
+
+def build(backend, directory):
+    directory.mkdir(exist_ok=True)
+    s = make_store(backend, directory)
+    storage.set_store(s)
+    for i, (name, branch) in enumerate([("alice", "Bodakdev"), ("albert", "Vasna"), ("bob", "Bodakdev"),
+                                        ("Alfred", "Vasna"), ("carol", "Bodakdev")]):
+        ledger.open_account(name, "pw", "Savings", branch, 10000 + i, f"{i:04d}")
+    return s
+
+def test_directory_answers_like_the_json_store(tmp_path):
+    expected = build("json", tmp_path / "json")
+    shards = build("sharded", tmp_path / "shards")
+    numbers = [acc["account_number"] for u in expected.usernames() for acc in expected.load()[u]["accounts"]]
+    for query, branch, contains in [("al", None, False), ("AL", "Vasna", False), ("o", None, True), ("", None, False)]:
+        assert shards.search_accounts(query, branch, contains, 0, 3) == expected.search_accounts(query, branch, contains, 0, 3)
+    assert sorted(shards.branch_accounts("Bodakdev")) == sorted(expected.branch_accounts("Bodakdev"))
+    assert shards.locate_many(numbers) == expected.locate_many(numbers)
+    assert shards.usernames() == sorted(expected.usernames())
+
+def test_search_reads_only_the_shards_on_the_page(tmp_path, monkeypatch):
+    s = build("sharded", tmp_path)
+    s._cache.clear()
+    read = []
+    original = s._read
+    monkeypatch.setattr(s, "_read", lambda path: read.append(path) or original(path))
+    rows, total = s.search_accounts("", limit=2)
+    assert (len(rows), total) == (2, 5)
+    assert sum(os.sep + "users" + os.sep in path for path in read) == 2
+
+def test_commits_append_history_instead_of_rewriting_it(tmp_path):
+    s = build("sharded", tmp_path)
+    number = s.load()["alice"]["accounts"][0]["account_number"]
+    history = s._history(number)
+    for amount in (100, 200, 300):
+        size = os.path.getsize(history) if os.path.exists(history) else 0
+        ledger.deposit("alice", number, amount)
+        with open(history, "rb") as f:
+            f.seek(size)
+            assert len(json.loads(f.read())) == 1  # Just this deposit's row
+    with open(s._path("alice")) as f: assert "transactions" not in f.read()
+
+    reopened = ShardStore(s.root)
+    log = reopened.load()["alice"]["accounts"][0]["transactions"]
+    assert [row["amount"] for row in log] == ["₹100.00", "₹200.00", "₹300.00"]
+    assert reopened.load()["alice"]["accounts"][0]["balance"] == 10600
+
+def test_bytes_left_by_a_crashed_commit_are_cut_off(tmp_path):
+    s = build("sharded", tmp_path)
+    number = s.load()["bob"]["accounts"][0]["account_number"]
+    ledger.deposit("bob", number, 100)
+    with open(s._history(number), "ab") as f: f.write(b'[{"torn')  # Appended, but the intent was never written
+    ledger.deposit("bob", number, 50)
+    log = ShardStore(s.root).load()["bob"]["accounts"][0]["transactions"]
+    assert [row["amount"] for row in log] == ["₹100.00", "₹50.00"]
+
+def test_directory_is_built_for_an_older_store(tmp_path):
+    s = build("sharded", tmp_path)
+    os.remove(s._dir_path())
+    reopened = ShardStore(s.root)
+    assert reopened.usernames() == ["Alfred", "albert", "alice", "bob", "carol"]
+    assert reopened.locate(s.load()["carol"]["accounts"][0]["account_number"]) == ("carol", 0)
+
+def test_account_changes_are_logged_instead_of_rewriting_the_directory(tmp_path):
+    s = build("sharded", tmp_path)
+    other = ShardStore(s.root)  # A second server process, with the directory already read
+    assert other.usernames() == ["Alfred", "albert", "alice", "bob", "carol"]
+    with open(s._dir_path(), "rb") as f: directory = f.read()
+    size = os.path.getsize(s._log_path())
+    number = ledger.open_account("dave", "pw", "Savings", "Vasna", 10000, "5555")
+    ledger.remove_account("bob", s.load()["bob"]["accounts"][0]["account_number"])
+    with open(s._dir_path(), "rb") as f: assert f.read() == directory
+    with open(s._log_path()) as f:
+        f.seek(size)
+        assert [json.loads(line) for line in f] == [{"dave": [[number, "Vasna", "BANK" + ledger.BRANCH_DATA["Vasna"]["code"]]]}, {"bob": None}]
+    for store in (s, other, ShardStore(s.root)):
+        assert store.usernames() == ["Alfred", "albert", "alice", "carol", "dave"]
+        assert store.locate(number) == ("dave", 0)
+        assert store.search_accounts("da")[1] == 1 and store.search_accounts("b")[1] == 0
+
+def test_checkpoint_folds_the_directory_log(tmp_path):
+    s = build("sharded", tmp_path)
+    other = ShardStore(s.root)
+    other.usernames()
+    ledger.open_account("dave", "pw", "Savings", "Vasna", 10000, "5555")
+    storage.checkpoint()
+    assert os.path.getsize(s._log_path()) == 0
+    with open(s._dir_path()) as f: assert "dave" in json.load(f)
+    number = ledger.open_account("erin", "pw", "Savings", "Vasna", 10000, "6666")  # Logged after the fold
+    assert other.usernames() == ["Alfred", "albert", "alice", "bob", "carol", "dave", "erin"]
+    assert other.locate(number) == ("erin", 0)
+
+def test_a_long_directory_log_is_folded_by_the_commit(tmp_path, monkeypatch):
+    s = build("sharded", tmp_path)
+    monkeypatch.setattr(shard_store, "DIRECTORY_LOG_BYTES", 1)
+    ledger.open_account("dave", "pw", "Savings", "Vasna", 10000, "5555")
+    assert os.path.getsize(s._log_path()) == 0
+    assert ShardStore(s.root).usernames() == ["Alfred", "albert", "alice", "bob", "carol", "dave"]
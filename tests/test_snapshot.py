@@ -0,0 +1,49 @@
+import os
+import pytest
+import ledger
+import snapshot
+import storage
+from conftest import make_store
+
+def populate():
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    b = ledger.open_account("Zoë", "pw", "Current", "Vasna", 20000, "2222")
+    ledger.deposit("alice", a, 1234.56, "Salary — März")
+    ledger.transfer("alice", a, "Zoë", b, 500)
+    ledger.apply_loan("Zoë", b, "Home Loan", 900000, 10)
+    return a, b
+
+def as_stored(data):
+    return storage.dumps(data, sort_keys=True)
+
+def test_binary_snapshot_round_trips_the_bank(store, tmp_path):
+    populate()
+    data = storage.load_data()
+    path = str(tmp_path / "bank.snap")
+    assert snapshot.write(path, data) == os.path.getsize(path)
+    assert as_stored(snapshot.read(path)) == as_stored(data)
+    with snapshot.Snapshot(path) as snap:
+        assert list(snap.usernames()) == sorted(u for u in data if storage.is_user(data, u))
+        assert as_stored(snap.user("Zoë")) == as_stored(data["Zoë"])
+        assert snap.globals()["pending_loans"] == data["pending_loans"]
+        assert "bob" not in snap
+        with pytest.raises(KeyError): snap.user("bob")
+
+def test_conversions_replay_the_journal(store, tmp_path):
+    populate()
+    expected = as_stored(storage.load_data())
+    snap_file, json_file = str(tmp_path / "copy.snap"), str(tmp_path / "copy.json")
+    assert snapshot.from_json(store.data_file, snap_file) == 2
+    assert snapshot.to_json(snap_file, json_file) == 2
+    assert as_stored(storage.replayed_bank(json_file)) == expected
+
+def test_binary_store_checkpoints_and_reopens(tmp_path):
+    s = make_store("binary", tmp_path)
+    storage.set_store(s)
+    a, _ = populate()
+    s.save(s.load())  # Checkpoint: the journal goes into the .snap file
+    assert os.path.getsize(s.journal_file) == 0
+    ledger.deposit("alice", a, 10)
+    reopened = make_store("binary", tmp_path)
+    assert as_stored(reopened.load()) == as_stored(s.load())
+    assert reopened.load()["alice"]["accounts"][0]["balance"] == round(50000 + 1234.56 - 500 + 10, 2)
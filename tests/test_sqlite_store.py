@@ -0,0 +1,50 @@
+import pickle
+import ledger
+import storage
+from conftest import make_store
+import sqlite_store
+from txnlog import LazyTxnLog, TxnLog, make_row, normalize_row, to_timestamp
+
+def test_operations_do_not_read_history(tmp_path):
+    store = make_store("sqlite", tmp_path)
+    storage.set_store(store)
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    b = ledger.open_account("bob", "pw", "Current", "Vasna", 20000, "2222")
+    for _ in range(5): ledger.deposit("alice", a, 100)
+    statements = []
+    store._conn().set_trace_callback(statements.append)
+    ledger.deposit("alice", a, 100)
+    ledger.transfer("alice", a, "bob", b, 50)
+    assert ledger.verify_pin("alice", a, "1111")
+    store._conn().set_trace_callback(None)
+    assert not [sql for sql in statements if "FROM transactions" in sql]
+
+def test_lazy_history_matches_postings(tmp_path):
+    store = make_store("sqlite", tmp_path)
+    storage.set_store(store)
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    for amount in (100, 200, 300): ledger.deposit("alice", a, amount)
+    log = storage.load_data()["alice"]["accounts"][0]["transactions"]
+    assert isinstance(log, LazyTxnLog)
+    assert [row["amount"] for row in log] == ["₹100.00", "₹200.00", "₹300.00"]
+    assert log.totals() == {"credits": 600, "debits": 0}
+    copy = pickle.loads(pickle.dumps(log))
+    assert type(copy) is TxnLog and copy == log
+
+def test_monthly_rollups_carry_over_to_the_next_load(tmp_path, monkeypatch):
+    store = make_store("sqlite", tmp_path)
+    storage.set_store(store)
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    account_id = store._account_id(store._conn(), "alice", 0)
+    store._conn().executemany(sqlite_store.TXN_INSERT, [(account_id, *normalize_row(make_row(to_timestamp(date), "CREDIT", 100, "Old", 0)))
+                                                        for date in ("2024-01-05 10:00:00", "2024-02-05 10:00:00", "2024-03-05 10:00:00")])
+    expected = storage.load_data()["alice"]["accounts"][0]["transactions"].months()
+    rolled = []
+    original = TxnLog._rollup
+    monkeypatch.setattr(TxnLog, "_rollup", lambda log, rows: rolled.append(len(rows)) or original(log, rows))
+    assert storage.load_data()["alice"]["accounts"][0]["transactions"].months() == expected
+    assert rolled == []
+    ledger.deposit("alice", a, 100)
+    months = storage.load_data()["alice"]["accounts"][0]["transactions"].months()
+    assert rolled == [1, 1]  # Only the last month seen before, and the deposit's month
+    assert months[:-1] == expected and months[-1]["credits"] == 10000
@@ -0,0 +1,42 @@
+import csv
+import os
+import io
+import pytest
+import ledger
+import statements
+
+download_data_util = pytest.importorskip("streamlit.runtime.download_data_util")
+
+def as_download(data):
+    """What st.download_button makes of a deferred callable's return value."""
+    return download_data_util.convert_data_to_bytes_and_infer_mime(data, TypeError(type(data)))[0]
+
+@pytest.fixture
+def account(store):
+    number = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    for amount in range(100, 800, 100): ledger.deposit("alice", number, amount)
+    return number
+
+def rows(payload):
+    return list(csv.DictReader(io.StringIO(payload.decode("utf-8"))))
+
+def test_an_export_is_a_valid_download(account, tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "EXPORT_DIR", str(tmp_path / "exports"))
+    seen = []
+    path = statements.csv_file("alice", account, progress=lambda done, total: seen.append((done, total)))
+    assert seen[-1] == (7, 7)
+    payload = as_download(statements.open_export(path))
+    assert [r["amount"] for r in rows(payload)] == [f"₹{a:,.2f}" for a in range(100, 800, 100)]
+
+def test_an_export_downloads_more_than_once(account, tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "EXPORT_DIR", str(tmp_path / "exports"))
+    path = statements.csv_file("alice", account)
+    first, second = as_download(statements.open_export(path)), as_download(statements.open_export(path))
+    with open(path, "rb") as f: assert first == second == f.read()
+
+def test_old_exports_are_pruned(account, tmp_path, monkeypatch):
+    monkeypatch.setattr(statements, "EXPORT_DIR", str(tmp_path / "exports"))
+    old = statements.csv_file("alice", account)
+    monkeypatch.setattr(statements, "KEEP_EXPORTS", -1)
+    new = statements.csv_file("alice", account)
+    assert not os.path.exists(old) and os.path.exists(new)
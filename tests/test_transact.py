@@ -0,0 +1,45 @@
+import contextlib
+import pytest
+import ledger
+import storage
+from conftest import make_store
+from storage import ConflictError
+
+def test_a_write_from_another_process_makes_the_operation_rebuild(any_store, backend, tmp_path):
+    """The other store stands in for a second server process on the same files."""
+    a = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    other = make_store(backend, tmp_path)
+    builds = []
+    def build(data, mut):
+        builds.append(data["alice"]["accounts"][0]["balance"])
+        if len(builds) == 1:  # Lands between this operation's read and its commit
+            elsewhere = storage.Mutation(other.load(), "deposit")
+            elsewhere.inc(["alice", "accounts", 0, "balance"], 100)
+            other.commit(elsewhere, guard=["alice"])
+        mut.set(["alice", "accounts", 0, "balance"], data["alice"]["accounts"][0]["balance"] + 1)
+    ledger.transact("test", [a], ["alice"], build)
+    assert builds == [50000, 50100]
+    assert storage.load_data()["alice"]["accounts"][0]["balance"] == 50101
+
+def test_retries_end_with_an_exclusive_attempt(store, monkeypatch):
+    commits, exclusive = [], []
+    def commit(mut, guard=None):
+        commits.append(mut.op)
+        if not exclusive: raise ConflictError(mut.op)
+    @contextlib.contextmanager
+    def shut_out():
+        exclusive.append(True)
+        yield
+    monkeypatch.setattr(storage, "commit", commit)
+    monkeypatch.setattr(storage, "exclusive", shut_out)
+    monkeypatch.setattr(ledger.time, "sleep", lambda seconds: None)
+    assert ledger.transact("test", ["k"], ["k"], lambda data, mut: "done") == "done"
+    assert len(commits) == ledger.MAX_RETRIES + 1 and exclusive == [True]
+
+def test_errors_from_build_are_not_retried(store):
+    builds = []
+    def build(data, mut):
+        builds.append(1)
+        raise ledger.LedgerError("Insufficient funds.")
+    with pytest.raises(ledger.LedgerError): ledger.transact("test", ["k"], ["k"], build)
+    assert builds == [1]
@@ -0,0 +1,67 @@
+import pickle
+import pytest
+from txnlog import LazyTxnLog, TxnLog, make_row, next_month, to_timestamp
+
+def sample():
+    log = TxnLog()
+    balance = 0
+    for i, (date, t_type, amount) in enumerate([("2024-01-05 10:00:00", "CREDIT", 1000), ("2024-01-20 09:30:00", "DEBIT", 250.5),
+                                                ("2024-02-01 00:00:00", "CREDIT", 99.99), ("2024-03-15 18:45:10", "INTEREST", 12.34)]):
+        balance += -amount if t_type == "DEBIT" else amount
+        log.append(make_row(to_timestamp(date), t_type, amount, f"Row {i % 2}", balance))
+    return log
+
+def test_rows_display_as_they_always_have():
+    log = sample()
+    assert log[1] == {"date": "2024-01-20 09:30:00", "type": "DEBIT", "amount": "₹250.50",
+                      "description": "Row 1", "balance_after": 749.5}
+    assert log[-1]["type"] == "INTEREST"
+    assert TxnLog.from_stored(list(log)) == log  # Legacy display dicts load into the same columns
+
+@pytest.mark.parametrize("convert", [
+    lambda log: TxnLog.from_stored(log.to_stored()),
+    lambda log: TxnLog.from_buffers(*log.to_buffers()[:2], *log.to_buffers()[2]),
+    lambda log: TxnLog.from_columns(log.ts, [r["type"] for r in log.stored_rows()], log.paise, log.desc, log.bal),
+    lambda log: pickle.loads(pickle.dumps(log)),
+    lambda log: pickle.loads(pickle.dumps(LazyTxnLog(lambda: log))),
+])
+def test_conversions_round_trip(convert):
+    log = sample()
+    assert convert(log) == log
+
+def test_byte_swapped_buffers_load():
+    log = sample()
+    types, descs, columns = log.to_buffers()
+    swapped = []
+    for column, size in zip(columns, (8, 8, 8, 4, 1)):
+        swapped.append(b"".join(column[i:i + size][::-1] for i in range(0, len(column), size)))
+    assert TxnLog.from_buffers(types, descs, *swapped, swap=True) == log
+
+def test_totals_add_up_the_columns():
+    log = sample()
+    assert log.totals() == {"credits": 1099.99, "debits": 250.5}
+    assert list(log.to_frame()["balance_after"]) == [1000, 749.5, 849.49, 849.49 + 12.34]
+
+def test_date_ranges_bisect_an_ordered_log():
+    log = sample()
+    start = to_timestamp("2024-01-01 00:00:00")
+    assert log.span(start, next_month(start)) == (0, 2)
+    assert list(log.matching(start, None, ["CREDIT"])) == [0, 2]
+    log.append(make_row(to_timestamp("2023-12-31 23:00:00"), "CREDIT", 1, "Late import", 0))
+    assert not log.ordered()
+    assert list(log.matching(None, start)) == [4]
+
+def test_monthly_rollups_follow_appends():
+    log = sample()
+    assert [(m["month"], m["credits"], m["debits"], m["count"]) for m in log.months()] == [
+        ("2024-01", 100000, 25050, 2), ("2024-02", 9999, 0, 1), ("2024-03", 0, 0, 1)]
+    log.append(make_row(to_timestamp("2024-03-20 00:00:00"), "CREDIT", 5, "Row", 0))
+    assert log.months()[-1]["credits"] == 500
+    assert log.totals() == {"credits": 1104.99, "debits": 250.5}
+
+def test_lazy_log_fetches_once_and_only_when_used():
+    calls = []
+    lazy = LazyTxnLog(lambda: calls.append(1) or sample())
+    assert calls == []
+    assert len(lazy) == 4 and lazy[0]["amount"] == "₹1,000.00"
+    assert calls == [1]
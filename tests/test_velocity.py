@@ -0,0 +1,53 @@
+import pytest
+import ledger
+import velocity
+from ledger import LedgerError
+
+NOW = 1_700_000_000
+
+@pytest.fixture
+def rules(monkeypatch):
+    def set_rules(**limits):
+        monkeypatch.setattr(velocity, "RULES", dict({rule: None for rule in velocity.RULES}, **limits))
+    return set_rules
+
+def debits(acc, count, amount=100, start=NOW, step=60, recipient=None):
+    for i in range(count):
+        acc["velocity"] = velocity.screen(acc, amount, recipient, now=start + i * step)
+    return acc
+
+def test_hourly_count_limit_slides_with_the_window(rules):
+    rules(debits_per_hour=3)
+    acc = debits({}, 3)
+    with pytest.raises(ValueError, match="per hour"):
+        velocity.screen(acc, 100, now=NOW + 200)
+    velocity.screen(acc, 100, now=NOW + velocity.HOUR + velocity.MINUTE_BUCKET + 120)  # The first debits have aged out
+
+def test_amount_limits_include_the_debit_being_made(rules):
+    rules(amount_per_day=1000)
+    acc = debits({}, 2, amount=400)
+    velocity.screen(acc, 200, now=NOW + 300)
+    with pytest.raises(ValueError, match="daily limit"):
+        velocity.screen(acc, 201, now=NOW + 300)
+
+def test_repeat_recipients_count_once(rules):
+    rules(recipients_per_day=2)
+    acc = debits({}, 1, recipient="A")
+    acc = debits(acc, 1, recipient="B", start=NOW + 60)
+    acc = debits(acc, 3, recipient="A", start=NOW + 120)
+    with pytest.raises(ValueError, match="different accounts"):
+        velocity.screen(acc, 100, "C", now=NOW + 600)
+
+def test_state_stays_bounded_by_the_windows():
+    acc = debits({}, 2000, step=97)  # About two days of debits
+    assert len(acc["velocity"]["m"]) <= velocity.HOUR // velocity.MINUTE_BUCKET + 1
+    assert len(acc["velocity"]["h"]) <= velocity.DAY // velocity.HOUR + 1
+
+def test_ledger_blocks_debits_over_the_limit(store, rules):
+    rules(debits_per_hour=2)
+    number = ledger.open_account("alice", "pw", "Savings", "Bodakdev", 50000, "1111")
+    ledger.withdraw("alice", number, 100)
+    ledger.withdraw("alice", number, 100)
+    with pytest.raises(LedgerError, match="per hour"):
+        ledger.withdraw("alice", number, 100)
+    ledger.deposit("alice", number, 100)  # Credits are not limited
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import views
+
+pytest.importorskip("streamlit.testing.v1")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOGIN_RUN = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+assert not app.exception, app.exception
+print(json.dumps(sorted(sys.modules)))
+"""
+
+def test_the_login_page_imports_no_heavy_modules(tmp_path):
+    """Runs in a fresh interpreter: this one has already imported everything the other tests use."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", LOGIN_RUN, os.path.join(ROOT, "project.py")], cwd=tmp_path,
+                         env=env, capture_output=True, text=True, timeout=120, check=True).stdout
+    imported = set(json.loads(out.splitlines()[-1]))
+    assert "views.auth" in imported
+    assert not imported & {"pandas", "numpy", "charts", "views.history", "views.admin"}
+    assert not [m for m in imported if m.startswith("views.admin")]
+
+def test_every_registered_page_resolves():
+    for page in views.PAGES:
+        assert callable(views.load(page))
+    for module in views.ADMIN_TABS.values():
+        assert callable(views.load_module(module).render)
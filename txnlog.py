@@ -0,0 +1,354 @@
+import sys
+import bisect
+import calendar
+import datetime
+import operator
+from array import array
+from itertools import islice
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+TXN_TYPES = ["CREDIT", "DEBIT"]  # Category codes; new types are appended on first use
+_TYPE_CODES = {t: i for i, t in enumerate(TXN_TYPES)}
+
+# --- CONVERSIONS ---
+# Timestamps are seconds since the epoch of the naive local time the app displays,
+# so they sort like the old date strings and format back without timezone shifts.
+def to_timestamp(date_str):
+    return calendar.timegm(datetime.datetime.strptime(date_str, DATE_FORMAT).timetuple())
+
+def now_timestamp():
+    return calendar.timegm(datetime.datetime.now().timetuple())
+
+def format_timestamp(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime(DATE_FORMAT)
+
+def to_paise(amount):
+    return int(round(amount * 100))
+
+def format_amount(paise):
+    return f"₹{paise / 100:,.2f}"
+
+def type_code(t_type):
+    code = _TYPE_CODES.get(t_type)
+    if code is None:
+        code = _TYPE_CODES[t_type] = len(TXN_TYPES)
+        TXN_TYPES.append(t_type)
+    return code
+
+def month_start(ts):
+    """Timestamp of 00:00:00 on the first day of ts's month."""
+    d = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return calendar.timegm((d.year, d.month, 1, 0, 0, 0))
+
+def next_month(ts):
+    """Timestamp of the first day of the month after ts's month."""
+    d = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return calendar.timegm((d.year + d.month // 12, d.month % 12 + 1, 1, 0, 0, 0))
+
+def make_row(ts, t_type, amount, description, balance_after):
+    """The journal/storage form of one transaction (amounts in rupees go in, paise are stored)."""
+    return {"ts": ts, "type": t_type, "paise": to_paise(amount), "desc": description, "bal": to_paise(balance_after)}
+
+def normalize_row(row):
+    """Accepts a stored row or a legacy display dict; returns (ts, type, paise, desc, bal)."""
+    if "paise" in row:
+        return row["ts"], row["type"], row["paise"], row["desc"], row["bal"]
+    amount = float(str(row["amount"]).replace("₹", "").replace(",", ""))
+    return (to_timestamp(row["date"]), row["type"], to_paise(amount),
+            row["description"], to_paise(row["balance_after"]))
+
+_CODE_TABLES = {}
+
+def _code_table(types):
+    """bytes.translate() table from positions in types to global category codes."""
+    key = tuple(types)
+    table = _CODE_TABLES.get(key)
+    if table is None:
+        table = bytearray(256)
+        for i, t in enumerate(types): table[i] = type_code(t)
+        table = _CODE_TABLES[key] = bytes(table)
+    return table
+
+# --- COLUMNAR LOG ---
+class TxnLog:
+    """Transaction history of one account, stored column by column.
+
+    Amounts and running balances are integer paise and dates are integer
+    timestamps in typed arrays, the type is a one-byte category code and
+    descriptions are interned strings, so a transaction costs a few dozen bytes
+    instead of a dict of formatted strings. Formatting happens only when rows
+    are displayed.
+
+    Rows are appended in time order, so the ts column doubles as the time index:
+    a date range is two bisections. A log whose clock went backwards (a
+    daylight-saving change, a legacy import) is detected and falls back to a scan.
+    """
+    __slots__ = ("ts", "paise", "bal", "kind", "desc", "_ordered", "_months")
+
+    def __init__(self):
+        self.ts = array("q")
+        self.paise = array("q")
+        self.bal = array("q")
+        self.kind = bytearray()
+        self.desc = []
+        self._ordered = True  # None = not checked yet
+        self._months = None   # (rows covered, monthly rollup rows)
+
+    def __len__(self): return len(self.ts)
+
+    def append(self, row):
+        ts, t_type, paise, desc, bal = normalize_row(row)
+        if self._ordered and self.ts and ts < self.ts[-1]: self._ordered = False
+        self.ts.append(ts)
+        self.paise.append(paise)
+        self.bal.append(bal)
+        self.kind.append(type_code(t_type))
+        self.desc.append(sys.intern(desc))
+
+    def extend(self, rows):
+        for row in rows: self.append(row)
+
+    def row(self, i):
+        """One transaction in the display form the app has always shown."""
+        return {
+            "date": format_timestamp(self.ts[i]),
+            "type": TXN_TYPES[self.kind[i]],
+            "amount": format_amount(self.paise[i]),
+            "description": self.desc[i],
+            "balance_after": self.bal[i] / 100
+        }
+
+    def __getitem__(self, i):
+        if isinstance(i, slice): return [self.row(j) for j in range(*i.indices(len(self)))]
+        return self.row(i if i >= 0 else len(self) + i)
+
+    def __iter__(self):
+        for i in range(len(self)): yield self.row(i)
+
+    def __eq__(self, other):
+        return isinstance(other, TxnLog) and self.to_stored() == other.to_stored()
+
+    def slice(self, start, stop=None):
+        """A new log holding rows [start, stop)."""
+        log = TxnLog()
+        log.ts, log.paise, log.bal = self.ts[start:stop], self.paise[start:stop], self.bal[start:stop]
+        log.kind, log.desc = self.kind[start:stop], self.desc[start:stop]
+        log._ordered = self._ordered
+        return log
+
+    def take(self, positions):
+        """A new log holding the rows at the given positions."""
+        log = TxnLog()
+        for i in positions:
+            log.ts.append(self.ts[i]); log.paise.append(self.paise[i]); log.bal.append(self.bal[i])
+            log.kind.append(self.kind[i]); log.desc.append(self.desc[i])
+        log._ordered = None
+        return log
+
+    # --- TIME INDEX ---
+    def ordered(self):
+        """True if the timestamps never go backwards (checked once, then kept up to date by append)."""
+        if self._ordered is None:
+            self._ordered = all(map(operator.le, self.ts, islice(self.ts, 1, None)))
+        return self._ordered
+
+    def span(self, start_ts=None, end_ts=None):
+        """(lo, hi) such that rows [lo, hi) are those with start_ts <= ts < end_ts, in O(log n).
+
+        Only meaningful for an ordered() log.
+        """
+        lo = 0 if start_ts is None else bisect.bisect_left(self.ts, start_ts)
+        hi = len(self) if end_ts is None else bisect.bisect_left(self.ts, end_ts, lo)
+        return lo, hi
+
+    def matching(self, start_ts=None, end_ts=None, types=None):
+        """Positions of rows with start_ts <= ts < end_ts and a type in types (None = no filter)."""
+        import numpy as np
+        if self.ordered():
+            lo, hi = self.span(start_ts, end_ts)
+            if types is None: return np.arange(lo, hi)
+            kind = self.arrays(lo, hi)["kind"]
+            return lo + np.flatnonzero(np.isin(kind, [type_code(t) for t in types]))
+        cols = self.arrays()
+        mask = np.ones(len(self), dtype=bool)
+        if start_ts is not None: mask &= cols["ts"] >= start_ts
+        if end_ts is not None: mask &= cols["ts"] < end_ts
+        if types is not None: mask &= np.isin(cols["kind"], [type_code(t) for t in types])
+        return np.flatnonzero(mask)
+
+    # --- MONTHLY ROLLUPS ---
+    def _rollup(self, rows):
+        """Credits, debits, closing balance and count of the given positions, in paise."""
+        credit, debit = type_code("CREDIT"), type_code("DEBIT")
+        totals = {credit: 0, debit: 0}
+        last = None
+        for i in rows:
+            k = self.kind[i]
+            if k in totals: totals[k] += self.paise[i]
+            last = i
+        return {"credits": totals[credit], "debits": totals[debit], "closing": self.bal[last], "count": len(rows)}
+
+    def months(self):
+        """One rollup per calendar month with transactions, oldest first:
+        {"month": "YYYY-MM", "start": ts, "credits", "debits", "closing", "count"} (amounts in paise).
+
+        Kept on the log and extended incrementally: only the latest month (and any
+        months after it) is recomputed when transactions are appended.
+        """
+        n = len(self)
+        cached = self._months
+        if cached and cached[0] == n: return cached[1]
+        if not n: return []
+        if not self.ordered():
+            groups = {}
+            for i in range(n): groups.setdefault(month_start(self.ts[i]), []).append(i)
+            rows = [dict(self._rollup(groups[m]), month=format_timestamp(m)[:7], start=m) for m in sorted(groups)]
+        else:
+            rows = list(cached[1][:-1]) if cached and cached[0] < n else []
+            lo = bisect.bisect_left(self.ts, rows[-1]["start"]) + rows[-1]["count"] if rows else 0
+            while lo < n:
+                m = month_start(self.ts[lo])
+                hi = bisect.bisect_left(self.ts, next_month(m), lo)
+                rows.append(dict(self._rollup(range(lo, hi)), month=format_timestamp(m)[:7], start=m))
+                lo = hi
+        self._months = (n, rows)
+        return rows
+
+    def stored_rows(self):
+        """Yields rows in journal/storage form."""
+        for i in range(len(self)):
+            yield {"ts": self.ts[i], "type": TXN_TYPES[self.kind[i]], "paise": self.paise[i],
+                   "desc": self.desc[i], "bal": self.bal[i]}
+
+    # --- SERIALIZATION ---
+    def to_stored(self):
+        """Compact column form used in the JSON snapshot."""
+        codes = sorted(set(self.kind))
+        local = {code: i for i, code in enumerate(codes)}
+        descs = list(dict.fromkeys(self.desc))
+        desc_ids = {d: i for i, d in enumerate(descs)}
+        return {
+            "ts": self.ts.tolist(), "paise": self.paise.tolist(), "bal": self.bal.tolist(),
+            "types": [TXN_TYPES[c] for c in codes], "type": [local[c] for c in self.kind],
+            "descs": descs, "desc": [desc_ids[d] for d in self.desc]
+        }
+
+    @classmethod
+    def from_stored(cls, stored):
+        """Builds a log from the column form, or from a legacy list of transaction dicts."""
+        if isinstance(stored, TxnLog): return stored
+        log = cls()
+        if isinstance(stored, list):
+            log.extend(stored)
+            return log
+        log.ts = array("q", stored["ts"])
+        log.paise = array("q", stored["paise"])
+        log.bal = array("q", stored["bal"])
+        codes = [type_code(t) for t in stored["types"]]
+        log.kind = bytearray(codes[c] for c in stored["type"])
+        descs = [sys.intern(d) for d in stored["descs"]]
+        log.desc = [descs[i] for i in stored["desc"]]
+        log._ordered = None
+        return log
+
+    def to_buffers(self):
+        """Raw column form used by the binary snapshot: (types, descs, [ts, paise, bal, desc ids, type ids] as bytes)."""
+        codes = sorted(set(self.kind))
+        local = bytearray(256)
+        for i, code in enumerate(codes): local[code] = i
+        descs = list(dict.fromkeys(self.desc))
+        desc_ids = {d: i for i, d in enumerate(descs)}
+        return [TXN_TYPES[c] for c in codes], descs, [
+            self.ts.tobytes(), self.paise.tobytes(), self.bal.tobytes(),
+            array("I", map(desc_ids.__getitem__, self.desc)).tobytes(), bytes(self.kind).translate(local)]
+
+    @classmethod
+    def from_buffers(cls, types, descs, ts, paise, bal, desc_ids, kind, swap=False):
+        """Inverse of to_buffers(); swap=True for buffers written with the other byte order."""
+        log = cls()
+        log.ts, log.paise, log.bal, ids = array("q", ts), array("q", paise), array("q", bal), array("I", desc_ids)
+        if swap:
+            for column in (log.ts, log.paise, log.bal, ids): column.byteswap()
+        log.kind = bytearray(kind.translate(_code_table(types)))
+        log.desc = list(map([sys.intern(d) for d in descs].__getitem__, ids))
+        log._ordered = None
+        return log
+
+    @classmethod
+    def from_columns(cls, ts, types, paise, descs, bal):
+        log = cls()
+        log.ts = array("q", ts)
+        log.paise = array("q", paise)
+        log.bal = array("q", bal)
+        log.kind = bytearray(type_code(t) for t in types)
+        log.desc = [sys.intern(d) for d in descs]
+        log._ordered = None
+        return log
+
+    # --- VECTORIZED VIEWS ---
+    def arrays(self, start=0, stop=None):
+        """NumPy copies of the numeric columns for rows [start, stop).
+
+        Copies rather than views: an array exporting its buffer cannot grow, and
+        the log must keep accepting appends while a page holds on to a frame.
+        """
+        import numpy as np
+        sl = slice(start, stop)
+        def column(buf, dtype):
+            part = buf[sl]  # Slicing copies just the requested rows
+            return np.frombuffer(part, dtype=dtype) if len(part) else np.empty(0, dtype)
+        return {"ts": column(self.ts, np.int64), "paise": column(self.paise, np.int64),
+                "bal": column(self.bal, np.int64), "kind": column(self.kind, np.uint8)}
+
+    def totals(self):
+        """Total credits and debits in rupees, summed from the monthly rollups."""
+        months = self.months()
+        return {"credits": sum(m["credits"] for m in months) / 100, "debits": sum(m["debits"] for m in months) / 100}
+
+    def to_frame(self, start=0, stop=None):
+        """DataFrame of rows [start, stop) with display columns built in one vectorized pass."""
+        import pandas as pd
+        cols = self.arrays(start, stop)
+        return pd.DataFrame({
+            "date": pd.to_datetime(cols["ts"], unit="s"),
+            "type": pd.Categorical.from_codes(cols["kind"], categories=list(TXN_TYPES)),
+            "amount": pd.Series(cols["paise"] / 100).map("₹{:,.2f}".format),
+            "description": self.desc[start:stop],
+            "balance_after": cols["bal"] / 100
+        })
+
+class LazyTxnLog(TxnLog):
+    """A TxnLog whose columns are read by fetch() the first time any of them is used.
+
+    Lets a backend hand out account rows without their history: an operation
+    that never looks at the transactions (a deposit, a login) never reads them.
+    remember(), if given, is handed the monthly rollups each time months() runs,
+    so the backend can seed them into the next load of the same account.
+    """
+    __slots__ = ("_fetch", "_remember")
+
+    def __init__(self, fetch, remember=None):
+        self._fetch = fetch
+        self._remember = remember
+
+    def __getattr__(self, name):
+        # Only reached while the column slots are still unset
+        if name in ("_fetch", "_remember"): raise AttributeError(name)
+        log = self._fetch()
+        for slot in TxnLog.__slots__: setattr(self, slot, getattr(log, slot))
+        return getattr(self, name)
+
+    def months(self):
+        rows = TxnLog.months(self)
+        if self._remember: self._remember(self._months)
+        return rows
+
+    def __reduce__(self):
+        return TxnLog.from_stored, (self.to_stored(),)
+
+def ensure_log(acc):
+    """Makes sure an account dict holds its transactions as a TxnLog."""
+    txns = acc.get("transactions")
+    if not isinstance(txns, TxnLog):
+        acc["transactions"] = TxnLog.from_stored(txns or [])
+    return acc["transactions"]
@@ -0,0 +1,79 @@
+from txnlog import now_timestamp, to_paise
+
+# --- RULES ---
+# Limits on customer debits (withdrawals and transfers) per account, over sliding windows.
+# An amount limit is in rupees; None switches a rule off.
+RULES = {
+    "debits_per_hour": 10,
+    "amount_per_hour": 200000,
+    "debits_per_day": 40,
+    "amount_per_day": 1000000,
+    "recipients_per_day": 10,  # Distinct accounts transferred to
+}
+HOUR, DAY = 3600, 86400
+MINUTE_BUCKET = 300  # The hour window is kept in 5-minute buckets, the day window in hourly ones
+
+# --- STATE ---
+# acc["velocity"] holds the counters, so they persist and commit with the posting itself:
+#   "m": [[bucket start, debits, paise], ...]  5-minute buckets of the last hour, oldest first
+#   "h": [[bucket start, debits, paise], ...]  hourly buckets of the last day
+#   "r": {account number: last transfer ts}    recipients of the last day
+# Each is bounded by its window (12 buckets, 24 buckets, recipients_per_day + 1),
+# so a check sums a few dozen numbers however long the account's history is.
+def _empty():
+    return {"m": [], "h": [], "r": {}}
+
+def _trim(buckets, now, window, size):
+    while buckets and buckets[0][0] <= now - window - size: buckets.pop(0)
+    return buckets
+
+def _window(buckets, now, window, size):
+    """(debits, paise) in buckets overlapping the last window seconds."""
+    count = paise = 0
+    for start, n, p in buckets:
+        if start > now - window - size:
+            count += n
+            paise += p
+    return count, paise
+
+def _bump(buckets, now, size, paise):
+    start = now - now % size
+    if buckets and buckets[-1][0] == start:
+        buckets[-1][1] += 1
+        buckets[-1][2] += paise
+    else: buckets.append([start, 1, paise])
+
+def screen(acc, amount, recipient=None, now=None):
+    """Raises ValueError naming the broken rule if acc may not make this debit now;
+    otherwise returns the account's new velocity state (to be set with the posting).
+
+    Bucket edges make the windows up to one bucket longer than nominal, which
+    only ever errs on the side of blocking.
+    """
+    now = now_timestamp() if now is None else now
+    old = acc.get("velocity") or _empty()
+    state = {"m": _trim([b[:] for b in old["m"]], now, HOUR, MINUTE_BUCKET),
+             "h": _trim([b[:] for b in old["h"]], now, DAY, HOUR),
+             "r": {n: ts for n, ts in old["r"].items() if ts > now - DAY}}
+    paise = to_paise(amount)
+    hour_count, hour_paise = _window(state["m"], now, HOUR, MINUTE_BUCKET)
+    day_count, day_paise = _window(state["h"], now, DAY, HOUR)
+
+    def over(rule, value):
+        limit = RULES.get(rule)
+        return limit is not None and value > limit
+    if over("debits_per_hour", hour_count + 1):
+        raise ValueError(f"Limit of {RULES['debits_per_hour']} withdrawals/transfers per hour reached.")
+    if over("amount_per_hour", (hour_paise + paise) / 100):
+        raise ValueError(f"This would exceed the hourly limit of ₹{RULES['amount_per_hour']:,}.")
+    if over("debits_per_day", day_count + 1):
+        raise ValueError(f"Limit of {RULES['debits_per_day']} withdrawals/transfers per day reached.")
+    if over("amount_per_day", (day_paise + paise) / 100):
+        raise ValueError(f"This would exceed the daily limit of ₹{RULES['amount_per_day']:,}.")
+    if recipient is not None and recipient not in state["r"] and over("recipients_per_day", len(state["r"]) + 1):
+        raise ValueError(f"Transfers to more than {RULES['recipients_per_day']} different accounts a day are blocked.")
+
+    _bump(state["m"], now, MINUTE_BUCKET, paise)
+    _bump(state["h"], now, HOUR, paise)
+    if recipient is not None: state["r"][recipient] = now
+    return state
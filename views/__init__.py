@@ -0,0 +1,50 @@
+import importlib
+import threading
+import time
+import metrics
+
+# --- PAGE REGISTRY ---
+# Page name -> (module, function). A page's module, and whatever heavy library it
+# needs (pandas, plotly), is imported the first time the page is shown, so the
+# login page never pays for the History chart.
+PAGES = {
+    "auth": ("views.auth", "render"),
+    "deactivated": ("views.dashboard", "deactivated"),
+    "Dashboard": ("views.dashboard", "dashboard"),
+    "Deposit": ("views.cash", "deposit"),
+    "Withdraw": ("views.cash", "withdraw"),
+    "Check Balance": ("views.cash", "balance"),
+    "Transfer Money": ("views.transfer", "render"),
+    "CIBIL Score": ("views.loans", "cibil"),
+    "Overdraft": ("views.loans", "overdraft"),
+    "Loans": ("views.loans", "loans"),
+    "History": ("views.history", "render"),
+    "admin": ("views.admin", "render"),
+}
+# Admin tab title -> module with render(data)
+ADMIN_TABS = {
+    "Pending Loans": "views.admin_loans",
+    "Account Management": "views.admin_accounts",
+    "Reactivation Requests": "views.admin_reactivation",
+    "End of Day": "views.admin_eod",
+    "Performance": "views.admin_performance",
+}
+
+_imported = set()
+_lock = threading.Lock()
+
+def load_module(name):
+    """Imports a page module on first use, recording how long that took as import.<module>."""
+    if name in _imported: return importlib.import_module(name)
+    with _lock:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        if name not in _imported:
+            _imported.add(name)
+            metrics.record(f"import.{name}", time.perf_counter() - started)
+    return module
+
+def load(page):
+    """The render function of a registered page."""
+    module, function = PAGES[page]
+    return getattr(load_module(module), function)
@@ -0,0 +1,29 @@
+import streamlit as st
+import pandas as pd
+import aggregates
+import views
+from storage import load_data
+from views.common import logout
+
+def render():
+    st.title("🏦 Central Bank Administration")
+    data = load_data()
+    
+    stats = data.get("stats", {})  # Running totals: no scan of the users needed
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Bank Liquidity", f"₹{data.get('bank_balance', 0):,.2f}")
+    col2.metric("Customer Deposits", f"₹{aggregates.total(stats, 'deposits'):,.2f}")
+    col3.metric("Overdraft Exposure", f"₹{aggregates.total(stats, 'overdraft'):,.2f}")
+    col4.metric("Outstanding Loan Book", f"₹{aggregates.total(stats, 'loan_book'):,.2f}")
+    with st.expander(f"Branch & Loan Book Breakdown ({aggregates.total(stats, 'deactivated'):.0f} deactivated accounts)"):
+        st.dataframe(pd.DataFrame(aggregates.by_branch(stats)), hide_index=True)
+        loan_book = [{"Loan Type": t, "Outstanding Principal": round(v, 2)} for t, v in sorted(stats.get("loan_book", {}).items())]
+        if loan_book: st.dataframe(pd.DataFrame(loan_book), hide_index=True)
+    
+    # --- TABS FOR ADMIN ---
+    # Each tab's module is imported the first time the admin panel is opened
+    for tab, module in zip(st.tabs(list(views.ADMIN_TABS)), views.ADMIN_TABS.values()):
+        with tab: views.load_module(module).render(data)
+    
+    st.divider()
+    if st.button("Logout (Admin)"): logout()
@@ -0,0 +1,77 @@
+import math
+import streamlit as st
+import ledger
+import storage
+from ledger import LedgerError, BRANCH_DATA
+from views.common import safe_rerun
+
+PAGE_SIZE = 25
+
+def _label(row):
+    status_icon = "🟢" if row["status"] == "active" else "🔴"
+    return f"{status_icon} {row['account_number']} · {row['username']} ({row['account_type']}, {row['branch_name']}) - {row['status'].upper()}"
+
+# 2. ACCOUNT MANAGEMENT (DEACTIVATE / REMOVE)
+def render(data):
+    st.subheader("Manage User Accounts")
+    # Searched through the account index one page at a time, never listed whole
+    f1, f2, f3 = st.columns([3, 2, 1])
+    query = f1.text_input("Search username or account number", key="dir_query")
+    branch = f2.selectbox("Branch", ["All branches"] + list(BRANCH_DATA), key="dir_branch")
+    contains = f3.toggle("Contains", key="dir_contains", help="Match anywhere, not just at the start")
+    branch = None if branch == "All branches" else branch
+
+    # One widget per search, so a new search starts on page 1; the page is fetched before the
+    # widget is drawn, so one query gives both the rows and the match count
+    page_key = f"dir_page:{query}:{branch}:{contains}"
+    page_no = st.session_state.get(page_key, 1)
+    rows, total = storage.search_accounts(query, branch, contains, (page_no - 1) * PAGE_SIZE, PAGE_SIZE)
+    if not total:
+        st.info("No accounts match." if query or branch else "No users found in database.")
+        return
+    pages = max(1, math.ceil(total / PAGE_SIZE))
+    if page_no > pages:  # Accounts were removed since the page was picked
+        page_no = st.session_state[page_key] = pages
+        rows, total = storage.search_accounts(query, branch, contains, (page_no - 1) * PAGE_SIZE, PAGE_SIZE)
+    st.number_input(f"Page (of {pages}, {total:,} accounts)", 1, pages, step=1, key=page_key)
+    labels = {row["account_number"]: _label(row) for row in rows}
+    # Selected by account number, which stays valid when the page or the results change
+    selected = st.radio("Select Account", list(labels), format_func=labels.get, key="dir_account")
+
+    owner = storage.locate_account(selected) if selected else None
+    if owner is None:
+        st.warning("Account no longer exists.")
+        return
+    selected_user, acc_idx = owner
+    target_acc = data[selected_user]["accounts"][acc_idx]
+
+    st.divider()
+    st.write(f"**Current Status:** {target_acc.get('status', 'active')}")
+    st.write(f"**Balance:** ₹{target_acc['balance']:,.2f}")
+
+    # Use a Form for Admin Action
+    with st.form("admin_action_form"):
+        action = st.radio("Choose Action", ["Deactivate Account", "Remove Account"])
+        reason = st.text_area("Reason (Required for audit)")
+        submit_admin = st.form_submit_button("Execute Action")
+
+    if submit_admin:
+        if not reason.strip():
+            st.error("Please provide a reason.")
+        else:
+            if action == "Deactivate Account":
+                if target_acc.get("status") == "deactivated":
+                    st.warning("Account is already deactivated.")
+                else:
+                    try:
+                        ledger.deactivate_account(selected_user, target_acc["account_number"], reason)
+                        st.success("Account Deactivated Successfully.")
+                        safe_rerun()
+                    except LedgerError as e: st.error(str(e))
+
+            elif action == "Remove Account":
+                try:
+                    ledger.remove_account(selected_user, target_acc["account_number"])
+                    st.success("Account and Data Removed Permanently.")
+                    safe_rerun()
+                except LedgerError as e: st.error(str(e))
@@ -0,0 +1,38 @@
+import datetime
+import streamlit as st
+import pandas as pd
+import eod
+import jobs
+import statements
+from ledger import OVERDRAFT_FIXED_RATE
+from views.common import safe_rerun, track_job
+
+# 4. END OF DAY BATCH
+def render(data):
+    st.subheader("End-of-Day Batch")
+    st.caption(f"Charges {OVERDRAFT_FIXED_RATE*100:.0f}% p.a. overdraft interest daily, raises loan instalments that fall due "
+               f"and a {eod.LATE_PENALTY_RATE*100:.0f}% penalty on instalments still unpaid. Safe to re-run for a date.")
+    business_date = st.date_input("Business Date", datetime.date.today(), key="eod_date")
+    job = track_job("eod_job")
+    if job:
+        if job.status == "done": st.success(f"End of day complete for {len(job.result)} branch(es).")
+        st.session_state.pop("eod_job")
+    elif st.button("Run End of Day"):
+        st.session_state["eod_job"] = jobs.submit(f"End of day {business_date}",
+                                                  lambda job: eod.run_eod(business_date, progress=job.update), owner="admin")
+        safe_rerun()
+    runs = [{"Run": key, **summary} for key, summary in data.get("eod_runs", {}).items()]
+    if runs: st.dataframe(pd.DataFrame(runs[::-1]), hide_index=True)
+
+    st.subheader("Month-End Statements")
+    st.caption(f"Writes a CSV and a summary per account under {statements.MONTH_END_DIR}/<month>/, "
+               "across worker processes. An interrupted run resumes where it stopped.")
+    month = st.text_input("Month (YYYY-MM)", statements.previous_month(), key="stmt_month")
+    job = track_job("month_end_job")
+    if job:
+        if job.status == "done": st.success(f"{job.result:,} statement(s) written for {month}.")
+        st.session_state.pop("month_end_job")
+    elif st.button("Generate Statements"):
+        st.session_state["month_end_job"] = jobs.submit(f"Statements {month}",
+                                                        lambda job: statements.run_month_end(month, progress=job.update), owner="admin")
+        safe_rerun()
@@ -0,0 +1,93 @@
+import streamlit as st
+import pandas as pd
+import jobs
+import ledger
+from ledger import LedgerError
+from views.common import safe_rerun, track_job
+
+CIBIL_BANDS = {"Below 650": (0, 649), "650 - 749": (650, 749), "750+": (750, 900)}
+
+def loan_cibil(data, req):
+    """CIBIL score of the account a pending loan was requested against."""
+    try: accounts = data[req["username"]]["accounts"]
+    except KeyError: return 0
+    acc = next((a for a in accounts if a["account_number"] == req.get("account_number")), None)
+    if acc is None and req.get("account_index", 0) < len(accounts): acc = accounts[req.get("account_index", 0)]
+    return acc["cibil"] if acc else 0
+
+# 1. LOAN APPROVALS
+def render(data):
+    st.subheader("Pending Loan Approvals")
+    job = track_job("loan_job")
+    if job:
+        if job.status == "done": st.session_state["loan_report"] = job.result
+        st.session_state.pop("loan_job")
+    if st.session_state.get("loan_report"):
+        st.success("Batch processed.")
+        st.dataframe(pd.DataFrame(st.session_state["loan_report"]), hide_index=True)
+    if not data["pending_loans"]:
+        st.info("No active loan requests.")
+    else:
+        queue = pd.DataFrame([{
+            "Select": False, "ID": req["id"], "User": req["username"], "Type": req["type"],
+            "Amount": req["principal"], "Interest": req["interest_rate"], "Tenure": req["tenure_years"],
+            "CIBIL": loan_cibil(data, req)
+        } for req in data["pending_loans"]])
+
+        # --- FILTERS ---
+        f1, f2, f3 = st.columns(3)
+        with f1:
+            sel_types = st.multiselect("Loan Type", sorted(queue["Type"].unique()), default=sorted(queue["Type"].unique()))
+        with f2:
+            lo, hi = int(queue["Amount"].min()), int(queue["Amount"].max())
+            amt_range = st.slider("Amount (₹)", lo, hi, (lo, hi)) if lo < hi else (lo, hi)
+        with f3:
+            bands = st.multiselect("CIBIL Band", list(CIBIL_BANDS), default=list(CIBIL_BANDS))
+        in_band = queue["CIBIL"].apply(lambda c: any(CIBIL_BANDS[b][0] <= c <= CIBIL_BANDS[b][1] for b in bands))
+        shown = queue[queue["Type"].isin(sel_types) & queue["Amount"].between(*amt_range) & in_band]
+
+        select_all = st.checkbox(f"Select all {len(shown)} filtered requests")
+        edited = st.data_editor(
+            shown.assign(Select=select_all), hide_index=True, disabled=list(queue.columns.drop("Select")),
+            key=f"loan_queue_{st.session_state.get('loan_batch', 0)}"
+        )
+        chosen = edited.loc[edited["Select"], "ID"].tolist()
+
+        c1, c2 = st.columns(2)
+        action = None
+        if c1.button(f"Approve Selected ({len(chosen)})", disabled=not chosen): action = "approve"
+        if c2.button(f"Reject Selected ({len(chosen)})", type="secondary", disabled=not chosen): action = "reject"
+        if action and "loan_job" not in st.session_state:
+            # One locked pass and one commit for the whole selection, off the script thread
+            decisions = {loan_id: action for loan_id in chosen}
+            st.session_state["loan_job"] = jobs.submit(f"Loan batch ({len(chosen)})",
+                                                       lambda job: ledger.decide_loans(decisions, job.update), owner="admin")
+            st.session_state.pop("loan_report", None)
+            st.session_state["loan_batch"] = st.session_state.get("loan_batch", 0) + 1
+            safe_rerun()
+
+        # --- SINGLE REQUEST ---
+        st.markdown("---")
+        st.markdown("**Review One Request**")
+        if shown.empty: st.caption("No requests match the filters.")
+        else:
+            rows = shown.set_index("ID")
+            loan_id = st.selectbox("Request", rows.index.tolist(),
+                                   format_func=lambda i: f"{i} | User: {rows.at[i, 'User']} | Amount: ₹{rows.at[i, 'Amount']}")
+            req = rows.loc[loan_id]
+            st.write(f"**Type:** {req['Type']} | **Interest:** {req['Interest']} | **Tenure:** {req['Tenure']} years "
+                     f"| **CIBIL:** {req['CIBIL']}")
+            busy = "loan_job" in st.session_state
+            c1, c2 = st.columns(2)
+            if c1.button("Approve", key=f"app_{loan_id}", disabled=busy):
+                try:
+                    ledger.approve_loan(loan_id)
+                    st.session_state.pop("loan_report", None)
+                    safe_rerun()
+                except LedgerError as e: st.error(str(e))
+            if c2.button("Reject", key=f"rej_{loan_id}", type="secondary", disabled=busy):
+                try:
+                    ledger.reject_loan(loan_id)
+                    st.session_state.pop("loan_report", None)
+                    safe_rerun()
+                except LedgerError as e: st.error(str(e))
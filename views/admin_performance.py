@@ -0,0 +1,20 @@
+import streamlit as st
+import pandas as pd
+import metrics
+from views.common import safe_rerun
+
+# 5. PERFORMANCE
+def render(data):
+    st.subheader("Performance")
+    if not metrics.ENABLED:
+        st.info("Instrumentation is off (BANK_METRICS=0).")
+    rows = metrics.snapshot()
+    st.caption("Latency of page reruns, ledger operations, storage calls and background jobs in this server process. "
+               "Percentiles are histogram bucket bounds.")
+    if rows: st.dataframe(pd.DataFrame(rows), hide_index=True)
+    else: st.info("Nothing recorded yet.")
+    c1, c2 = st.columns(2)
+    c1.download_button("Export JSON", metrics.export(), file_name="bank_metrics.json", mime="application/json")
+    if c2.button("Reset Counters"):
+        metrics.reset()
+        safe_rerun()
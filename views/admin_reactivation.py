@@ -0,0 +1,27 @@
+import streamlit as st
+import ledger
+from ledger import LedgerError
+from views.common import safe_rerun
+
+# 3. REACTIVATION REQUESTS
+def render(data):
+    st.subheader("User Reactivation Requests")
+    if not data.get("reactivation_requests"):
+        st.info("No pending requests.")
+    else:
+        for idx, req in enumerate(data["reactivation_requests"]):
+            with st.container():
+                st.error(f"Request from: **{req['username']}**")
+                st.write(f"**Account:** {req['account_number']}")
+                st.write(f"**Reason:** {req['message']}")
+                st.caption(f"Date: {req['date']}")
+
+                if st.button("Approve Reactivation", key=f"react_{idx}"):
+                    u = req['username']
+                    try:
+                        ledger.reactivate_account(u, req["account_number"])
+                        st.success(f"Account for {u} is now Active.")
+                        safe_rerun()
+                    except LedgerError:
+                        st.error("User data no longer exists.")
+                st.markdown("---")
@@ -0,0 +1,49 @@
+import streamlit as st
+import ledger
+from ledger import LedgerError, MIN_BALANCE_SAVINGS, BRANCH_DATA
+from views.common import safe_rerun
+
+ADMIN_PASSWORD = "admin123"
+
+# --- AUTH SYSTEM ---
+def render():
+    st.title("🏦 Secure Digital Banking")
+    tab1, tab2 = st.tabs(["Login", "Create Account"])
+    
+    with tab1:
+        u = st.text_input("Username", key="l_u")
+        p = st.text_input("Password", type="password", key="l_p")
+        if st.button("Login"):
+            if u == "admin" and p == ADMIN_PASSWORD:
+                st.session_state.update({"logged_in": True, "is_admin": True})
+                safe_rerun()
+            elif ledger.authenticate(u, p):
+                st.session_state.update({"logged_in": True, "is_admin": False, "username": u})
+                safe_rerun()
+            else: st.error("Invalid credentials")
+
+    with tab2:
+        # --- FIX: Moved Account Type Selection OUTSIDE the form ---
+        # This ensures the script reruns and updates min_dep BEFORE the form renders
+        acc_type_choice = st.selectbox("Select Account Type", ["Savings", "Current"], key="reg_acc_type")
+        
+        # Calculate minimum deposit based on the SELECTION immediately
+        min_dep_val = MIN_BALANCE_SAVINGS if acc_type_choice == "Savings" else 0.0
+        
+        with st.form("register_form"):
+            new_u = st.text_input("Username")
+            new_p = st.text_input("Password", type="password")
+            
+            branch = st.selectbox("Branch", list(BRANCH_DATA.keys()))
+            
+            # Use the calculated min_dep_val here
+            init_dep = st.number_input(f"Initial Deposit (Min: ₹{min_dep_val})", min_value=min_dep_val)
+            
+            new_pin = st.text_input("Set 4-Digit PIN", type="password", max_chars=4)
+            submit_reg = st.form_submit_button("Register & Open Account")
+        
+        if submit_reg:
+            try:
+                ledger.open_account(new_u, new_p, acc_type_choice, branch, init_dep, new_pin)
+                st.success("Account Created! Please Login.")
+            except LedgerError as e: st.error(str(e))
@@ -0,0 +1,45 @@
+import streamlit as st
+import ledger
+from ledger import LedgerError
+
+def deposit(user, acc):
+    st.header("Cash Deposit")
+    # Use Form to avoid session state errors on clear
+    with st.form("deposit_form"):
+        amt = st.number_input("Enter Amount", min_value=100.0)
+        pin = st.text_input("Enter PIN", type="password")
+        submit_dep = st.form_submit_button("Deposit Funds")
+        
+    if submit_dep:
+        if ledger.verify_pin(user, acc["account_number"], pin):
+            try:
+                ledger.deposit(user, acc["account_number"], amt)
+                st.success("Successfully Deposited!")
+            except LedgerError as e: st.error(str(e))
+        else: st.error("Incorrect PIN")
+
+def withdraw(user, acc):
+    st.header("Withdrawal")
+    with st.form("withdraw_form"):
+        amt = st.number_input("Enter Amount", min_value=100.0)
+        pin = st.text_input("Enter PIN", type="password")
+        submit_with = st.form_submit_button("Withdraw Funds")
+        
+    if submit_with:
+        if ledger.verify_pin(user, acc["account_number"], pin):
+            try:
+                ledger.withdraw(user, acc["account_number"], amt)
+                st.success("Withdrawal Complete!")
+            except LedgerError as e: st.error(str(e))
+        else: st.error("Incorrect PIN")
+
+def balance(user, acc):
+    st.header("Secure Balance Check")
+    with st.form("balance_form"):
+        pin = st.text_input("Enter PIN", type="password")
+        submit_bal = st.form_submit_button("Check")
+        
+    if submit_bal:
+        if ledger.verify_pin(user, acc["account_number"], pin):
+            st.metric("Available Balance", f"₹{acc['balance']:,.2f}")
+        else: st.error("Wrong PIN")
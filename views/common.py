@@ -0,0 +1,34 @@
+import streamlit as st
+import jobs
+
+# --- HELPER FOR RERUN ---
+def safe_rerun():
+    """Handles rerun compatibility for different Streamlit versions."""
+    try:
+        st.rerun()
+    except AttributeError:
+        st.experimental_rerun()
+
+def logout():
+    st.session_state["logged_in"] = False
+    safe_rerun()
+
+# --- BACKGROUND JOBS ---
+@st.fragment(run_every=0.5)
+def job_progress(job_id):
+    """Polls a running job without rerunning the whole page; reruns it once the job finishes."""
+    job = jobs.get(job_id)
+    if job is None or not job.active: safe_rerun()
+    else: st.progress(job.fraction, text=f"{job.name}: {job.done:,}/{job.total:,}" if job.total else f"{job.name}...")
+
+def track_job(key):
+    """Shows the session's job stored under key. Returns it once finished, None while it runs."""
+    job = jobs.get(st.session_state.get(key))
+    if job is None:
+        st.session_state.pop(key, None)
+        return None
+    if job.active:
+        job_progress(job.id)
+        return None
+    if job.status == "failed": st.error(f"{job.name} failed: {job.error}")
+    return job
@@ -0,0 +1,37 @@
+import streamlit as st
+import ledger
+from ledger import LedgerError, BRANCH_DATA
+from views.common import logout
+
+def dashboard(user, acc):
+    st.title("Account Overview")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Account Holder", acc['account_name'])
+    c2.metric("Type", acc["account_type"])
+    c3.metric("CIBIL Score", acc.get("cibil", 550))
+    
+    st.info(f"**Account Number:** {acc['account_number']} | **IFSC:** {acc['ifsc']}")
+    st.write(f"**Branch:** {acc['branch_name']} - {acc['branch_addr']}")
+    st.write(f"**Branch Telephone:** {BRANCH_DATA[acc['branch_name']]['tel']}")
+
+def deactivated(user, acc):
+    """Shown instead of the banking pages while the account is deactivated."""
+    st.title("⛔ Account Deactivated")
+    st.error(f"This account ({acc['account_number']}) has been deactivated by the Admin.")
+    
+    if "admin_note" in acc:
+        st.info(f"**Admin Reason:** {acc['admin_note']}")
+        
+    st.subheader("Request Reactivation")
+    
+    with st.form("reactivation_form"):
+        req_msg = st.text_area("Application Message", placeholder="Please explain why your account should be reactivated...")
+        submit_req = st.form_submit_button("Send Request to Admin")
+    
+    if submit_req:
+        try:
+            ledger.request_reactivation(user, acc["account_number"], req_msg)
+            st.success("Application sent successfully! Wait for Admin approval.")
+        except LedgerError as e: st.error(str(e))
+            
+    if st.sidebar.button("Logout"): logout()
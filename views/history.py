@@ -0,0 +1,84 @@
+import datetime
+import math
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import charts
+import jobs
+import metrics
+import statements
+from storage import account_transactions
+from txnlog import format_timestamp, to_timestamp
+from views.common import safe_rerun, track_job
+
+def render(user, acc):
+    st.header("Transaction Intelligence")
+    log = acc["transactions"]
+    if log:
+        totals = log.totals()
+        t1, t2 = st.columns(2)
+        t1.metric("Total Credits", f"₹{totals['credits']:,.2f}")
+        t2.metric("Total Debits", f"₹{totals['debits']:,.2f}")
+        with st.expander("Monthly Summary"):
+            # Rollups live on the log and only the latest month is recomputed after new transactions
+            months = [{"Month": m["month"], "Credits": m["credits"] / 100, "Debits": m["debits"] / 100,
+                       "Closing Balance": m["closing"] / 100, "Transactions": m["count"]} for m in log.months()]
+            st.dataframe(pd.DataFrame(months[::-1]), hide_index=True)
+
+        # --- FILTERS (applied by the storage layer, not on a full DataFrame) ---
+        first_day = datetime.date.fromisoformat(format_timestamp(log.ts[0])[:10])
+        last_day = datetime.date.fromisoformat(format_timestamp(log.ts[-1])[:10])
+        f1, f2, f3 = st.columns([2, 2, 1])
+        with f1:
+            date_range = st.date_input("Date Range", (first_day, last_day))
+        with f2:
+            types = st.multiselect("Type", ["CREDIT", "DEBIT"], default=["CREDIT", "DEBIT"])
+        with f3:
+            page_size = st.selectbox("Rows per page", [25, 50, 100], index=1)
+
+        start_ts = end_ts = None
+        if len(date_range) == 2:
+            start_ts = to_timestamp(f"{date_range[0]} 00:00:00")
+            end_ts = to_timestamp(f"{date_range[1]} 00:00:00") + 86400
+        type_filter = None if set(types) == {"CREDIT", "DEBIT"} else types
+
+        # Downsampled and cached per account/date range, so long histories stay light in the browser
+        with metrics.span("history.chart"):
+            trend = charts.balance_series(acc["account_number"], log, start_ts, end_ts)
+            fig = px.line(trend, x="date", y="balance_after", title="Balance Trend Analysis")
+        st.plotly_chart(fig, use_container_width=True)
+        st.subheader("Statement")
+
+        _, total = account_transactions(user, acc["account_number"], start_ts, end_ts, type_filter, 0, 0)
+        pages = max(1, math.ceil(total / page_size))
+        page_no = st.number_input(f"Page (of {pages})", 1, pages, step=1)
+        offset = (page_no - 1) * page_size
+        page, total = account_transactions(user, acc["account_number"], start_ts, end_ts, type_filter, offset, page_size)
+        if total:
+            st.table(page.to_frame())
+            st.caption(f"Showing {offset + 1}-{offset + len(page)} of {total} transactions")
+        else: st.info("No transactions match the filters.")
+
+        file_name = f"statement_{acc['account_number']}.csv"
+        if total <= statements.BACKGROUND_ROWS:
+            # Built only when clicked instead of on every rerun
+            st.download_button(
+                label="Download Transaction History (CSV)",
+                data=lambda: statements.open_export(
+                    statements.csv_file(user, acc["account_number"], start_ts, end_ts, type_filter)),
+                file_name=file_name,
+                mime="text/csv",
+            )
+        else:
+            # Long statements are written by a background job so this session stays responsive
+            filters = (user, acc["account_number"], start_ts, end_ts, tuple(type_filter or ()))
+            job_key = f"statement_job_{hash(filters)}"  # A new job when the filters change
+            job = track_job(job_key)
+            if job and job.status == "done":
+                st.download_button(label="Download Transaction History (CSV)", data=lambda: statements.open_export(job.result),
+                                   file_name=file_name, mime="text/csv", on_click="ignore")
+            elif job is None and st.button(f"Prepare CSV ({total:,} rows)"):
+                st.session_state[job_key] = jobs.submit(
+                    "Statement", lambda job: statements.csv_file(*filters[:4], type_filter, progress=job.update), owner=user)
+                safe_rerun()
+    else: st.info("No transaction history available.")
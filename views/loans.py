@@ -0,0 +1,125 @@
+import streamlit as st
+import amortization
+import ledger
+from ledger import LedgerError, OVERDRAFT_FIXED_RATE, LOAN_OPTS, get_overdraft_limit
+from views.common import safe_rerun
+
+def cibil(user, acc):
+    st.header("📊 Credit Information Report")
+    current_score = acc.get("cibil", 700)
+    st.metric("Current CIBIL Score", current_score)
+
+    st.divider()
+    st.subheader("Update Your Credit Record")
+    new_cibil = st.slider("Simulate/Update Score", 300, 900, current_score)
+
+    if st.button("Update CIBIL Record"):
+        ledger.update_cibil(user, acc["account_number"], new_cibil)
+        st.toast(f"CIBIL Score successfully updated to {new_cibil}!")  # Survives the rerun, no sleep needed
+        safe_rerun()
+
+def overdraft(user, acc):
+    st.header("Overdraft Facility")
+    if acc["account_type"] != "Current":
+        st.warning("Only Current Accounts have Overdraft access.")
+    else:
+        used = abs(acc["balance"]) if acc["balance"] < 0 else 0
+        limit = get_overdraft_limit(acc["cibil"])
+        interest = used * OVERDRAFT_FIXED_RATE
+        st.metric("Overdraft Limit", f"₹{limit:,.2f}")
+        st.metric("Utilized Limit", f"₹{used:,.2f}")
+        st.metric("Fixed Interest (10%)", f"₹{interest:,.2f}")
+
+        if acc["balance"] < 0:
+            st.warning("Account is in overdraft. You must repay principal and interest.")
+        else:
+            st.success("No overdraft used.")
+
+def loans(user, acc):
+    st.header("Loan Services")
+    tab1, tab2 = st.tabs(["Apply for Loan", "My Loan Portfolio"])
+
+    with tab1:
+        st.subheader("Loan Application Calculator")
+        # --- MOVED INPUTS OUTSIDE FORM FOR REAL-TIME CALCULATION ---
+        l_type = st.selectbox("Select Loan Type", list(LOAN_OPTS.keys()))
+        obj = LOAN_OPTS[l_type]
+        rate = obj.calculate_rate(acc["cibil"])
+
+        col_a, col_b = st.columns(2)
+        with col_a:
+            amt = st.number_input("Loan Amount (₹)", 10000, obj.max_amount)
+        with col_b:
+            tenure = st.slider("Tenure (Years)", obj.min_tenure, obj.max_tenure)
+
+        # --- REAL TIME CALCULATION DISPLAY ---
+        calc_emi, total_pay, total_int = amortization.quote(amt, rate, tenure)  # Memoized across reruns
+
+        st.info(f"**Interest Rate:** {rate*100:.2f}%")
+
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Estimated Monthly EMI", f"₹{calc_emi:,.2f}")
+        m2.metric("Total Repayment Amount", f"₹{total_pay:,.2f}")
+        m3.metric("Total Interest", f"₹{total_int:,.2f}")
+        with st.expander("View Amortization Schedule"):
+            st.dataframe(amortization.to_frame(amortization.schedule(amt, rate, tenure)), hide_index=True)
+
+        st.divider()
+
+        # --- FINAL SUBMISSION FORM ---
+        with st.form("loan_apply_form"):
+            st.write("Confirm your application details above.")
+            pin = st.text_input("Enter PIN to Apply", type="password")
+            submit_loan = st.form_submit_button("Submit Application")
+
+        if submit_loan:
+            if ledger.verify_pin(user, acc["account_number"], pin):
+                try:
+                    ledger.apply_loan(user, acc["account_number"], l_type, amt, tenure)
+                    st.success("Application Submitted for Approval!")
+                except LedgerError as e: st.error(str(e))
+            else: st.error("Incorrect PIN")
+
+    with tab2:
+        if not acc["loans"]:
+            st.info("No active or rejected loans.")
+        else:
+            for l in acc["loans"]:
+                with st.container():
+                    st.subheader(f"{l['type']} - {l['id']}")
+                    if l["status"] == "Rejected":
+                        st.error(f"Status: Rejected (on {l.get('date', 'N/A')})")
+                    elif l["status"] == "Active":
+                        st.success("Status: Active")
+                        st.write(f"**Principal:** ₹{l['principal']:,.2f} | **Total Interest:** ₹{l['total_interest']:,.2f}")
+                        st.write(f"**Total Outstanding:** ₹{l['remaining_amount']:,.2f}")
+
+                        emi_val = l['emi_amount']
+                        loan_rate, outstanding = amortization.loan_terms(l)
+                        remaining = amortization.remaining_schedule(outstanding, loan_rate, emi_val)
+                        max_possible = max(1, len(remaining["payment"]))
+
+                        st.divider()
+                        st.write(f"**EMI Amount:** ₹{emi_val:,.2f} | **Principal Outstanding:** ₹{outstanding:,.2f} | **EMIs Left:** {len(remaining['payment'])}")
+                        if l.get("emi_due"):
+                            st.warning(f"**EMI Due:** ₹{l['emi_due']:,.2f}" + (f" | **Late Penalties Charged:** ₹{l['penalties']:,.2f}" if l.get("penalties") else ""))
+                        with st.expander("Remaining Schedule"):
+                            paid_months = round(l["total_paid"] / emi_val) if emi_val else 0
+                            st.dataframe(amortization.to_frame(remaining, paid_months + 1), hide_index=True)
+
+                        # Unique keys for form widgets
+                        with st.form(f"emi_form_{l['id']}"):
+                            num_emis = st.number_input(f"Number of EMIs to pay", 1, max_possible, step=1, key=f"num_{l['id']}")
+                            total_emi_pay = num_emis * emi_val
+                            st.info(f"Total Repayment: ₹{total_emi_pay:,.2f} (payments beyond this month's interest reduce the principal)")
+                            p_emi = st.text_input(f"PIN", type="password", key=f"pin_{l['id']}")
+                            submit_emi = st.form_submit_button("Confirm EMI Payment")
+
+                        if submit_emi:
+                            if ledger.verify_pin(user, acc["account_number"], p_emi):
+                                try:
+                                    ledger.repay_loan(user, acc["account_number"], l["id"], total_emi_pay)
+                                    safe_rerun()
+                                except LedgerError as e: st.error(str(e))
+                            else: st.error("Incorrect PIN")
+                    st.markdown("---")
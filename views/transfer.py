@@ -0,0 +1,20 @@
+import streamlit as st
+import ledger
+from ledger import LedgerError
+
+def render(user, acc):
+    st.header("Transfer to Another Account")
+    with st.form("transfer_form"):
+        recipient_username = st.text_input("Recipient Username (optional)")
+        recipient_acc_no = st.text_input("Recipient Account Number")
+        amt = st.number_input("Amount to Transfer", min_value=100.0)
+        pin = st.text_input("Your PIN", type="password")
+        submit_trans = st.form_submit_button("Transfer")
+    
+    if submit_trans:
+        if ledger.verify_pin(user, acc["account_number"], pin):
+            try:
+                ledger.transfer(user, acc["account_number"], recipient_username, recipient_acc_no, amt)
+                st.success("Transfer Successful!")
+            except LedgerError as e: st.error(str(e))
+        else: st.error("Incorrect PIN")